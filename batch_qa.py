@@ -0,0 +1,206 @@
+"""
+Batch question answering for offline bulk evaluation.
+
+Reads questions from a JSONL file (one object per line) or a CSV file with a
+header, using the "question" (or "query") field and an optional "id", and
+answers them with the same retrieval + LLM pipeline as the query service.
+Every batch of questions is embedded in one encoder call; retrieval and LLM
+calls then run concurrently, capped at --concurrency questions in flight and
+--rpm questions started per minute.
+
+Each answer is appended to the output JSONL file as soon as it is ready,
+with the input fields, the answer with its sources (format_response_with_sources)
+and per-question timings. Re-running with the same output file skips the
+questions already answered and retries the ones that failed.
+
+Usage:
+    python batch_qa.py questions.jsonl --output answers.jsonl
+    python batch_qa.py questions.csv --output answers.jsonl --concurrency 16 --rpm 600
+    python batch_qa.py questions.jsonl --output answers.jsonl --fake   # offline stand-ins
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import BATCH_QA_BATCH_SIZE, BATCH_QA_CONCURRENCY, BATCH_QA_REQUESTS_PER_MINUTE
+from service import build_engine, serialize_response
+from src.embeddings import embed_queries
+from src.tracing import record
+
+
+def question_id(question):
+    """Stable id for rows without one, so a resumed run recognizes them"""
+    return hashlib.sha256(" ".join(question.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def read_questions(path):
+    """Input rows with "id" and "question" set; rows without a question are skipped"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    questions, seen, skipped = [], set(), 0
+    for row in rows:
+        question = str(row.get("question") or row.get("query") or "").strip()
+        if not question:
+            skipped += 1
+            continue
+        row_id = str(row.get("id") or question_id(question))
+        if row_id in seen:
+            skipped += 1
+            continue
+        seen.add(row_id)
+        questions.append({**row, "id": row_id, "question": question})
+    if skipped:
+        print(f"⚠️ Skipped {skipped} row(s) without a question or with a duplicate id")
+    return questions
+
+
+def load_answered(output_path):
+    """
+    Ids already answered in the output file. Failed and truncated lines are
+    dropped from the file so they are retried.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    kept, answered = [], set()
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Interrupted mid-write
+            if "error" not in row:
+                kept.append(line if line.endswith("\n") else line + "\n")
+                answered.add(row["id"])
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(kept)
+    os.replace(tmp_path, output_path)
+    return answered
+
+
+class RateLimiter:
+    """Spaces out request starts to at most ``per_minute`` a minute"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next_start = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        # Single event loop: reserving the next slot needs no lock
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def answer_all(engine, questions, output_path, batch_size=BATCH_QA_BATCH_SIZE,
+                     concurrency=BATCH_QA_CONCURRENCY, requests_per_minute=BATCH_QA_REQUESTS_PER_MINUTE):
+    """Answer every question, appending results to output_path as they finish; returns per-question stats"""
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(requests_per_minute)
+    stats = {"answered": 0, "failed": 0, "cached": 0, "latencies": [], "embed_batches": 0}
+
+    async def answer(row, vector):
+        async with slots:
+            await limiter.wait()
+            start = time.perf_counter()
+            try:
+                response = await engine.answer(row["question"], vector=vector)
+            except Exception as e:
+                response = e
+            return row, response, time.perf_counter() - start
+
+    def write(done, out):
+        for task in done:
+            row, response, seconds = task.result()
+            result = {**row, **serialize_response(response), "latency_seconds": seconds}
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            if isinstance(response, Exception):
+                stats["failed"] += 1
+                print(f"❌ {row['id']}: {result['error']}")
+            else:
+                stats["answered"] += 1
+                stats["cached"] += bool(response.get("cached"))
+                stats["latencies"].append(seconds)
+        out.flush()
+        finished = stats["answered"] + stats["failed"]
+        if done and finished % batch_size < len(done):
+            print(f"📝 {finished}/{len(questions)} questions done")
+
+    pending = set()
+    with open(output_path, "a", encoding="utf-8") as out:
+        for offset in range(0, len(questions), batch_size):
+            batch = questions[offset:offset + batch_size]
+            start = time.perf_counter()
+            # One encoder call for the whole batch (cache misses only, for the cached model)
+            vectors = await loop.run_in_executor(None, embed_queries, engine.embeddings,
+                                                 [row["question"] for row in batch])
+            record("batch_qa.embed_batch", time.perf_counter() - start)
+            stats["embed_batches"] += 1
+            pending |= {asyncio.ensure_future(answer(row, vector)) for row, vector in zip(batch, vectors)}
+            # Embed the next batch while at most one batch is still waiting for a slot
+            while len(pending) > concurrency + batch_size:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                write(done, out)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            write(done, out)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Questions as .jsonl or .csv")
+    parser.add_argument("--output", default="answers.jsonl", help="JSONL file answers are appended to")
+    parser.add_argument("--batch-size", type=int, default=BATCH_QA_BATCH_SIZE, help="Questions per encoder call")
+    parser.add_argument("--concurrency", type=int, default=BATCH_QA_CONCURRENCY, help="Questions in flight")
+    parser.add_argument("--rpm", type=float, default=BATCH_QA_REQUESTS_PER_MINUTE,
+                        help="Questions started per minute (0 = unlimited)")
+    parser.add_argument("--fake", action="store_true", help="Use local stand-ins instead of Pinecone/OpenAI")
+    args = parser.parse_args()
+
+    print("🏥 Medical Knowledge Batch QA")
+    print("=" * 50)
+    questions = read_questions(args.input)
+    answered = load_answered(args.output)
+    todo = [row for row in questions if row["id"] not in answered]
+    print(f"📄 {len(questions)} question(s), {len(questions) - len(todo)} already answered in {args.output}")
+    if not todo:
+        print("✅ Nothing left to answer")
+        return
+
+    engine = build_engine(fake=args.fake, micro_batch=False)
+    start = time.perf_counter()
+    stats = asyncio.run(answer_all(engine, todo, args.output, args.batch_size, args.concurrency, args.rpm))
+    seconds = time.perf_counter() - start
+
+    latencies = stats["latencies"] or [0.0]
+    print()
+    print(f"✅ {stats['answered']} answered ({stats['cached']} from the answer cache), "
+          f"{stats['failed']} failed in {seconds:.1f}s")
+    print(f"⏱️ {stats['answered'] / seconds:.2f} questions/s, latency p50 {np.percentile(latencies, 50):.2f}s "
+          f"p95 {np.percentile(latencies, 95):.2f}s, {stats['embed_batches']} embedding call(s)")
+    if stats["failed"]:
+        print("🔄 Re-run the same command to retry the failed questions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Recall/latency sweep for the IVF index of the local vector store.
+
+Compares approximate search at several nprobe values with exact search and
+prints recall@k next to p50/p99 latency, to pick an operating point for
+RETRIEVER_K queries.
+
+Usage:
+    python benchmarks/ann_recall.py --queries 200 --nprobe 1 4 8 16 32 64
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LOCAL_INDEX_PATH, PINECONE_DIMENSIONS, RETRIEVER_K
+from src.ann_index import IVFIndex
+from src.local_store import LocalVectorStore
+
+
+def sample_queries(store, n_queries, noise, seed=0):
+    """Use perturbed stored vectors as queries so no embedding model is needed"""
+    rng = np.random.default_rng(seed)
+    live_rows = np.flatnonzero(store._live)
+    rows = rng.choice(live_rows, min(n_queries, len(live_rows)), replace=False)
+    queries = np.asarray(store._vectors[rows])
+    return queries + rng.normal(0, noise, queries.shape).astype(np.float32)
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def timed_search(search, queries, k):
+    """Run search for every query; returns (results, latencies in seconds)"""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        rows, _ = search(query, k)
+        latencies.append(time.perf_counter() - start)
+        results.append(set(int(row) for row in rows))
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=LOCAL_INDEX_PATH)
+    parser.add_argument("--k", type=int, default=RETRIEVER_K)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.05, help="Gaussian noise added to sampled query vectors")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the IVF index before measuring")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    store = LocalVectorStore(args.path, embedding=None, dimensions=PINECONE_DIMENSIONS)
+    if len(store) == 0:
+        print(f"❌ No vectors found in {args.path}")
+        return
+
+    index = None if args.rebuild else IVFIndex.load(args.path)
+    if index is None:
+        print("Building IVF index...")
+        index = IVFIndex.build(store)
+
+    queries = sample_queries(store, args.queries, args.noise)
+    exact, exact_latencies = timed_search(store.exact_search_vectors, queries, args.k)
+
+    results = [{
+        "mode": "exact", "nprobe": None, f"recall@{args.k}": 1.0,
+        "p50_ms": percentile_ms(exact_latencies, 50), "p99_ms": percentile_ms(exact_latencies, 99),
+    }]
+    for nprobe in args.nprobe:
+        approx, latencies = timed_search(
+            lambda query, k: index.search(store, query, k, nprobe=nprobe), queries, args.k
+        )
+        recall = np.mean([len(a & e) / max(len(e), 1) for a, e in zip(approx, exact)])
+        results.append({
+            "mode": "ivf", "nprobe": nprobe, f"recall@{args.k}": float(recall),
+            "p50_ms": percentile_ms(latencies, 50), "p99_ms": percentile_ms(latencies, 99),
+        })
+
+    print(f"\n{len(store)} vectors, {len(index.centroids)} lists, {len(queries)} queries, k={args.k}")
+    print(f"{'mode':<6} {'nprobe':>6} {'recall':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in results:
+        print(f"{row['mode']:<6} {row['nprobe'] or '-':>6} {row[f'recall@{args.k}']:>8.3f} "
+              f"{row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(store), "nlist": len(index.centroids), "k": args.k,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Chunking throughput and retrieval hit rate: structured chunker vs. the
+character-based RecursiveCharacterTextSplitter.
+
+On a synthetic PDF corpus (benchmarks/synthetic_corpus.py) it reports, per
+chunker:
+
+- throughput        pages/sec and chunks/sec (structured: 1 and --workers processes)
+- chunk shape       chunk count and mean/max embedding-model tokens per chunk
+- intact rate       share of sampled fact sentences that appear whole in some chunk
+- hit rate@k        share of sampled fact sentences found intact in one of
+                    the top-k chunks retrieved for a question built from the
+                    fact (BM25 by default, --real-embeddings for dense search
+                    with EMBEDDING_MODEL_NAME)
+
+A fact that a chunker cut in two can never count as a hit. The intact rate
+isolates that effect from retrieval quality (the synthetic corpus has a
+small vocabulary, so its BM25 rankings are noisy).
+
+Usage:
+    python benchmarks/chunking_benchmark.py --docs 20 --pages 20 --facts 300 --output chunking.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_MAX_TOKENS, CHUNKER_WORKERS, RETRIEVER_K
+from src.chunker import chunk_documents, count_tokens_batch
+from src.helper import load_pdf_file
+from src.sparse_index import SparseIndex
+from synthetic_corpus import generate_corpus
+
+_SENTENCE_RE = re.compile(r"[^.]*?\(ICD-10 [^)]+\)[^.]*\.|[^.]*?(?:includes|with) [a-z]+[^.]*\.")
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+
+def sample_facts(documents, n_facts, seed=0):
+    """Specific sentences (naming an ICD code or a drug) that occur exactly once in the corpus"""
+    occurrences = Counter(normalize(match) for document in documents
+                          for match in _SENTENCE_RE.findall(normalize(document.page_content)))
+    sentences = sorted(sentence for sentence, count in occurrences.items() if count == 1)
+    random.Random(seed).shuffle(sentences)
+    return sentences[:n_facts]
+
+
+def question_for(fact):
+    """Turn a fact into a question that shares its key terms but not its wording"""
+    words = fact.rstrip(".").split()
+    return "What does the textbook say: " + " ".join(words[len(words) // 4:]) + "?"
+
+
+def recursive_split(documents):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return splitter.split_documents(documents)
+
+
+def hit_rate(chunks, facts, k, workdir, name, embeddings=None):
+    """Share of facts that appear intact in one of the top-k chunks for their question"""
+    texts = [chunk.page_content for chunk in chunks]
+    ids = [f"{name}-{i}" for i in range(len(texts))]
+    if embeddings is None:
+        index = SparseIndex(os.path.join(workdir, f"sparse_{name}"))
+        index.add(ids, texts, [chunk.metadata for chunk in chunks])
+        index.build()
+        search = lambda query: [doc for doc, _ in index.search(query, k)]
+    else:
+        from src.local_store import LocalVectorStore
+        store = LocalVectorStore.from_texts(texts, embeddings, ids=ids, path=os.path.join(workdir, f"dense_{name}"))
+        search = lambda query: store.similarity_search(query, k=k)
+    hits = sum(any(fact in normalize(doc.page_content) for doc in search(question_for(fact))) for fact in facts)
+    return hits / max(len(facts), 1)
+
+
+def run_chunker(name, split, documents, facts, k, workdir, embeddings):
+    start = time.perf_counter()
+    chunks = split(documents)
+    seconds = time.perf_counter() - start
+    tokens = count_tokens_batch([chunk.page_content for chunk in chunks])
+    normalized = [normalize(chunk.page_content) for chunk in chunks]
+    intact = sum(any(fact in text for text in normalized) for fact in facts) / max(len(facts), 1)
+    return {
+        "chunker": name,
+        "seconds": seconds,
+        "pages_per_sec": len(documents) / seconds,
+        "chunks_per_sec": len(chunks) / seconds,
+        "chunks": len(chunks),
+        "mean_tokens": float(tokens.mean()) if len(tokens) else 0.0,
+        "max_tokens": int(tokens.max()) if len(tokens) else 0,
+        "intact_rate": intact,
+        f"hit_rate@{k}": hit_rate(chunks, facts, k, workdir, name.replace(" ", "_"), embeddings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20, help="PDFs in the synthetic corpus")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per PDF")
+    parser.add_argument("--facts", type=int, default=300, help="Fact sentences to look up")
+    parser.add_argument("--k", type=int, default=RETRIEVER_K)
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_MAX_TOKENS, help="Structured chunk size")
+    parser.add_argument("--workers", type=int, default=CHUNKER_WORKERS, help="Processes for the parallel run")
+    parser.add_argument("--real-embeddings", action="store_true", help="Dense retrieval with EMBEDDING_MODEL_NAME")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    embeddings = None
+    if args.real_embeddings:
+        from src.helper import download_hugging_face_model
+        embeddings = download_hugging_face_model()
+
+    with tempfile.TemporaryDirectory(prefix="rag_chunking_") as workdir:
+        corpus_dir = os.path.join(workdir, "corpus")
+        generate_corpus(corpus_dir, args.docs, args.pages)
+        documents = load_pdf_file(corpus_dir)
+        facts = sample_facts(documents, args.facts)
+        print(f"⏱️ {len(documents)} pages, {len(facts)} facts, k={args.k}")
+
+        chunkers = [
+            (f"recursive {CHUNK_SIZE} chars", recursive_split),
+            (f"structured {args.chunk_tokens} tok", lambda docs: chunk_documents(
+                docs, workers=1, max_tokens=args.chunk_tokens)),
+            (f"structured {args.chunk_tokens} tok x{args.workers}", lambda docs: chunk_documents(
+                docs, workers=args.workers, max_tokens=args.chunk_tokens)),
+        ]
+        results = [run_chunker(name, split, documents, facts, args.k, workdir, embeddings)
+                   for name, split in chunkers]
+
+    print(f"\n{'chunker':<28} {'pages/s':>8} {'chunks/s':>9} {'chunks':>7} {'mean tok':>9} {'max tok':>8} "
+          f"{'intact':>7} {'hit rate':>9}")
+    for row in results:
+        print(f"{row['chunker']:<28} {row['pages_per_sec']:>8.0f} {row['chunks_per_sec']:>9.0f} {row['chunks']:>7} "
+              f"{row['mean_tokens']:>9.1f} {row['max_tokens']:>8} {row['intact_rate']:>7.3f} "
+              f"{row[f'hit_rate@{args.k}']:>9.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"docs": args.docs, "pages_per_doc": args.pages, "facts": len(facts), "k": args.k,
+                       "retrieval": "dense" if args.real_embeddings else "bm25", "results": results}, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+PDF text extraction throughput: PyPDFLoader vs. src.pdf_extract.
+
+On a synthetic PDF corpus (benchmarks/synthetic_corpus.py) it reports
+pages/sec for:
+
+- PyPDFLoader         the loader ingestion used before (baseline)
+- <backend> x1        each installed extraction backend, one process, no cache
+- <backend> xN        the same with page ranges fanned out over --workers processes
+- cold cache          extraction plus writing the extracted-text cache
+- warm cache          every file served from the cache (unchanged PDFs)
+
+and checks that the pypdf backend returns exactly PyPDFLoader's page text,
+so switching backends does not change chunks or chunk ids.
+
+Usage:
+    python benchmarks/pdf_extraction.py --docs 10 --pages 200 --workers 4 --output extraction.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import PDF_EXTRACT_WORKERS, PDF_PAGES_PER_TASK
+from src.ingestion import list_pdf_files
+from src.pdf_extract import EXTRACTORS, load_pdf_directory
+from synthetic_corpus import generate_corpus
+
+
+def pypdf_loader(corpus_dir):
+    from langchain_community.document_loaders import PyPDFLoader
+    return [page for path in list_pdf_files(corpus_dir) for page in PyPDFLoader(path).load()]
+
+
+def installed_extractors():
+    installed = []
+    for name, (module, _, _) in EXTRACTORS.items():
+        try:
+            __import__(module)
+            installed.append(name)
+        except ImportError:
+            print(f"⚠️ {name} is not installed, skipping it")
+    return installed
+
+
+def timed_run(name, load):
+    start = time.perf_counter()
+    pages = load()
+    seconds = time.perf_counter() - start
+    print(f"⏱️ {name}: {len(pages) / seconds:.0f} pages/s")
+    return pages, {"run": name, "seconds": seconds, "pages_per_sec": len(pages) / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=10, help="PDFs in the synthetic corpus")
+    parser.add_argument("--pages", type=int, default=100, help="Pages per PDF")
+    parser.add_argument("--workers", type=int, default=PDF_EXTRACT_WORKERS, help="Processes for the fan-out runs")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="rag_extraction_") as workdir:
+        corpus_dir = os.path.join(workdir, "corpus")
+        generate_corpus(corpus_dir, args.docs, args.pages)
+        baseline, row = timed_run("PyPDFLoader", lambda: pypdf_loader(corpus_dir))
+        results.append(row)
+
+        for extractor in installed_extractors():
+            for workers in sorted({1, args.workers}):
+                pages, row = timed_run(f"{extractor} x{workers}", lambda: load_pdf_directory(
+                    corpus_dir, workers=workers, extractor=extractor, cache_dir=None))
+                results.append(row)
+                if extractor == "pypdf":
+                    same = [page.page_content for page in pages] == [page.page_content for page in baseline]
+                    print(f"{'✅' if same else '❌'} pypdf text {'matches' if same else 'differs from'} PyPDFLoader")
+
+        cache_dir = os.path.join(workdir, "text_cache")
+        for name in ("cold cache", "warm cache"):
+            _, row = timed_run(name, lambda: load_pdf_directory(corpus_dir, cache_dir=cache_dir))
+            results.append(row)
+        cache_bytes = sum(os.path.getsize(os.path.join(cache_dir, f)) for f in os.listdir(cache_dir))
+        pdf_bytes = sum(os.path.getsize(path) for path in list_pdf_files(corpus_dir))
+
+    baseline_rate = results[0]["pages_per_sec"]
+    print(f"\n{args.docs * args.pages} pages, {PDF_PAGES_PER_TASK} pages per task")
+    print(f"{'run':<16} {'pages/s':>9} {'speedup':>8}")
+    for row in results:
+        row["speedup"] = row["pages_per_sec"] / baseline_rate
+        print(f"{row['run']:<16} {row['pages_per_sec']:>9.0f} {row['speedup']:>7.1f}x")
+    print(f"Text cache: {cache_bytes / 1e3:.0f} KB for {pdf_bytes / 1e3:.0f} KB of PDFs")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"docs": args.docs, "pages_per_doc": args.pages, "workers": args.workers,
+                       "cache_bytes": cache_bytes, "pdf_bytes": pdf_bytes, "results": results}, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
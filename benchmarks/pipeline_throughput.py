@@ -0,0 +1,184 @@
+"""
+Offline throughput benchmark for the ingestion and query pipeline.
+
+Generates a synthetic PDF corpus at several sizes and runs the real
+pipeline stages against local stand-ins (LocalVectorStore, deterministic
+fake embeddings, FakeLLM), so no API keys or network are needed:
+
+- load_pdf            pages/sec (text cache off, so every run parses)
+- text_split          chunks/sec
+- embedding           chunks/sec (fake by default, --real-embeddings for the model)
+- upsert              vectors/sec through BulkUpserter into the local store
+- end-to-end query    p50/p95 latency and concurrent queries/sec via AsyncQueryEngine
+
+Results (with the git commit) are written as JSON for comparison across
+commits; --compare prints the ratio to an earlier results file.
+
+Usage:
+    python benchmarks/pipeline_throughput.py --docs 5 20 50 --output results.json
+    python benchmarks/pipeline_throughput.py --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import PINECONE_DIMENSIONS, RETRIEVER_K
+from src.bulk_upsert import BulkUpserter, vector_store_upsert_fn
+from src.chunker import chunker_settings
+from src.context_budget import ContextBudgetCompressor
+from src.fakes import FakeLLM, fake_embeddings
+from src.helper import text_split
+from src.local_store import LocalVectorStore
+from src.pdf_extract import load_pdf_directory, resolve_extractor
+from src.query_engine import AsyncQueryEngine
+from src.tracing import metrics_snapshot, reset_metrics
+from synthetic_corpus import CONDITIONS, DRUGS, generate_corpus
+
+# Metrics where lower is better; everything else is a throughput
+LATENCY_METRICS = {"query_p50_ms", "query_p95_ms"}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(fn, *args, **kwargs):
+    """Return (result, seconds)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def benchmark_questions(n):
+    questions = []
+    for i in range(n):
+        condition, code = CONDITIONS[i % len(CONDITIONS)]
+        drug = DRUGS[i % len(DRUGS)]
+        questions.append(f"Is {drug} used for {condition} ({code})? Question {i}")
+    return questions
+
+
+def run_size(docs, pages, queries, concurrency, embeddings, workdir):
+    """Benchmark every stage on one corpus size; returns a result dict"""
+    corpus_dir = os.path.join(workdir, f"corpus_{docs}")
+    generate_corpus(corpus_dir, docs, pages)
+    reset_metrics()
+
+    documents, load_seconds = timed(load_pdf_directory, corpus_dir, cache_dir=None)
+    chunks, split_seconds = timed(text_split, documents)
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+    vectors, embed_seconds = timed(embeddings.embed_documents, texts)
+
+    store = LocalVectorStore(os.path.join(workdir, f"index_{docs}"), embeddings,
+                             len(vectors[0]) if vectors else PINECONE_DIMENSIONS)
+    upserter = BulkUpserter(vector_store_upsert_fn(store), checkpoint_path=None)
+    ids = [f"chunk-{i}" for i in range(len(texts))]
+    _, upsert_seconds = timed(upserter.upsert, ids, texts, vectors, metadatas)
+    upserter.close()
+
+    engine = AsyncQueryEngine(embeddings=embeddings, vector_store=store, llm=FakeLLM(), k=RETRIEVER_K,
+                              compressor=ContextBudgetCompressor())
+    questions = benchmark_questions(queries)
+    latencies = [timed(engine.run, question)[1] for question in questions]
+    responses, concurrent_seconds = timed(engine.run_many, questions[:concurrency])
+    failures = sum(isinstance(response, Exception) for response in responses)
+
+    return {
+        "docs": docs,
+        "pages": len(documents),
+        "chunks": len(chunks),
+        "load_pdf_pages_per_sec": len(documents) / load_seconds,
+        "text_split_chunks_per_sec": len(chunks) / split_seconds,
+        "embed_chunks_per_sec": len(chunks) / embed_seconds,
+        "upsert_vectors_per_sec": len(chunks) / upsert_seconds,
+        "query_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "query_p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "concurrent_queries_per_sec": (len(responses) - failures) / concurrent_seconds,
+        "query_failures": failures,
+        "stages": metrics_snapshot()["stages"],
+    }
+
+
+def compare(results, baseline_path):
+    """Print current/baseline ratios per size, flagging regressions over 10%"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {row["docs"]: row for row in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path} (>1.00 is better):")
+    for row in results:
+        old = baseline.get(row["docs"])
+        if old is None:
+            continue
+        for metric, value in row.items():
+            if metric in ("docs", "pages", "chunks", "stages", "query_failures") or not old.get(metric):
+                continue
+            ratio = old[metric] / value if metric in LATENCY_METRICS else value / old[metric]
+            flag = "  ⚠️ regression" if ratio < 0.9 else ""
+            print(f"  docs={row['docs']:<4} {metric:<28} {ratio:5.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, nargs="+", default=[5, 20, 50], help="Corpus sizes (PDF count)")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per PDF")
+    parser.add_argument("--queries", type=int, default=50, help="Sequential queries per size")
+    parser.add_argument("--concurrency", type=int, default=16, help="Queries answered concurrently per size")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use EMBEDDING_MODEL_NAME instead of fakes")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    if args.real_embeddings:
+        from src.helper import download_hugging_face_model
+        embeddings = download_hugging_face_model()
+    else:
+        embeddings = fake_embeddings()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="rag_benchmark_") as workdir:
+        for docs in args.docs:
+            print(f"⏱️ Benchmarking {docs} PDFs x {args.pages} pages...")
+            results.append(run_size(docs, args.pages, args.queries, args.concurrency, embeddings, workdir))
+
+    print(f"\n{'docs':>5} {'chunks':>7} {'load p/s':>9} {'split c/s':>10} {'embed c/s':>10} "
+          f"{'upsert v/s':>11} {'q p50 ms':>9} {'q p95 ms':>9} {'q/s':>7}")
+    for row in results:
+        print(f"{row['docs']:>5} {row['chunks']:>7} {row['load_pdf_pages_per_sec']:>9.1f} "
+              f"{row['text_split_chunks_per_sec']:>10.0f} {row['embed_chunks_per_sec']:>10.0f} "
+              f"{row['upsert_vectors_per_sec']:>11.0f} {row['query_p50_ms']:>9.2f} "
+              f"{row['query_p95_ms']:>9.2f} {row['concurrent_queries_per_sec']:>7.1f}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "pages_per_doc": args.pages,
+                "embeddings": "model" if args.real_embeddings else "fake",
+                "chunker": chunker_settings(),
+                "pdf_extractor": resolve_extractor(),
+                "results": results,
+            }, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Memory saved vs. recall lost by quantized storage in the local vector store.
+
+Fits int8 and binary codes on the same vectors and compares each mode,
+without rescoring and with float rescoring of k * factor candidates for
+each --rescore-factor, against exact float32 search: bytes per vector, size
+of the scanned matrix, recall@k and p50/p99 latency.
+
+Runs on an existing local index (--path, queries are perturbed stored
+vectors as in ann_recall.py) or on a synthetic, clustered set of vectors
+(--synthetic N) written to a temporary store. Fitting on an existing index
+leaves the codes of the last mode in place.
+
+Usage:
+    python benchmarks/quantization_report.py --synthetic 100000 --output quantization.json
+    python benchmarks/quantization_report.py --path ./local_index --queries 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import (
+    LOCAL_INDEX_PATH, PINECONE_DIMENSIONS, RETRIEVER_K, EMBEDDING_MODEL_NAME, QUANTIZATION_RESCORE_FACTOR
+)
+from src.local_store import LocalVectorStore
+from src.quantization import QUANTIZATION_MODES, quantize_store
+from ann_recall import percentile_ms, sample_queries, timed_search
+
+
+def fill_synthetic(store, n_vectors, clusters=256, batch=10000, seed=0):
+    """Clustered, anisotropic unit vectors (like sentence embeddings) with placeholder texts"""
+    rng = np.random.default_rng(seed)
+    shared = rng.normal(0, 1, store.dimensions)  # Embedding models share a common direction
+    centers = rng.normal(0, 1, (clusters, store.dimensions)) + 2 * shared
+    for start in range(0, n_vectors, batch):
+        size = min(batch, n_vectors - start)
+        vectors = centers[rng.integers(0, clusters, size)] + rng.normal(0, 0.8, (size, store.dimensions))
+        ids = [f"synthetic-{i}" for i in range(start, start + size)]
+        store.add_embeddings([(chunk_id, vector) for chunk_id, vector in zip(ids, vectors)], ids=ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=LOCAL_INDEX_PATH)
+    parser.add_argument("--synthetic", type=int, help="Benchmark this many synthetic vectors instead of --path")
+    parser.add_argument("--k", type=int, default=RETRIEVER_K)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.05, help="Gaussian noise added to sampled query vectors")
+    parser.add_argument("--rescore-factor", type=int, nargs="+", default=[QUANTIZATION_RESCORE_FACTOR, 16],
+                        help="Candidates rescored per requested result")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rag_quantization_") as workdir:
+        if args.synthetic:
+            store = LocalVectorStore(workdir, embedding=None, dimensions=PINECONE_DIMENSIONS)
+            print(f"Writing {args.synthetic} synthetic vectors...")
+            fill_synthetic(store, args.synthetic)
+        else:
+            store = LocalVectorStore(args.path, embedding=None, dimensions=PINECONE_DIMENSIONS)
+        if len(store) == 0:
+            print(f"❌ No vectors found in {args.path}")
+            return
+
+        queries = sample_queries(store, args.queries, args.noise)
+        exact, exact_latencies = timed_search(store.exact_search_vectors, queries, args.k)
+        float_bytes = store.dimensions * 4
+        results = [{
+            "mode": "float32", "rescore_factor": None, "bytes_per_vector": float_bytes,
+            "scanned_mb": len(store) * float_bytes / 1e6, "memory_saved": 0.0, f"recall@{args.k}": 1.0,
+            "p50_ms": percentile_ms(exact_latencies, 50), "p99_ms": percentile_ms(exact_latencies, 99),
+        }]
+
+        for mode in QUANTIZATION_MODES:
+            print(f"Fitting {mode} codes...")
+            quantizer = quantize_store(store, mode)
+            for factor in [None] + args.rescore_factor:
+                store.rescore_factor = factor or 1
+                approx, latencies = timed_search(
+                    lambda query, k: store.quantized_search_vectors(query, k, rescore=factor is not None),
+                    queries, args.k
+                )
+                recall = np.mean([len(a & e) / max(len(e), 1) for a, e in zip(approx, exact)])
+                results.append({
+                    "mode": mode, "rescore_factor": factor, "bytes_per_vector": quantizer.code_width,
+                    "scanned_mb": len(store) * quantizer.code_width / 1e6,
+                    "memory_saved": 1 - quantizer.code_width / float_bytes, f"recall@{args.k}": float(recall),
+                    "p50_ms": percentile_ms(latencies, 50), "p99_ms": percentile_ms(latencies, 99),
+                })
+
+    source = f"{args.synthetic} synthetic" if args.synthetic else f"{len(store)} stored"
+    print(f"\n{source} vectors, {len(queries)} queries, k={args.k}")
+    print(f"{'mode':<8} {'rescore':>7} {'B/vec':>6} {'scan MB':>8} {'saved':>6} {'recall':>7} "
+          f"{'p50 ms':>7} {'p99 ms':>7}")
+    for row in results:
+        rescore = f"{row['rescore_factor']}x" if row["rescore_factor"] else "-"
+        print(f"{row['mode']:<8} {rescore:>7} {row['bytes_per_vector']:>6} "
+              f"{row['scanned_mb']:>8.1f} {row['memory_saved']:>6.0%} {row[f'recall@{args.k}']:>7.3f} "
+              f"{row['p50_ms']:>7.2f} {row['p99_ms']:>7.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(store), "source": "synthetic" if args.synthetic else args.path,
+                       "model": EMBEDDING_MODEL_NAME, "k": args.k,
+                       "results": results}, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
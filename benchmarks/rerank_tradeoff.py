@@ -0,0 +1,110 @@
+"""
+Prompt tokens saved vs. latency added by the cross-encoder reranker.
+
+For every question, fetches a wide first-stage candidate set and compares
+two ways of getting better context into the prompt:
+
+- raising k: send all N first-stage candidates to the LLM;
+- reranking: score the N candidates and send only the best --top-n.
+
+Prints mean prompt tokens for both, the tokens saved and the rerank
+p50/p95 latency for each candidate-set size.
+
+Usage:
+    python benchmarks/rerank_tradeoff.py --candidates 10 25 50 --questions questions.txt
+    python benchmarks/rerank_tradeoff.py --fake   # sample passages, no Pinecone
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import RETRIEVER_K, RERANKER_MODEL_NAME
+from src.context_budget import count_tokens
+from src.reranker import CrossEncoderReranker, get_cross_encoder
+from src.sparse_index import build_retriever
+
+DEFAULT_QUESTIONS = [
+    "What are the symptoms of hypertension?",
+    "What is the first-line treatment for type 2 diabetes?",
+    "How does aspirin affect platelets?",
+    "What causes asthma attacks?",
+    "How is iron deficiency anaemia diagnosed?",
+    "Which antibiotics treat otitis media?",
+]
+
+
+def load_questions(path):
+    if not path:
+        return DEFAULT_QUESTIONS
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def context_tokens(documents):
+    return count_tokens("\n\n".join(doc.page_content for doc in documents))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--top-n", type=int, default=RETRIEVER_K)
+    parser.add_argument("--questions", help="Text file with one question per line")
+    parser.add_argument("--model", default=RERANKER_MODEL_NAME)
+    parser.add_argument("--fake", action="store_true", help="Use the local sample store instead of the configured one")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.fake:
+        from src.fakes import build_fake_vector_store
+        vector_store = build_fake_vector_store()
+    else:
+        from src.vector_store import get_vector_store
+        vector_store = get_vector_store()
+        if vector_store is None:
+            return
+
+    questions = load_questions(args.questions)
+    get_cross_encoder(args.model)  # Load outside the timed region
+    # No deadline here: measure the full scoring cost
+    reranker = CrossEncoderReranker(model_name=args.model, top_n=args.top_n, deadline_ms=None)
+
+    results = []
+    for n in args.candidates:
+        retriever = build_retriever(vector_store, k=n)
+        wide_tokens, reranked_tokens, latencies = [], [], []
+        for question in questions:
+            candidates = retriever.invoke(question)
+            start = time.perf_counter()
+            reranked = reranker.compress_documents(candidates, question)
+            latencies.append(time.perf_counter() - start)
+            wide_tokens.append(context_tokens(candidates))
+            reranked_tokens.append(context_tokens(reranked))
+        results.append({
+            "candidates": n,
+            "top_n": args.top_n,
+            "tokens_raise_k": float(np.mean(wide_tokens)),
+            "tokens_reranked": float(np.mean(reranked_tokens)),
+            "tokens_saved": float(np.mean(wide_tokens) - np.mean(reranked_tokens)),
+            "rerank_p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "rerank_p95_ms": float(np.percentile(latencies, 95) * 1000),
+        })
+
+    print(f"\n{len(questions)} questions, reranker {args.model}, top_n={args.top_n}")
+    print(f"{'N':>4} {'tokens@N':>9} {'reranked':>9} {'saved':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in results:
+        print(f"{row['candidates']:>4} {row['tokens_raise_k']:>9.0f} {row['tokens_reranked']:>9.0f} "
+              f"{row['tokens_saved']:>8.0f} {row['rerank_p50_ms']:>8.1f} {row['rerank_p95_ms']:>8.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"questions": len(questions), "model": args.model, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
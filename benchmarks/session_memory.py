@@ -0,0 +1,153 @@
+"""
+Load test: memory per concurrent Streamlit session, with per-session QA
+chains vs. the shared resource cache (src/resources.py).
+
+Simulates sessions the way streamlit_app.py holds them. Each session gets a
+QA chain, a ConversationMemory and its chat messages, then asks --turns
+questions through AsyncQueryEngine. The sessions of one step run
+concurrently and every session stays alive until the end. Two modes:
+
+- per-session   every session builds its own ResourceCache: its own vector
+                store (sqlite handle, memory map, keyword index if built) and LLM
+                client and chain, like st.session_state.qa_chain used to
+- shared        every session uses one process-wide ResourceCache
+
+The embedding model was already shared, so both modes use one set of fake
+embeddings. RSS is measured after every --step sessions. The first step also
+pays one-off costs (first scans of the index, per-thread allocator arenas
+holding scan buffers), so the memory cost of one extra session is the slope
+of a linear fit from the first step on. Each mode runs in a fresh process
+against the same synthetic local index (--vectors rows), with FakeLLM, so no
+keys or network are needed.
+
+Usage:
+    python benchmarks/session_memory.py --sessions 40 --step 5 --vectors 50000 --output sessions.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import PINECONE_DIMENSIONS
+from src.embeddings import current_rss_bytes
+
+QUESTIONS = [
+    "What is the first-line treatment for hypertension?",
+    "How does metformin lower blood glucose?",
+    "What are the side effects of its long-term use?",
+    "Which antibiotics are used for otitis media?",
+]
+MODES = ("per-session", "shared")
+
+
+def run_mode(mode, index_path, sessions, step, turns):
+    """Open sessions in steps and return (session count, RSS bytes) samples"""
+    from src.conversation import ConversationMemory
+    from src.fakes import FakeLLM, fake_embeddings
+    from src.local_store import LocalVectorStore
+    from src.query_engine import AsyncQueryEngine
+    from src.resources import ResourceCache
+
+    embeddings = fake_embeddings()
+    new_cache = lambda: ResourceCache(
+        build_embeddings=lambda: embeddings,
+        build_vector_store=lambda e: LocalVectorStore(index_path, e, PINECONE_DIMENSIONS),
+        build_llm=FakeLLM,
+    )
+    shared = new_cache()
+
+    def open_session(_):
+        # What a session keeps between reruns
+        session = {"messages": [], "conversation": ConversationMemory()}
+        if mode == "per-session":
+            session["resources"] = new_cache()
+        qa_chain = session.get("resources", shared).qa_chain.get()
+        engine = AsyncQueryEngine.from_chain(qa_chain)
+        for question in QUESTIONS[:turns]:
+            response = engine.run(question)
+            session["messages"] += [{"role": "user", "content": question},
+                                    {"role": "assistant", "content": response["result"]}]
+            session["conversation"].add_turn(question, response["result"])
+        return session
+
+    gc.collect()
+    samples = [(0, current_rss_bytes())]
+    open_sessions = []
+    with ThreadPoolExecutor(max_workers=step) as pool:
+        while len(open_sessions) < sessions:
+            open_sessions += pool.map(open_session, range(min(step, sessions - len(open_sessions))))
+            gc.collect()
+            samples.append((len(open_sessions), current_rss_bytes()))
+    return samples
+
+
+def fill_index(path, vectors):
+    from quantization_report import fill_synthetic
+    from src.local_store import LocalVectorStore
+    fill_synthetic(LocalVectorStore(path, embedding=None, dimensions=PINECONE_DIMENSIONS), vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--step", type=int, default=5, help="Sessions opened concurrently between measurements")
+    parser.add_argument("--turns", type=int, default=3, help="Questions asked per session")
+    parser.add_argument("--vectors", type=int, default=50000, help="Rows in the synthetic local index")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--index", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.mode:
+        # Child process: one mode, result on a tagged line (the pipeline prints progress too)
+        samples = run_mode(args.mode, args.index, args.sessions, args.step, args.turns)
+        print("SESSION_SAMPLES " + json.dumps(samples))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="rag_sessions_") as workdir:
+        index_path = os.path.join(workdir, "index")
+        print(f"Writing {args.vectors} synthetic vectors...")
+        fill_index(index_path, args.vectors)
+        for mode in MODES:
+            print(f"⏱️ {mode}: {args.sessions} sessions, {args.turns} questions each...")
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--mode", mode, "--index", index_path,
+                 "--sessions", str(args.sessions), "--step", str(args.step), "--turns", str(args.turns)],
+                capture_output=True, text=True,
+            )
+            lines = [line for line in completed.stdout.splitlines() if line.startswith("SESSION_SAMPLES ")]
+            if completed.returncode != 0 or not lines:
+                print(f"❌ {mode} run failed:\n{completed.stderr[-2000:]}")
+                return
+            samples = json.loads(lines[-1].split(" ", 1)[1])
+            counts, rss = np.array(samples, dtype=np.float64).T
+            slope = np.polyfit(counts[1:], rss[1:], 1)[0] if len(samples) > 2 else rss[-1] - rss[0]
+            results.append({"mode": mode, "samples": samples, "baseline_mb": rss[0] / 1e6,
+                            "first_step_mb": rss[1] / 1e6, "final_mb": rss[-1] / 1e6,
+                            "mb_per_session": slope / 1e6})
+
+    print(f"\n{args.sessions} sessions, {args.vectors} vectors, {args.turns} questions per session")
+    print(f"{'mode':<12} {'start MB':>9} {f'{args.step} sessions':>12} {'end MB':>8} {'MB/session':>11}")
+    for row in results:
+        print(f"{row['mode']:<12} {row['baseline_mb']:>9.0f} {row['first_step_mb']:>12.0f} "
+              f"{row['final_mb']:>8.0f} {row['mb_per_session']:>11.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"sessions": args.sessions, "step": args.step, "turns": args.turns,
+                       "vectors": args.vectors, "results": results}, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Startup-time benchmark for the Streamlit app.
+
+Each measurement runs in a fresh interpreter so nothing is already imported:
+
+- import config          seconds to import the settings module (what every script pays)
+- import app modules     seconds to import what streamlit_app.py imports at the top
+- first render           seconds for streamlit_app.py to run once in Streamlit's
+                         AppTest harness, i.e. until the first page is on screen
+
+Dummy API keys are set when none are configured so the full sidebar renders.
+The app runs against the local vector store by default, so the index check
+does not make the number depend on the network; use --backend pinecone to
+include it.
+
+Usage:
+    python benchmarks/startup_time.py --runs 5 --output startup.json
+    python benchmarks/startup_time.py --max-seconds 3   # exit 1 if first render is slower
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPETS = {
+    "import_config": "import config",
+    "import_app_modules": "import streamlit, config, src.startup",
+    "first_render": (
+        "import config\n"
+        "config.VECTOR_STORE_BACKEND = '{backend}'\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "at = AppTest.from_file('streamlit_app.py', default_timeout={timeout})\n"
+        "at.run()\n"
+        "assert not at.exception, at.exception\n"
+    ),
+}
+
+
+def time_snippet(code):
+    """Seconds to run ``code`` in a fresh interpreter, measured inside it"""
+    script = (
+        "import time\n"
+        "_start = time.perf_counter()\n"
+        f"{code}\n"
+        "print('STARTUP_SECONDS', time.perf_counter() - _start)\n"
+    )
+    env = dict(os.environ)
+    env.setdefault("PINECONE_API_KEY", "benchmark")
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    # The app's background preload prints progress to the same stdout
+    line = [line for line in output.splitlines() if line.startswith("STARTUP_SECONDS")][-1]
+    return float(line.split()[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--backend", default="local", choices=["local", "pinecone"],
+                        help="VECTOR_STORE_BACKEND used for the first render")
+    parser.add_argument("--timeout", type=float, default=60, help="AppTest script timeout in seconds")
+    parser.add_argument("--max-seconds", type=float, help="Fail if the median first render is slower")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in SNIPPETS.items():
+        samples = [time_snippet(code.format(timeout=args.timeout, backend=args.backend)) for _ in range(args.runs)]
+        results[name] = {
+            "median_seconds": statistics.median(samples),
+            "min_seconds": min(samples),
+            "max_seconds": max(samples),
+        }
+        print(f"⏱️ {name:<20} median {results[name]['median_seconds']:.3f}s "
+              f"(min {results[name]['min_seconds']:.3f}s, max {results[name]['max_seconds']:.3f}s)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "runs": args.runs,
+                "backend": args.backend,
+                "results": results,
+            }, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+    if args.max_seconds is not None and results["first_render"]["median_seconds"] > args.max_seconds:
+        print(f"❌ First render took longer than {args.max_seconds:.1f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Synthetic medical PDF corpus for offline benchmarks.
+
+Writes small, valid text PDFs (standard Helvetica font, no dependencies)
+filled with seeded, textbook-like sections about conditions, drugs and ICD
+codes, so the real loader and splitter can be benchmarked without shipping
+copyrighted textbooks.
+
+Usage:
+    python benchmarks/synthetic_corpus.py --output ./synthetic_corpus --docs 10 --pages 20
+"""
+
+import argparse
+import os
+import random
+import textwrap
+
+CONDITIONS = [
+    ("Hypertension", "I10"), ("Type 2 diabetes mellitus", "E11.9"), ("Asthma", "J45.909"),
+    ("Iron deficiency anaemia", "D50.9"), ("Community-acquired pneumonia", "J18.9"),
+    ("Atrial fibrillation", "I48.91"), ("Chronic kidney disease", "N18.9"), ("Hypothyroidism", "E03.9"),
+    ("Migraine", "G43.909"), ("Osteoarthritis", "M19.90"), ("Heart failure", "I50.9"),
+    ("Gastro-oesophageal reflux disease", "K21.9"), ("Major depressive disorder", "F32.9"),
+]
+DRUGS = [
+    "metformin", "lisinopril", "amlodipine", "salbutamol", "budesonide", "ferrous sulfate",
+    "amoxicillin", "apixaban", "levothyroxine", "sumatriptan", "paracetamol", "furosemide",
+    "omeprazole", "sertraline", "atorvastatin", "bisoprolol",
+]
+SYMPTOMS = [
+    "fatigue", "dyspnoea", "chest pain", "headache", "palpitations", "oedema", "cough", "fever",
+    "weight loss", "nausea", "dizziness", "polyuria", "wheeze", "joint stiffness",
+]
+SENTENCES = [
+    "{condition} (ICD-10 {code}) commonly presents with {symptom} and {symptom2}.",
+    "First-line management of {condition} includes {drug}, titrated to response.",
+    "Patients taking {drug} should be monitored for adverse effects such as {symptom}.",
+    "The differential diagnosis of {symptom} includes {condition} and several other disorders.",
+    "Combination therapy with {drug} and {drug2} is considered when monotherapy fails.",
+    "Renal function should be checked before starting {drug} in older adults.",
+    "Guidelines recommend reviewing {condition} at least every {months} months.",
+    "{drug} is contraindicated in pregnancy unless the benefit clearly outweighs the risk.",
+]
+
+
+def medical_paragraph(rng, sentences=6):
+    """A paragraph of seeded, plausible-sounding clinical text"""
+    parts = []
+    for _ in range(sentences):
+        condition, code = rng.choice(CONDITIONS)
+        parts.append(rng.choice(SENTENCES).format(
+            condition=condition, code=code,
+            symptom=rng.choice(SYMPTOMS), symptom2=rng.choice(SYMPTOMS),
+            drug=rng.choice(DRUGS), drug2=rng.choice(DRUGS), months=rng.choice([3, 6, 12]),
+        ))
+    return " ".join(parts)
+
+
+def page_lines(rng, page_number, paragraphs=4, width=95):
+    """Text lines for one page: a numbered section heading followed by paragraphs"""
+    condition, code = rng.choice(CONDITIONS)
+    lines = [f"{page_number}. {condition} ({code})", ""]
+    for _ in range(paragraphs):
+        lines.extend(textwrap.wrap(medical_paragraph(rng), width))
+        lines.append("")
+    return lines
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages):
+    """Write a minimal PDF with one text page per list of lines"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        text = ["BT", "/F1 9 Tf", "11 TL", "50 760 Td"]
+        text.extend(f"({_escape(line)}) Tj T*" for line in lines)
+        text.append("ET")
+        stream = "\n".join(text).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_corpus(directory, docs, pages_per_doc, seed=0):
+    """Write ``docs`` synthetic textbooks into ``directory``; returns their paths"""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for doc in range(docs):
+        path = os.path.join(directory, f"synthetic_textbook_{doc:04d}.pdf")
+        write_pdf(path, [page_lines(rng, page + 1) for page in range(pages_per_doc)])
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="./synthetic_corpus")
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20, help="Pages per document")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.output, args.docs, args.pages, args.seed)
+    print(f"✅ Wrote {len(paths)} PDFs ({args.docs * args.pages} pages) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
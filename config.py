@@ -3,12 +3,27 @@ Configuration settings for the Medical Chatbot
 """
 
 import os
-import streamlit as st
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables from .env file (for local development)
 load_dotenv()
 
+STREAMLIT_SECRETS_FILES = [
+    os.path.join(".streamlit", "secrets.toml"),
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+]
+
+def _streamlit():
+    """
+    Streamlit, without paying for its import in CLI scripts and the service:
+    reused when the app already imported it, else only loaded for a secrets file
+    """
+    st = sys.modules.get("streamlit")
+    if st is None and any(os.path.exists(path) for path in STREAMLIT_SECRETS_FILES):
+        import streamlit as st
+    return st
+
 def get_secret(key, default=None):
     """
     Get secret from Streamlit secrets or environment variables
@@ -16,6 +31,7 @@ def get_secret(key, default=None):
     """
     # Try Streamlit secrets first (for Streamlit Cloud)
     try:
+        st = _streamlit()
         if hasattr(st, 'secrets') and st.secrets:
             return st.secrets.get(key, default)
     except:
@@ -33,22 +49,132 @@ PINECONE_INDEX_NAME = "medical-knowledge-base"
 PINECONE_DIMENSIONS = 384  # For sentence-transformers/all-MiniLM-L6-v2
 PINECONE_METRIC = "cosine"
 
+# Vector Store Settings
+VECTOR_STORE_BACKEND = "pinecone"  # "pinecone" or "local" (memory-mapped on-disk index)
+LOCAL_INDEX_PATH = "./local_index"  # Directory for the local backend's files
+LOCAL_INDEX_TYPE = "exact"  # "exact" (brute-force scan) or "ivf" (approximate, build with: python -m src.ann_index)
+IVF_NLIST = 1024  # Number of k-means clusters (inverted lists)
+IVF_NPROBE = 16  # Clusters scanned per query; higher = better recall, slower
+IVF_TRAIN_SAMPLE_PER_LIST = 64  # Training vectors sampled per cluster
+IVF_KMEANS_ITERATIONS = 10
+LOCAL_INDEX_QUANTIZATION = "none"  # "none", "int8" (4x smaller) or "binary" (32x smaller); fit with: python -m src.quantization
+QUANTIZATION_RESCORE = True  # Re-rank quantized candidates with their float vectors
+QUANTIZATION_RESCORE_FACTOR = 4  # Candidates rescored per requested result
+QUANTIZATION_CALIBRATION_SAMPLE = 100000  # Vectors used to fit int8 ranges / binary thresholds
+INDEX_STATUS_TTL_SECONDS = 60  # How long cached index existence/vector count/dimension is reused
+INDEX_STATUS_RETRY_SECONDS = 10  # Retry sooner after a failed status check
+INDEX_STATUS_POLL_SECONDS = 2  # How often the Streamlit sidebar re-reads the cached status
+
 # Embedding Model Settings
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_WARMUP_TEXT = "What are the symptoms of hypertension?"  # Encoded once at model load
+EMBEDDING_CACHE_SIZE = 10000  # Embeddings kept in the in-memory LRU
+EMBEDDING_CACHE_PATH = ".embedding_cache.sqlite"  # On-disk embedding cache (None to disable)
+EMBEDDING_BATCH_SIZE = 64  # Chunks per encoder call during index builds
+EMBEDDING_WORKERS = 1  # Processes encoding chunks during index builds (each loads its own model)
 
 # Text Processing Settings
-CHUNK_SIZE = 500
+CHUNKER = "structured"  # "structured" (heading-aware, token-sized, src/chunker.py) or "recursive" (characters)
+CHUNK_SIZE = 500  # Characters per chunk for the recursive splitter
 CHUNK_OVERLAP = 20
+CHUNK_MAX_TOKENS = 128  # Embedding-model tokens per chunk (MiniLM was trained on 128-token inputs)
+CHUNK_OVERLAP_TOKENS = 20  # Trailing sentences carried into the next chunk, in tokens
+CHUNKER_WORKERS = os.cpu_count() or 1  # Processes chunking sources in parallel
 
 # LLM Settings
 LLM_MODEL = "gpt-3.5-turbo"
 LLM_TEMPERATURE = 0.1
+STREAMING_RESPONSES = True  # Show sources after retrieval, then stream answer tokens
 
 # Retrieval Settings
 RETRIEVER_K = 3  # Number of chunks to retrieve
+HYBRID_RETRIEVAL_ENABLED = True  # Fuse BM25 keyword hits with dense hits (needs the keyword index)
+SPARSE_INDEX_PATH = "./sparse_index"  # BM25 inverted index, built during ingestion
+HYBRID_CANDIDATE_K = 20  # Candidates taken from each retriever before fusion
+RRF_K = 60  # Reciprocal rank fusion constant
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Reranker Settings
+RERANKER_ENABLED = False  # Rerank a wide candidate set with a local cross-encoder (needs sentence-transformers)
+RERANKER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANKER_MAX_LENGTH = 256  # Max tokens per (question, chunk) pair
+RERANK_CANDIDATE_K = 50  # Candidates fetched for the reranker; the best RETRIEVER_K are kept
+RERANK_DEADLINE_MS = 300  # Fall back to first-stage order if scoring takes longer
+
+# Context Budget Settings
+CONTEXT_BUDGET_ENABLED = True  # De-duplicate, merge and trim retrieved chunks before the LLM call
+CONTEXT_TOKEN_BUDGET = 1200  # Max context tokens sent to the LLM
+CONTEXT_DEDUP_THRESHOLD = 0.8  # Estimated Jaccard similarity at which a chunk counts as a duplicate
+CONTEXT_SHINGLE_SIZE = 5  # Words per shingle
+CONTEXT_MINHASH_PERMUTATIONS = 64
+
+# Query Engine Settings
+QUERY_MAX_CONCURRENCY = 16  # Requests in flight at once per process
+QUERY_TIMEOUT_SECONDS = 60  # Per-request timeout
+QUERY_EMBED_THREADS = 4  # Threads used for query embedding
+EMBED_BATCH_MAX_SIZE = 32  # Max concurrent queries encoded in one call
+EMBED_BATCH_MAX_WAIT_MS = 5  # How long the batcher waits for more queries
+
+# Tracing Settings
+TRACING_ENABLED = True  # Per-stage latency histograms, token counts and cache hits
+TRACE_MAX_SAMPLES = 10000  # Latest durations kept per stage for percentiles
+TRACE_EXPORT_PATH = ".metrics.json"  # Snapshot rewritten by the metrics exporter (None to disable)
+TRACE_EXPORT_INTERVAL_SECONDS = 60
+TRACE_PROFILE_ENABLED = False  # cProfile a sample of requests and keep the slow ones
+TRACE_PROFILE_SAMPLE_RATE = 0.1
+TRACE_SLOW_REQUEST_SECONDS = 5.0
+TRACE_PROFILE_DIR = "./profiles"
+
+# Query Service Settings
+SERVICE_HOST = "0.0.0.0"
+SERVICE_PORT = 8000
+SERVICE_MAX_BATCH_QUERIES = 256
+
+# Batch QA Settings (batch_qa.py)
+BATCH_QA_BATCH_SIZE = 64  # Questions embedded per encoder call
+BATCH_QA_CONCURRENCY = 8  # Questions answered at once
+BATCH_QA_REQUESTS_PER_MINUTE = 300  # Questions started per minute, to stay under the LLM rate limit (0 = unlimited)
+
+# Shared Resource Settings
+RESOURCE_HEALTH_CHECK_SECONDS = 60  # How often the shared vector store, LLM client and QA chain are checked
+
+# Answer Cache Settings
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_THRESHOLD = 0.95  # Min cosine similarity between questions to reuse an answer
+ANSWER_CACHE_TTL_SECONDS = 3600
+ANSWER_CACHE_MAX_ENTRIES = 1000
+
+# Conversation Settings
+CONVERSATION_ENABLED = True  # Rewrite follow-ups into standalone retrieval queries using the chat history
+CONVERSATION_HISTORY_TOKENS = 800  # Summary + recent turns kept per session
+CONVERSATION_RECENT_TURNS = 2  # Latest turns kept verbatim; older ones are folded into the summary
+CONVERSATION_TOPIC_THRESHOLD = 0.8  # Min cosine similarity to the last retrieval query to reuse its chunks
 
 # File Paths
 PDF_DATA_PATH = "./"  # Directory containing PDF files
+INGESTION_MANIFEST_PATH = ".ingestion_manifest.json"  # Per-file and per-chunk content hashes
+
+# PDF Extraction Settings
+PDF_EXTRACTOR = "auto"  # "auto" (PyMuPDF if installed, else pypdf), "pymupdf" or "pypdf"; a change re-chunks every file
+PDF_EXTRACT_WORKERS = os.cpu_count() or 1  # Processes extracting page ranges of one large PDF
+PDF_PAGES_PER_TASK = 32  # Pages per extraction task
+PDF_TEXT_CACHE_PATH = ".pdf_text_cache"  # Extracted page text keyed by file hash (None to disable)
+
+# Ingestion Settings
+INGESTION_WORKERS = os.cpu_count() or 1  # Processes used to parse changed PDFs
+INGESTION_MODE = "incremental"  # "incremental" or "streaming" (bounded-memory full build)
+STREAMING_BATCH_SIZE = 64  # Chunks per embedding/upsert batch
+STREAMING_QUEUE_SIZE = 4  # Batches buffered between pipeline stages
+STREAMING_MEMORY_CEILING_MB = 2048  # Page reader pauses above this RSS
+
+# Bulk Upsert Settings
+BULK_UPSERT_BATCH_SIZE = 100  # Vectors per upsert request
+BULK_UPSERT_CONCURRENCY = 8  # Upsert requests in flight
+BULK_UPSERT_MAX_RETRIES = 5
+BULK_UPSERT_BACKOFF_SECONDS = 0.5  # Base delay, doubled after every failed attempt
+BULK_UPSERT_TRANSPORT = "grpc"  # "grpc" or "http" (pooled) for Pinecone bulk writes
+BULK_UPSERT_CHECKPOINT_PATH = ".upsert_checkpoint"  # Ids already upserted by an unfinished build
 
 # UI Settings
 PAGE_TITLE = "Medical Chatbot"
@@ -0,0 +1,142 @@
+"""
+Headless HTTP query service for the medical knowledge base.
+
+Serves the same RAG pipeline as the Streamlit app to other tools:
+
+    POST /query        {"query": "..."}
+    POST /query/batch  {"queries": ["...", "..."]}
+    GET  /health
+    GET  /metrics      per-stage latency percentiles, token counts, cache hits
+
+One engine is shared by all requests; concurrent query embeddings are
+micro-batched into a single encoder call. Run with --fake to use the local
+stand-in embeddings, vector store and LLM (no API keys needed).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify, request
+
+from config import (
+    OPENAI_API_KEY, LLM_MODEL, LLM_TEMPERATURE, RETRIEVER_K,
+    SERVICE_HOST, SERVICE_PORT, SERVICE_MAX_BATCH_QUERIES, CONTEXT_BUDGET_ENABLED
+)
+from src.context_budget import ContextBudgetCompressor
+from src.helper import format_response_with_sources
+from src.micro_batch import QueryEmbeddingBatcher
+from src.query_engine import AsyncQueryEngine
+from src.tracing import metrics_snapshot, start_metrics_exporter
+
+
+def build_engine(fake=False, micro_batch=True):
+    """
+    Create the shared query engine (live services, or offline stand-ins).
+    ``micro_batch=False`` leaves query batching to the caller (e.g. batch_qa.py).
+    """
+    wrap = QueryEmbeddingBatcher if micro_batch else (lambda model: model)
+    if fake:
+        from src.fakes import FakeLLM, build_fake_vector_store, fake_embeddings
+        embeddings = wrap(fake_embeddings())
+        vector_store = build_fake_vector_store(embeddings)
+        llm = FakeLLM()
+        compressor = ContextBudgetCompressor() if CONTEXT_BUDGET_ENABLED else None
+        return AsyncQueryEngine(embeddings=embeddings, vector_store=vector_store, llm=llm, k=RETRIEVER_K,
+                                compressor=compressor)
+
+    from langchain_openai import ChatOpenAI
+    from src.helper import download_hugging_face_model
+    from src.vector_store import open_vector_store, build_qa_retriever
+    embeddings = wrap(download_hugging_face_model())
+    vector_store = open_vector_store(embeddings)
+    llm = ChatOpenAI(model=LLM_MODEL, openai_api_key=OPENAI_API_KEY, temperature=LLM_TEMPERATURE)
+    # Same first-stage search, rerank and context budget as the Streamlit QA chain
+    return AsyncQueryEngine.from_retriever(build_qa_retriever(vector_store), llm, embeddings=embeddings)
+
+
+def serialize_response(response):
+    """Turn an engine response into JSON-friendly output"""
+    if isinstance(response, Exception):
+        return {"error": f"{type(response).__name__}: {response}"}
+    return {
+        "query": response["query"],
+        "result": response["result"],
+        "answer": format_response_with_sources(response),
+        "sources": [
+            {"source": doc.metadata.get("source"), "page": doc.metadata.get("page")}
+            for doc in response.get("source_documents", [])
+        ],
+        "cached": response.get("cached", False),
+        "timings": response.get("timings", {}),
+    }
+
+
+def create_app(engine):
+    """Flask app exposing the engine"""
+    app = Flask(__name__)
+
+    @app.get("/health")
+    def health():
+        stats = getattr(engine.embeddings, "stats", {})
+        return jsonify({"status": "ok", "embedding_batches": stats})
+
+    @app.get("/metrics")
+    def metrics():
+        return jsonify(metrics_snapshot())
+
+    @app.post("/query")
+    def query():
+        payload = request.get_json(silent=True) or {}
+        text = payload.get("query")
+        if not isinstance(text, str) or not text.strip():
+            return jsonify({"error": "Body must be JSON with a non-empty 'query' string"}), 400
+
+        start = time.perf_counter()
+        try:
+            response = engine.run(text)
+        except Exception as e:
+            return jsonify({"error": f"{type(e).__name__}: {e}"}), 500
+        body = serialize_response(response)
+        body["timings"]["request_seconds"] = time.perf_counter() - start
+        return jsonify(body)
+
+    @app.post("/query/batch")
+    def query_batch():
+        payload = request.get_json(silent=True) or {}
+        queries = payload.get("queries")
+        if not isinstance(queries, list) or not all(isinstance(q, str) and q.strip() for q in queries):
+            return jsonify({"error": "Body must be JSON with a 'queries' list of non-empty strings"}), 400
+        if len(queries) > SERVICE_MAX_BATCH_QUERIES:
+            return jsonify({"error": f"At most {SERVICE_MAX_BATCH_QUERIES} queries per batch"}), 400
+
+        start = time.perf_counter()
+        responses = engine.run_many(queries)
+        return jsonify({
+            "results": [serialize_response(response) for response in responses],
+            "timings": {"request_seconds": time.perf_counter() - start},
+        })
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Medical chatbot query service")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--fake", action="store_true", help="Use local stand-ins instead of Pinecone/OpenAI")
+    args = parser.parse_args()
+
+    print("🏥 Medical Knowledge Query Service")
+    print("=" * 50)
+    engine = build_engine(fake=args.fake)
+    start_metrics_exporter()
+    app = create_app(engine)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
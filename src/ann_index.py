@@ -0,0 +1,140 @@
+"""
+Approximate nearest-neighbour (IVF) index for the local vector store.
+
+Vectors are clustered with spherical k-means; each query scores only the
+rows in its ``nprobe`` closest clusters instead of the whole matrix. The
+centroids and inverted lists are plain .npy files, memory-mapped on load.
+Rows added after the index was built are scanned exactly until the next
+rebuild.
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import IVF_NLIST, IVF_NPROBE, IVF_TRAIN_SAMPLE_PER_LIST, IVF_KMEANS_ITERATIONS
+from src.local_store import normalize_rows, save_array, top_k_indices
+
+CENTROIDS_FILE = "ivf_centroids.npy"
+LIST_OFFSETS_FILE = "ivf_offsets.npy"
+LIST_ROWS_FILE = "ivf_rows.npy"
+IVF_INFO_FILE = "ivf.json"
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=IVF_KMEANS_ITERATIONS, seed=0):
+    """Cluster unit vectors by cosine similarity; returns normalized centroids"""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, vectors.shape[0])
+    centroids = vectors[rng.choice(vectors.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        if empty.any():
+            # Re-seed empty clusters with random points
+            sums[empty] = vectors[rng.choice(vectors.shape[0], int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def _assign_in_blocks(vectors, centroids, block_rows=65536):
+    """Nearest centroid for every row, computed block by block"""
+    assignment = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], block_rows):
+        stop = min(start + block_rows, vectors.shape[0])
+        assignment[start:stop] = np.argmax(np.asarray(vectors[start:stop]) @ centroids.T, axis=1)
+    return assignment
+
+
+class IVFIndex:
+    """Inverted-file index over the rows of a LocalVectorStore matrix"""
+
+    def __init__(self, centroids, offsets, rows, trained_count, nprobe=IVF_NPROBE):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.trained_count = trained_count
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, store, nlist=IVF_NLIST, sample_per_list=IVF_TRAIN_SAMPLE_PER_LIST, seed=0):
+        """Train centroids on a sample of the store's vectors and write the lists to disk"""
+        count = store._count
+        if count == 0:
+            raise ValueError("Cannot build an IVF index over an empty store")
+        vectors = store._vectors[:count]
+        nlist = max(1, min(nlist, count))
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(count, nlist * sample_per_list)
+        sample_rows = np.sort(rng.choice(count, sample_size, replace=False))
+        centroids = spherical_kmeans(np.asarray(vectors[sample_rows]), nlist, seed=seed)
+
+        assignment = _assign_in_blocks(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=len(centroids)), out=offsets[1:])
+
+        # Stores that already loaded the index keep searching their mapped copy
+        save_array(os.path.join(store.path, CENTROIDS_FILE), centroids.astype(np.float32))
+        save_array(os.path.join(store.path, LIST_OFFSETS_FILE), offsets)
+        save_array(os.path.join(store.path, LIST_ROWS_FILE), order.astype(np.int64))
+        info_path = os.path.join(store.path, IVF_INFO_FILE)
+        with open(f"{info_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"nlist": len(centroids), "trained_count": count}, f)
+        os.replace(f"{info_path}.tmp", info_path)
+        return cls.load(store.path)
+
+    @classmethod
+    def load(cls, path, nprobe=IVF_NPROBE):
+        """Memory-map a previously built index, or return None if there is none"""
+        info_path = os.path.join(path, IVF_INFO_FILE)
+        if not os.path.exists(info_path):
+            return None
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        return cls(
+            centroids=np.load(os.path.join(path, CENTROIDS_FILE), mmap_mode="r"),
+            offsets=np.load(os.path.join(path, LIST_OFFSETS_FILE), mmap_mode="r"),
+            rows=np.load(os.path.join(path, LIST_ROWS_FILE), mmap_mode="r"),
+            trained_count=info["trained_count"],
+            nprobe=nprobe,
+        )
+
+    def candidate_rows(self, query, nprobe=None):
+        """Rows in the nprobe clusters closest to the (normalized) query"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        lists = top_k_indices(self.centroids @ query, nprobe)
+        return np.concatenate(
+            [self.rows[self.offsets[i]:self.offsets[i + 1]] for i in lists]
+        )
+
+    def search(self, store, query_vector, k, nprobe=None):
+        """Approximate cosine top-k; returns (rows, scores), best first"""
+        query = normalize_rows(query_vector)
+        rows = self.candidate_rows(query, nprobe)
+        if store._count > self.trained_count:
+            # Rows appended since the last build are not in any list yet
+            rows = np.concatenate([rows, np.arange(self.trained_count, store._count)])
+        rows = np.sort(rows)  # Sequential access pattern on the memory map
+        scores = store._vectors[rows] @ query
+        scores[~store._live[rows]] = -np.inf
+        best = top_k_indices(scores, k)
+        rows, scores = rows[best], scores[best]
+        finite = np.isfinite(scores)
+        return rows[finite], scores[finite]
+
+
+if __name__ == "__main__":
+    from config import LOCAL_INDEX_PATH, PINECONE_DIMENSIONS
+    from src.local_store import LocalVectorStore
+
+    store = LocalVectorStore(LOCAL_INDEX_PATH, embedding=None, dimensions=PINECONE_DIMENSIONS)
+    print(f"Building IVF index over {len(store)} vectors...")
+    index = IVFIndex.build(store)
+    print(f"✅ IVF index with {len(index.centroids)} lists written to {LOCAL_INDEX_PATH}")
@@ -0,0 +1,166 @@
+"""
+Semantic answer cache in front of the QA chain.
+
+A question whose embedding is close enough (cosine similarity above a
+threshold) to a previously answered one gets the stored result and
+source documents back without retrieval or an LLM call. Entries expire
+after a TTL, the least recently used entry is evicted when the cache is
+full, and everything is dropped when the index content changes.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES,
+    INGESTION_MANIFEST_PATH
+)
+from src.local_store import normalize_rows
+from src.tracing import increment
+
+
+def manifest_index_version(path=INGESTION_MANIFEST_PATH):
+    """
+    Cheap token that changes whenever ingestion rewrites the manifest.
+
+    Every sync or streaming build saves the manifest, so a different
+    mtime/size means the index content may have changed.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class SemanticAnswerCache:
+    """Thread-safe LRU + TTL cache of QA responses keyed by query embedding"""
+
+    def __init__(self, embeddings, threshold=ANSWER_CACHE_THRESHOLD,
+                 ttl_seconds=ANSWER_CACHE_TTL_SECONDS, max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                 index_version=manifest_index_version):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._index_version_fn = index_version
+        self._index_version = index_version()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (vector, response, created_at)
+        self._next_key = 0
+        self._matrix = None  # Stacked entry vectors, rebuilt lazily
+        self._matrix_keys = []
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _check_index_version(self):
+        version = self._index_version_fn()
+        if version != self._index_version:
+            if self._entries:
+                self.stats["invalidations"] += 1
+            self._entries.clear()
+            self._matrix = None
+            self._index_version = version
+
+    def _expire(self, now):
+        expired = [key for key, (_, _, created) in self._entries.items()
+                   if now - created > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self.stats["expirations"] += len(expired)
+            self._matrix = None
+
+    def _best_match(self, vector):
+        if not self._entries:
+            return None, -1.0
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key][0] for key in self._matrix_keys])
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self._matrix_keys[best], float(scores[best])
+
+    def embed(self, query):
+        """Normalized query embedding used for lookups and inserts"""
+        return normalize_rows(self.embeddings.embed_query(query))
+
+    def lookup(self, query, vector=None):
+        """Return a cached response for a similar query, or None"""
+        vector = self.embed(query) if vector is None else vector
+        with self._lock:
+            self._check_index_version()
+            self._expire(time.time())
+            key, score = self._best_match(vector)
+            if key is None or score < self.threshold:
+                self.stats["misses"] += 1
+                increment("answer_cache.misses")
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            increment("answer_cache.hits")
+            return self._entries[key][1]
+
+    def store(self, query, response, vector=None):
+        """Remember the response for this query, evicting the LRU entry if full"""
+        vector = self.embed(query) if vector is None else vector
+        with self._lock:
+            self._check_index_version()
+            self._entries[self._next_key] = (vector, response, time.time())
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CachedQAChain:
+    """Wraps a QA chain so ``invoke({"query": ...})`` goes through the answer cache"""
+
+    def __init__(self, qa_chain, cache):
+        self.qa_chain = qa_chain
+        self.cache = cache
+
+    def invoke(self, inputs, **kwargs):
+        query = inputs["query"]
+        vector = self.cache.embed(query)
+        cached = self.cache.lookup(query, vector=vector)
+        if cached is not None:
+            return {**cached, "query": query, "cached": True}
+        response = self.qa_chain.invoke(inputs, **kwargs)
+        self.cache.store(query, response, vector=vector)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.qa_chain, name)
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_answer_cache(embeddings):
+    """Process-wide cache so every session benefits from earlier answers"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = SemanticAnswerCache(embeddings)
+        return _shared_cache
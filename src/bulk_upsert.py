@@ -0,0 +1,209 @@
+"""
+Concurrent, retrying bulk upsert of pre-computed embeddings.
+
+Vectors are sent in fixed-size batches by a pool of threads sharing one
+pooled index connection. Failed batches are retried with exponential
+backoff, and the ids of every batch that made it are appended to a
+checkpoint file so a crashed build can resume without re-sending them. The
+checkpoint names the index it was written for and is ignored for any other.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    BULK_UPSERT_BATCH_SIZE, BULK_UPSERT_CONCURRENCY, BULK_UPSERT_MAX_RETRIES,
+    BULK_UPSERT_BACKOFF_SECONDS, BULK_UPSERT_CHECKPOINT_PATH
+)
+from src.tracing import increment, trace
+
+_CHECKPOINT_HEADER = "#target\t"
+
+
+def pinecone_upsert_fn(index, text_key="text", namespace=None):
+    """Upsert function writing (id, vector, metadata) tuples to a Pinecone index"""
+    def upsert(ids, texts, vectors, metadatas):
+        index.upsert(
+            vectors=[
+                (chunk_id, list(vector), {**metadata, text_key: text})
+                for chunk_id, text, vector, metadata in zip(ids, texts, vectors, metadatas)
+            ],
+            namespace=namespace,
+        )
+    return upsert
+
+
+def vector_store_upsert_fn(vector_store):
+    """Upsert function for any store with add_embeddings (e.g. LocalVectorStore)"""
+    def upsert(ids, texts, vectors, metadatas):
+        vector_store.add_embeddings(
+            text_embeddings=list(zip(texts, vectors)), metadatas=metadatas, ids=ids
+        )
+    return upsert
+
+
+class BulkUpserter:
+    """Sends vector batches concurrently with retries, checkpoints and throughput stats"""
+
+    def __init__(self, upsert_fn, batch_size=BULK_UPSERT_BATCH_SIZE,
+                 concurrency=BULK_UPSERT_CONCURRENCY, max_retries=BULK_UPSERT_MAX_RETRIES,
+                 backoff_seconds=BULK_UPSERT_BACKOFF_SECONDS,
+                 checkpoint_path=BULK_UPSERT_CHECKPOINT_PATH, target=None):
+        self.upsert_fn = upsert_fn
+        # Backend and index the checkpointed ids were upserted to, e.g. "pinecone:medical-chatbot"
+        self.target = target or "unknown"
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.checkpoint_path = checkpoint_path
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-upsert")
+        # Bound in-flight batches so callers cannot queue unlimited vectors in memory
+        self._slots = threading.BoundedSemaphore(concurrency * 2)
+        self._lock = threading.Lock()
+        self._futures = set()
+        self._done_ids = self._load_checkpoint()
+        self._in_flight = 0
+        self._busy_since = None
+        self.stats = {"vectors": 0, "batches": 0, "retries": 0, "skipped": 0, "seconds": 0.0}
+
+    @classmethod
+    def for_vector_store(cls, vector_store, **kwargs):
+        """Pick the upsert path for a vector store, using a pooled Pinecone connection if needed"""
+        if hasattr(vector_store, "add_embeddings"):
+            path = getattr(vector_store, "path", None)
+            kwargs.setdefault("target", f"local:{os.path.abspath(path)}" if path else None)
+            return cls(vector_store_upsert_fn(vector_store), **kwargs)
+
+        from config import PINECONE_INDEX_NAME
+        from src.vector_store import get_pinecone_index
+        concurrency = kwargs.get("concurrency", BULK_UPSERT_CONCURRENCY)
+        index = get_pinecone_index(PINECONE_INDEX_NAME, pool_threads=concurrency)
+        namespace = getattr(vector_store, "_namespace", None)
+        kwargs.setdefault("target", f"pinecone:{PINECONE_INDEX_NAME}" + (f"/{namespace}" if namespace else ""))
+        return cls(
+            pinecone_upsert_fn(
+                index,
+                text_key=getattr(vector_store, "_text_key", "text"),
+                namespace=namespace,
+            ),
+            **kwargs,
+        )
+
+    # Checkpoint ------------------------------------------------------------
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            header = f.readline().rstrip("\n")
+            done = {line.strip() for line in f if line.strip()}
+        if header != _CHECKPOINT_HEADER + self.target:
+            # Chunk ids are content hashes and recur across indexes: another index's ids prove nothing here
+            print(f"⚠️ Upload checkpoint is not for {self.target}, starting the upload from scratch")
+            os.remove(self.checkpoint_path)
+            return set()
+        if done:
+            print(f"↩️ Resuming upload: {len(done)} vectors already upserted")
+        return done
+
+    def _record_checkpoint(self, ids):
+        with self._lock:
+            self._done_ids.update(ids)
+            if self.checkpoint_path:
+                new_file = not os.path.exists(self.checkpoint_path)
+                with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                    if new_file:
+                        f.write(_CHECKPOINT_HEADER + self.target + "\n")
+                    f.write("\n".join(ids) + "\n")
+
+    def clear_checkpoint(self):
+        """Forget progress once a build has completed successfully"""
+        with self._lock:
+            self._done_ids.clear()
+            if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+
+    # Upload ----------------------------------------------------------------
+
+    def _send(self, ids, texts, vectors, metadatas):
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with trace("ingest.upsert_request"):
+                        self.upsert_fn(ids, texts, vectors, metadatas)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+                    with self._lock:
+                        self.stats["retries"] += 1
+                    increment("upsert.retries")
+                    print(f"⚠️ Upsert of {len(ids)} vectors failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+            self._record_checkpoint(ids)
+            with self._lock:
+                self.stats["vectors"] += len(ids)
+                self.stats["batches"] += 1
+        finally:
+            with self._lock:
+                # Throughput counts only time with at least one batch in flight
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self.stats["seconds"] += time.perf_counter() - self._busy_since
+            self._slots.release()
+
+    def submit(self, ids, texts, vectors, metadatas):
+        """Queue vectors for upload without waiting; ids already checkpointed are skipped"""
+        pending = [
+            item for item in zip(ids, texts, vectors, metadatas)
+            if item[0] not in self._done_ids
+        ]
+        with self._lock:
+            self.stats["skipped"] += len(ids) - len(pending)
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            self._slots.acquire()
+            with self._lock:
+                if self._in_flight == 0:
+                    self._busy_since = time.perf_counter()
+                self._in_flight += 1
+            future = self._executor.submit(self._send, *[list(column) for column in zip(*batch)])
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(self._discard_future)
+
+    def _discard_future(self, future):
+        # Failed batches stay until flush() has raised their error
+        if future.exception() is None:
+            with self._lock:
+                self._futures.discard(future)
+
+    def flush(self):
+        """Wait for every queued batch; raises the first upload error (each error once)"""
+        with self._lock:
+            futures = set(self._futures)
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = [future for future in done if future.exception() is not None]
+        if failed:
+            with self._lock:
+                self._futures.difference_update(failed)
+            raise failed[0].exception()
+
+    def upsert(self, ids, texts, vectors, metadatas):
+        """Upload vectors and wait for them"""
+        self.submit(ids, texts, vectors, metadatas)
+        self.flush()
+
+    def vectors_per_second(self):
+        return self.stats["vectors"] / self.stats["seconds"] if self.stats["seconds"] else 0.0
+
+    def close(self):
+        self._executor.shutdown(wait=True)
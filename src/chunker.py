@@ -0,0 +1,244 @@
+"""
+Structure-aware, token-sized chunking of PDF pages.
+
+Pages of one source are read in order and broken into blocks: headings,
+paragraphs and table-like runs of lines. A heading starts a new section and
+sections continue across page breaks, so a paragraph split by a page break
+is rejoined instead of being cut. Within a section, whole blocks are packed
+greedily into chunks of at most CHUNK_MAX_TOKENS tokens of the embedding
+model's tokenizer. A block is split only when it is larger than a chunk:
+paragraphs at sentence boundaries, tables between rows. Each chunk is
+prefixed with its section heading and starts with up to
+CHUNK_OVERLAP_TOKENS of trailing sentences from the previous chunk.
+
+Token counts for all blocks of a source are computed in one batched
+tokenizer call. Sources are chunked in parallel in a process pool.
+"""
+
+import math
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    EMBEDDING_MODEL_NAME, CHUNKER, CHUNK_SIZE, CHUNK_OVERLAP,
+    CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNKER_WORKERS
+)
+
+_NUMBERED_HEADING_RE = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.|chapter\s+\d+|section\s+\d+)\s+\S", re.I)
+_TABLE_GAP_RE = re.compile(r"\S(?: {2,}|\t)\S")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Za-z0-9(\"'])")
+# Byte classes for the vectorized token estimate; bytes >= 128 (UTF-8 sequences) count as word characters
+_WORD_BYTES = np.array([chr(b).isalnum() or b == ord("_") or b >= 128 for b in range(256)])
+_SPACE_BYTES = np.array([chr(b).isspace() for b in range(256)])
+
+
+def chunker_settings():
+    """Settings that determine the chunks, recorded in the ingestion manifest"""
+    # Backends extract different page text, so switching them re-chunks every file
+    from src.pdf_extract import resolve_extractor
+    if CHUNKER == "recursive":
+        settings = {"chunker": "recursive", "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+    else:
+        settings = {"chunker": "structured", "model": EMBEDDING_MODEL_NAME,
+                    "max_tokens": CHUNK_MAX_TOKENS, "overlap_tokens": CHUNK_OVERLAP_TOKENS}
+    return {**settings, "extractor": resolve_extractor()}
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model_name=EMBEDDING_MODEL_NAME):
+    """The embedding model's tokenizer, or None if it cannot be loaded (token counts are then estimated)"""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name)
+    except Exception as e:
+        print(f"⚠️ Tokenizer for {model_name} unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens_batch(texts, model_name=EMBEDDING_MODEL_NAME):
+    """Token counts (without special tokens) for many texts in one tokenizer call"""
+    if not texts:
+        return np.zeros(0, dtype=np.int64)
+    tokenizer = get_tokenizer(model_name)
+    if tokenizer is not None:
+        encoded = tokenizer(list(texts), add_special_tokens=False,
+                            return_attention_mask=False, return_token_type_ids=False)
+        return np.array([len(ids) for ids in encoded["input_ids"]], dtype=np.int64)
+    return estimate_tokens_batch(texts)
+
+
+def estimate_tokens_batch(texts):
+    """
+    WordPiece-like token estimate for many texts at once: one token per
+    punctuation mark and per word, plus one for every further ~6 characters
+    of a long word. Works on the concatenated UTF-8 bytes with NumPy.
+    """
+    encoded = [text.encode("utf-8") for text in texts]
+    starts = np.cumsum([0] + [len(data) + 1 for data in encoded[:-1]])
+    data = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+    word = _WORD_BYTES[data]
+    punctuation = ~word & ~_SPACE_BYTES[data]
+
+    padded = np.concatenate([[False], word, [False]])
+    run_starts = np.flatnonzero(padded[1:-1] & ~padded[:-2])
+    run_ends = np.flatnonzero(padded[1:-1] & ~padded[2:])
+    run_tokens = 1 + (run_ends - run_starts) // 6
+
+    owner = lambda positions: np.searchsorted(starts, positions, side="right") - 1
+    counts = np.bincount(owner(run_starts), weights=run_tokens, minlength=len(texts))
+    counts += np.bincount(owner(np.flatnonzero(punctuation)), minlength=len(texts))
+    return counts.astype(np.int64)
+
+
+def is_heading(line):
+    """Numbered, ALL CAPS or Title Case short lines that do not end like a sentence"""
+    if len(line) > 80 or line[-1] in ".,;:" or len(line.split()) > 12:
+        return False
+    if _NUMBERED_HEADING_RE.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 4 and all(c.isupper() for c in letters):
+        return True
+    words = [word for word in line.split() if len(word) >= 4]
+    return 2 <= len(line.split()) <= 8 and len(words) >= 2 and all(word[0].isupper() for word in words)
+
+
+def is_table_row(line):
+    return line.count("|") >= 2 or len(_TABLE_GAP_RE.findall(line)) >= 2
+
+
+def split_blocks(text):
+    """
+    Break page text into ("heading" | "paragraph" | "table", text) blocks.
+
+    PDF text extraction rarely keeps blank lines, so a paragraph also ends at
+    a line that finishes a sentence well short of the page's typical width.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    widths = np.array([len(line) for line in lines if line])
+    short_line = np.median(widths) * 0.8 if len(widths) else 0
+    blocks, current, kind = [], [], None
+
+    def flush():
+        nonlocal current, kind
+        if current:
+            joiner = "\n" if kind == "table" else " "
+            blocks.append((kind, joiner.join(current)))
+        current, kind = [], None
+
+    for line in lines:
+        if not line:
+            flush()
+        elif is_table_row(line):
+            if kind != "table":
+                flush()
+            kind = "table"
+            current.append(line)
+        elif is_heading(line) and kind != "table":
+            flush()
+            blocks.append(("heading", line))
+        else:
+            if kind == "table":
+                flush()
+            kind = "paragraph"
+            current.append(line)
+            if line[-1] in ".!?:" and len(line) < short_line:
+                flush()
+    flush()
+    return blocks
+
+
+def _split_large(kind, text, max_tokens):
+    """Pieces of an oversized block: sentences or table rows, then word windows"""
+    pieces = text.split("\n") if kind == "table" else _SENTENCE_END_RE.split(text)
+    counts = count_tokens_batch(pieces)
+    split = []
+    for piece, count in zip(pieces, counts):
+        if count <= max_tokens:
+            split.append((piece, int(count)))
+            continue
+        words = piece.split()
+        windows = math.ceil(count / max_tokens)
+        size = math.ceil(len(words) / windows)
+        for start in range(0, len(words), size):
+            window = " ".join(words[start:start + size])
+            split.append((window, int(count_tokens_batch([window])[0])))
+    return split
+
+
+def chunk_source(pages, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Chunk the pages of one source (in page order) into Documents"""
+    # (kind, text, page metadata) for every block on every page, then one batched token count
+    blocks = [(kind, text, page.metadata) for page in pages for kind, text in split_blocks(page.page_content)]
+    counts = count_tokens_batch([text for _, text, _ in blocks])
+
+    chunks = []
+    heading, heading_tokens = None, 0
+    units, unit_tokens = [], 0  # Pieces of the chunk being packed: (text, tokens, metadata, joiner)
+
+    def emit():
+        nonlocal units, unit_tokens
+        if not units:
+            return
+        body = "".join((joiner if i else "") + text for i, (text, _, _, joiner) in enumerate(units))
+        metadata = dict(units[0][2])
+        if heading:
+            metadata["section"] = heading
+        chunks.append(Document(page_content=f"{heading}\n{body}" if heading else body, metadata=metadata))
+        # Carry trailing sentences of this chunk into the next one
+        carried, carried_tokens = [], 0
+        for unit in reversed(units):
+            if carried_tokens + unit[1] > overlap_tokens:
+                break
+            carried.insert(0, unit)
+            carried_tokens += unit[1]
+        units, unit_tokens = carried, carried_tokens
+
+    for (kind, text, metadata), count in zip(blocks, counts):
+        if kind == "heading":
+            emit()
+            units, unit_tokens = [], 0
+            heading, heading_tokens = text, int(count) + 1
+            continue
+        budget = max(max_tokens - heading_tokens, 1)
+        joiner = "\n" if kind == "table" else "\n\n"
+        pieces = [(text, int(count))] if count <= budget else _split_large(kind, text, budget)
+        for i, (piece, piece_tokens) in enumerate(pieces):
+            if units and unit_tokens + piece_tokens > budget:
+                emit()
+                if unit_tokens + piece_tokens > budget:
+                    units, unit_tokens = [], 0
+            # Sentences of one paragraph are rejoined with a space, rows of one table with a newline
+            piece_joiner = joiner if i == 0 else ("\n" if kind == "table" else " ")
+            units.append((piece, piece_tokens, metadata, piece_joiner))
+            unit_tokens += piece_tokens
+    emit()
+    return chunks
+
+
+def chunk_documents(documents, workers=CHUNKER_WORKERS, max_tokens=CHUNK_MAX_TOKENS,
+                    overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Chunk pages from any number of sources, one source per worker process"""
+    sources = {}
+    for document in documents:
+        sources.setdefault(document.metadata.get("source"), []).append(document)
+    groups = [sorted(pages, key=lambda page: page.metadata.get("page", 0)) for pages in sources.values()]
+
+    if workers <= 1 or len(groups) <= 1:
+        results = [chunk_source(pages, max_tokens, overlap_tokens) for pages in groups]
+    else:
+        # spawn: ingestion can run in a process that already initialised torch, where fork can deadlock
+        with ProcessPoolExecutor(max_workers=min(workers, len(groups)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(chunk_source, groups, [max_tokens] * len(groups),
+                                    [overlap_tokens] * len(groups)))
+    return [chunk for chunks in results for chunk in chunks]
@@ -0,0 +1,215 @@
+"""
+Context budget manager: shrink retrieved chunks before the LLM call.
+
+Runs as a document compressor behind the retriever, in three steps:
+
+1. near-duplicate removal: chunks whose word-shingle MinHash signatures
+   agree above a threshold are dropped, keeping the better-ranked one;
+2. adjacent-chunk merging: a chunk that starts with the tail of another
+   chunk from the same source and section (the trailing sentences the
+   structured chunker carries over, or the recursive splitter's overlap) is
+   appended to it, so the shared text and the section heading are sent once;
+3. sentence trimming: when the context is still over the token budget, the
+   sentences that share the fewest terms with the question are dropped.
+
+Tokens before and after are logged for every query.
+"""
+
+import os
+import re
+import sys
+import threading
+import zlib
+from typing import Optional, Sequence
+
+import numpy as np
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from pydantic import Field, PrivateAttr
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    LLM_MODEL, CHUNK_OVERLAP, CONTEXT_TOKEN_BUDGET,
+    CONTEXT_DEDUP_THRESHOLD, CONTEXT_SHINGLE_SIZE, CONTEXT_MINHASH_PERMUTATIONS
+)
+from src.sparse_index import tokenize
+from src.tracing import increment, trace
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_UNIT_END = re.compile(r"[.!?](?=\s)|\n")  # Where a carried-over sentence or table row can end
+_MIN_MERGE_OVERLAP = 10  # Shorter suffix/prefix matches are treated as coincidence
+_encoding = None
+
+
+def count_tokens(text):
+    """Token count under the LLM's tokenizer (about 4 characters per token without tiktoken)"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model(LLM_MODEL)
+        except Exception:
+            # Not installed, unknown model, or the encoding file cannot be downloaded
+            _encoding = False
+    if _encoding is False:
+        return max(1, len(text) // 4)
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def minhash_signature(text, shingle_size=CONTEXT_SHINGLE_SIZE, permutations=CONTEXT_MINHASH_PERMUTATIONS):
+    """MinHash signature of a text's word shingles"""
+    words = tokenize(text)
+    shingles = {" ".join(words[i:i + shingle_size])
+                for i in range(max(1, len(words) - shingle_size + 1))}
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+    rng = np.random.default_rng(permutations)  # Same permutations for every call
+    a = rng.integers(1, _MERSENNE_PRIME, size=permutations, dtype=np.uint64)
+    b = rng.integers(0, _MERSENNE_PRIME, size=permutations, dtype=np.uint64)
+    # (a * h + b) mod p, one row per permutation; uint64 wrap-around is fine for hashing
+    return ((np.outer(a, hashes) + b[:, None]) % np.uint64(_MERSENNE_PRIME)).min(axis=1)
+
+
+def remove_near_duplicates(documents, threshold=CONTEXT_DEDUP_THRESHOLD):
+    """Drop documents whose estimated Jaccard similarity to a better-ranked one reaches the threshold"""
+    kept, signatures = [], []
+    for doc in documents:
+        signature = minhash_signature(doc.page_content)
+        if any(np.mean(signature == other) >= threshold for other in signatures):
+            continue
+        kept.append(doc)
+        signatures.append(signature)
+    return kept
+
+
+def _overlap_length(head, tail, max_overlap):
+    """Length of the longest suffix of ``head`` that is also a prefix of ``tail``"""
+    for length in range(min(max_overlap, len(head), len(tail)), _MIN_MERGE_OVERLAP - 1, -1):
+        if head.endswith(tail[:length]):
+            return length
+    return 0
+
+
+def _sentence_overlap_length(head, tail):
+    """Length of the longest run of whole sentences (or rows) that ends ``head`` and starts ``tail``"""
+    ends = [match.end() for match in _UNIT_END.finditer(tail)] + [len(tail)]
+    for length in reversed(ends):
+        if (_MIN_MERGE_OVERLAP <= length <= len(head) and head.endswith(tail[:length])
+                and (length == len(head) or head[-length - 1].isspace())):
+            return length
+    return 0
+
+
+def _body(doc):
+    """Chunk text without the section heading the structured chunker puts in front"""
+    section = doc.metadata.get("section")
+    if section and doc.page_content.startswith(section + "\n"):
+        return doc.page_content[len(section) + 1:]
+    return doc.page_content
+
+
+def _merged_metadata(first, head, tail):
+    """The better-ranked chunk's metadata, starting at the first page and recording the last"""
+    metadata = dict(first.metadata)
+    pages = [doc.metadata["page"] for doc in (head, tail) if doc.metadata.get("page") is not None]
+    if pages:
+        first_page = head if head.metadata.get("page") == min(pages) else tail
+        metadata["page"] = min(pages)
+        if "page_label" in first_page.metadata:
+            metadata["page_label"] = first_page.metadata["page_label"]
+        last_page = max(pages + [head.metadata.get("last_page", min(pages)),
+                                 tail.metadata.get("last_page", min(pages))])
+        if last_page != metadata["page"]:
+            metadata["last_page"] = last_page
+    return metadata
+
+
+def merge_adjacent(documents, max_overlap=CHUNK_OVERLAP):
+    """Merge chunks that continue each other (same source and section, overlap at the seam)"""
+    merged = list(documents)
+    changed = True
+    while changed:
+        changed = False
+        for i, head in enumerate(merged):
+            for j, tail in enumerate(merged):
+                if (i == j or head.metadata.get("source") != tail.metadata.get("source")
+                        or head.metadata.get("section") != tail.metadata.get("section")):
+                    continue
+                head_body, tail_body = _body(head), _body(tail)
+                overlap = (_sentence_overlap_length(head_body, tail_body)
+                           or _overlap_length(head_body, tail_body, max_overlap))
+                if overlap == 0:
+                    continue
+                combined = Document(
+                    page_content=head.page_content + tail_body[overlap:],
+                    metadata=_merged_metadata(merged[min(i, j)], head, tail),
+                    id=merged[min(i, j)].id,
+                )
+                # The merged chunk takes the better rank of the two
+                merged[min(i, j)] = combined
+                del merged[max(i, j)]
+                changed = True
+                break
+            if changed:
+                break
+    return merged
+
+
+def trim_to_budget(documents, query, budget):
+    """Drop the least query-relevant sentences until the documents fit in ``budget`` tokens"""
+    query_terms = set(tokenize(query))
+    sentences = []  # (doc_index, position, text, tokens, score)
+    for doc_index, doc in enumerate(documents):
+        for position, sentence in enumerate(_SENTENCE_END.split(doc.page_content.strip())):
+            if not sentence:
+                continue
+            terms = set(tokenize(sentence))
+            overlap = len(terms & query_terms) / len(query_terms) if query_terms else 0.0
+            sentences.append((doc_index, position, sentence, count_tokens(sentence), overlap))
+
+    # Most relevant first; ties go to the better-ranked document, then reading order
+    ranked = sorted(sentences, key=lambda s: (-s[4], s[0], s[1]))
+    selected, used = set(), 0
+    for doc_index, position, _, tokens, _ in ranked:
+        if used + tokens > budget and selected:
+            continue
+        selected.add((doc_index, position))
+        used += tokens
+
+    trimmed = []
+    for doc_index, doc in enumerate(documents):
+        kept = [s[2] for s in sentences if s[0] == doc_index and (s[0], s[1]) in selected]
+        if kept:
+            trimmed.append(Document(page_content=" ".join(kept), metadata=doc.metadata, id=doc.id))
+    return trimmed
+
+
+class ContextBudgetCompressor(BaseDocumentCompressor):
+    """De-duplicates, merges and trims retrieved chunks to a token budget"""
+
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+    dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD
+    stats: dict = Field(default_factory=lambda: {"queries": 0, "tokens_in": 0, "tokens_out": 0})
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def compress_documents(self, documents: Sequence[Document], query: str,
+                           callbacks: Optional[Callbacks] = None) -> Sequence[Document]:
+        with trace("query.context_budget"):
+            tokens_in = sum(count_tokens(doc.page_content) for doc in documents)
+            compressed = merge_adjacent(remove_near_duplicates(documents, self.dedup_threshold))
+            if sum(count_tokens(doc.page_content) for doc in compressed) > self.token_budget:
+                compressed = trim_to_budget(compressed, query, self.token_budget)
+            tokens_out = sum(count_tokens(doc.page_content) for doc in compressed)
+        increment("tokens.context_saved", tokens_in - tokens_out)
+
+        with self._lock:
+            self.stats["queries"] += 1
+            self.stats["tokens_in"] += tokens_in
+            self.stats["tokens_out"] += tokens_out
+        print(f"✂️ Context: {len(documents)} → {len(compressed)} chunks, "
+              f"{tokens_in} → {tokens_out} tokens ({tokens_in - tokens_out} saved)")
+        return compressed
+
+    def tokens_saved(self):
+        return self.stats["tokens_in"] - self.stats["tokens_out"]
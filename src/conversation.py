@@ -0,0 +1,182 @@
+"""
+Conversation-aware retrieval with bounded history memory.
+
+Each session keeps a ConversationMemory: the latest turns verbatim and a
+running LLM summary of the older ones, together at most
+CONVERSATION_HISTORY_TOKENS tokens however long the chat gets. Older turns
+are folded into the summary in one LLM call once the budget is exceeded.
+
+ConversationalQA holds no per-session state. Before retrieval it rewrites a
+follow-up ("what is its dose?") into a standalone query from the memory;
+questions that already read as self-contained skip that LLM call. When the
+standalone query is close to the query that fetched the previous turn's
+chunks (cosine similarity of at least CONVERSATION_TOPIC_THRESHOLD), those
+chunks are reused and the vector search is skipped.
+"""
+
+import os
+import re
+import sys
+import time
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    CONVERSATION_HISTORY_TOKENS, CONVERSATION_RECENT_TURNS, CONVERSATION_TOPIC_THRESHOLD
+)
+from src.answer_cache import CachedQAChain
+from src.context_budget import count_tokens
+from src.local_store import normalize_rows
+from src.prompt import condense_prompt, summary_prompt
+from src.tracing import increment, record
+
+# Pronouns and elliptical openers that only make sense with the previous turns
+_FOLLOW_UP_RE = re.compile(
+    r"\b(?:it|its|this|that|these|those|they|them|their|he|she|his|her|same|above|previous|"
+    r"also|else|other|more)\b|^\s*(?:and|or|but|so|what about|how about)\b",
+    re.I,
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def needs_condensing(question):
+    """True for questions that refer back to the conversation (pronouns, "what about ...", very short)"""
+    return len(question.split()) <= 3 or bool(_FOLLOW_UP_RE.search(question))
+
+
+def trim_front(text, max_tokens):
+    """Drop leading sentences until text fits in max_tokens"""
+    sentences = _SENTENCE_END.split(text.strip()) if text else []
+    while sentences and count_tokens(" ".join(sentences)) > max_tokens:
+        sentences.pop(0)
+    return " ".join(sentences)
+
+
+def _invoke_text(llm, prompt_text):
+    message = llm.invoke(prompt_text)
+    return (message.content if hasattr(message, "content") else str(message)).strip()
+
+
+def format_turns(turns):
+    return "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+
+
+def extractive_summary(summary, turns):
+    """Summary without an LLM: the first sentence of every folded question and answer"""
+    first = lambda text: _SENTENCE_END.split(text.strip(), 1)[0]
+    added = " ".join(f"Asked: {first(question)} Answer: {first(answer)}" for question, answer in turns)
+    return f"{summary} {added}".strip()
+
+
+class ConversationMemory:
+    """One session's history: a running summary plus the latest turns, within a token budget"""
+
+    def __init__(self, token_budget=CONVERSATION_HISTORY_TOKENS, recent_turns=CONVERSATION_RECENT_TURNS):
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.summary = ""
+        self.turns = []  # (question, answer) pairs, oldest first
+        # The query, its normalized embedding and the chunks of the last actual vector search
+        self.last_query = None
+        self.last_vector = None
+        self.last_documents = None
+
+    def history_text(self):
+        summary = [f"Summary: {self.summary}"] if self.summary else []
+        return "\n".join(summary + ([format_turns(self.turns)] if self.turns else []))
+
+    def tokens(self):
+        return count_tokens(self.history_text()) if self.summary or self.turns else 0
+
+    def add_turn(self, question, answer, summarize=None):
+        """
+        Append a turn; over budget, fold older turns into the summary with
+        ``summarize(summary, turns)`` (keeps only the first sentences without it).
+        """
+        self.turns.append((question, answer))
+        if self.tokens() <= self.token_budget:
+            return
+        folded, self.turns = self.turns[:-self.recent_turns], self.turns[-self.recent_turns:]
+        # The latest turn always stays verbatim: the next follow-up most likely refers to it
+        while len(self.turns) > 1 and self.tokens() > self.token_budget:
+            folded.append(self.turns.pop(0))
+        if folded:
+            self.summary = (summarize or extractive_summary)(self.summary, folded)
+        turns_tokens = count_tokens(format_turns(self.turns))
+        self.summary = trim_front(self.summary, self.token_budget - turns_tokens)
+
+    def remember_retrieval(self, query, vector, documents):
+        self.last_query, self.last_vector, self.last_documents = query, vector, documents
+
+    def clear(self):
+        self.summary = ""
+        self.turns = []
+        self.remember_retrieval(None, None, None)
+
+
+class ConversationalQA:
+    """Turns chat questions into standalone retrieval queries and reuses on-topic context"""
+
+    def __init__(self, llm, embeddings, topic_threshold=CONVERSATION_TOPIC_THRESHOLD):
+        self.llm = llm
+        self.embeddings = embeddings
+        self.topic_threshold = topic_threshold
+
+    @classmethod
+    def from_chain(cls, qa_chain, **kwargs):
+        """Reuse the LLM and embedding model of an initialized QA chain"""
+        if isinstance(qa_chain, CachedQAChain):
+            qa_chain = qa_chain.qa_chain
+        # Unwrap a ContextualCompressionRetriever (rerank, context budget) to reach the store
+        retriever = getattr(qa_chain.retriever, "base_retriever", qa_chain.retriever)
+        llm = qa_chain.combine_documents_chain.llm_chain.llm
+        return cls(llm, retriever.vectorstore.embeddings, **kwargs)
+
+    def condense(self, memory, question):
+        """A standalone version of the question (the question itself when no rewrite is needed)"""
+        if (not memory.turns and not memory.summary) or not needs_condensing(question):
+            return question
+        start = time.perf_counter()
+        try:
+            query = _invoke_text(self.llm, condense_prompt.format(history=memory.history_text(), question=question))
+        except Exception as e:
+            print(f"⚠️ Could not condense follow-up, retrieving with the question as asked: {e}")
+            return question
+        record("query.condense", time.perf_counter() - start)
+        increment("conversation.condensed")
+        return query or question
+
+    def summarize(self, summary, turns):
+        """Fold turns into the running summary with the LLM"""
+        try:
+            new_summary = _invoke_text(self.llm, summary_prompt.format(summary=summary or "(none)",
+                                                                       turns=format_turns(turns)))
+            increment("conversation.summaries")
+            return new_summary
+        except Exception as e:
+            print(f"⚠️ Could not summarize history, keeping first sentences instead: {e}")
+            return extractive_summary(summary, turns)
+
+    def prepare(self, memory, question):
+        """
+        (standalone query, documents) for a chat question: documents are the
+        previous turn's chunks when the query stays on their topic, else None
+        and the caller retrieves for the query.
+        """
+        query = self.condense(memory, question)
+        vector = normalize_rows(self.embeddings.embed_query(query))
+        if memory.last_documents and memory.last_vector is not None:
+            similarity = float(vector @ memory.last_vector)
+            if similarity >= self.topic_threshold:
+                increment("conversation.reused_context")
+                print(f"♻️ Same topic as \"{memory.last_query}\" ({similarity:.2f}), reusing its chunks")
+                return query, memory.last_documents
+        memory.remember_retrieval(query, vector, None)
+        return query, None
+
+    def remember(self, memory, question, answer, documents):
+        """Add the finished turn to the session memory, with the chunks the answer used"""
+        if memory.last_documents is None:
+            # Freshly retrieved for this turn: the next on-topic follow-up reuses them
+            memory.last_documents = documents
+        memory.add_turn(question, answer, summarize=self.summarize)
@@ -0,0 +1,370 @@
+"""
+Process-wide embedding model registry.
+
+The HuggingFace model is loaded once per process and shared by every caller
+(Streamlit sessions, index builders, background threads). CachedEmbeddings
+memoizes its output so repeated queries and duplicate chunks skip the encoder.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_WARMUP_TEXT, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PATH,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS
+)
+from src.tracing import increment, trace
+
+_registry_lock = threading.Lock()
+_models = {}
+_metrics = {}
+_warm_up_thread = None
+_cached_models = {}
+
+
+def current_rss_bytes():
+    """Return the resident set size of this process in bytes (best effort)"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is peak RSS: kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def _load_model(model_name, warm_up):
+    """Build the embedding model and record load metrics"""
+    from langchain_community.embeddings import HuggingFaceBgeEmbeddings
+
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    model = HuggingFaceBgeEmbeddings(model_name=model_name)
+    load_seconds = time.perf_counter() - start
+
+    warm_up_seconds = None
+    if warm_up:
+        # The first encode allocates buffers and JIT-initialises kernels
+        start = time.perf_counter()
+        model.embed_query(EMBEDDING_WARMUP_TEXT)
+        warm_up_seconds = time.perf_counter() - start
+
+    rss_after = current_rss_bytes()
+    _metrics[model_name] = {
+        "model_name": model_name,
+        "load_seconds": load_seconds,
+        "warm_up_seconds": warm_up_seconds,
+        "rss_before_bytes": rss_before,
+        "rss_after_bytes": rss_after,
+        "rss_delta_bytes": (
+            rss_after - rss_before
+            if rss_before is not None and rss_after is not None else None
+        ),
+        "loaded_at": time.time(),
+    }
+    return model
+
+
+def get_embedding_model(model_name=EMBEDDING_MODEL_NAME, warm_up=True):
+    """
+    Return the shared embedding model, loading it on first use.
+
+    Loading is guarded by a lock so concurrent first callers wait for a
+    single load instead of each building their own copy. Encoding with the
+    returned model is safe from several threads (inference only, no state).
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = _load_model(model_name, warm_up)
+            _models[model_name] = model
+    return model
+
+
+def is_embedding_model_loaded(model_name=EMBEDDING_MODEL_NAME):
+    """Check whether the model has already been loaded in this process"""
+    return model_name in _models
+
+
+def get_embedding_metrics(model_name=EMBEDDING_MODEL_NAME):
+    """
+    Return load-time and memory metrics for a loaded model, or None. After a
+    failed background warm-up the entry has an "error" key instead.
+    """
+    metrics = _metrics.get(model_name)
+    return dict(metrics) if metrics else None
+
+
+def warm_up_in_background(model_name=EMBEDDING_MODEL_NAME):
+    """Start loading the model in a daemon thread (at most once per process)"""
+    global _warm_up_thread
+    with _registry_lock:
+        if model_name in _models:
+            return None
+        if _warm_up_thread is not None and _warm_up_thread.is_alive():
+            return _warm_up_thread
+
+        def _target():
+            try:
+                get_embedding_model(model_name)
+            except Exception as e:
+                print(f"❌ Error warming up embedding model: {e}")
+                # Surfaced by the UI; replaced by load metrics once a later load succeeds
+                _metrics[model_name] = {"model_name": model_name, "error": f"{type(e).__name__}: {e}",
+                                        "failed_at": time.time()}
+
+        _warm_up_thread = threading.Thread(
+            target=_target, name="embedding-warm-up", daemon=True
+        )
+        _warm_up_thread.start()
+        return _warm_up_thread
+
+
+def embed_queries(model, texts):
+    """
+    Embed several queries in one encoder call.
+
+    LangChain's Embeddings interface only batches documents, and BGE-style
+    models prefix queries differently, so for those the sentence-transformers
+    client is called directly with the query instruction applied.
+    """
+    if isinstance(model, CachedEmbeddings):
+        return model.embed_queries(texts)
+    client = getattr(model, "client", None)
+    if client is not None and hasattr(model, "query_instruction"):
+        inputs = [model.query_instruction + text.replace("\n", " ") for text in texts]
+        return client.encode(inputs, show_progress_bar=False, **model.encode_kwargs).tolist()
+    return [model.embed_query(text) for text in texts]
+
+
+def normalize_text(text):
+    """Canonical form used for cache keys: NFC, collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Memoizing wrapper around an embedding model.
+
+    Keys combine the model name, whether the text is a query or a document
+    (BGE-style models embed them differently) and the normalized text.
+    Vectors live in a bounded in-memory LRU and, optionally, a SQLite file
+    that survives restarts.
+    """
+
+    def __init__(self, model, model_name=EMBEDDING_MODEL_NAME,
+                 max_entries=EMBEDDING_CACHE_SIZE, path=EMBEDDING_CACHE_PATH):
+        self.model = model
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _key(self, kind, text):
+        raw = f"{self.model_name}\0{kind}\0{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _get_many(self, keys):
+        """Return {key: vector} for keys found in memory or on disk"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.stats["memory_hits"] += 1
+            missing = [key for key in keys if key not in found]
+            if self._db is not None and missing:
+                for start in range(0, len(missing), 500):
+                    batch = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.stats["disk_hits"] += 1
+        return found
+
+    def _put_many(self, items):
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            if self._db is not None and items:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items],
+                )
+                self._db.commit()
+
+    def _embed_cached(self, kind, texts, encode):
+        """Look texts up in the cache and encode each distinct miss once"""
+        texts = list(texts)
+        keys = [self._key(kind, text) for text in texts]
+        found = self._get_many(list(dict.fromkeys(keys)))
+
+        to_encode = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in to_encode:
+                to_encode[key] = text
+        increment(f"embedding_cache.{kind}_hits", len(keys) - len(to_encode))
+        if to_encode:
+            self.stats["misses"] += len(to_encode)
+            increment(f"embedding_cache.{kind}_misses", len(to_encode))
+            new_items = list(zip(to_encode.keys(), encode(list(to_encode.values()))))
+            self._put_many(new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts):
+        return self._embed_cached("document", texts, self.model.embed_documents)
+
+    def embed_queries(self, texts):
+        """Embed several queries, encoding the cache misses in one call"""
+        return self._embed_cached("query", texts, lambda misses: embed_queries(self.model, misses))
+
+    def embed_query(self, text):
+        key = self._key("query", text)
+        found = self._get_many([key])
+        if key in found:
+            increment("embedding_cache.query_hits")
+            return found[key]
+        self.stats["misses"] += 1
+        increment("embedding_cache.query_misses")
+        with trace("query.embed_model"):
+            vector = self.model.embed_query(text)
+        self._put_many([(key, vector)])
+        return vector
+
+
+def get_cached_embedding_model(model_name=EMBEDDING_MODEL_NAME):
+    """Return the shared model wrapped in the process-wide embedding cache"""
+    cached = _cached_models.get(model_name)
+    if cached is not None:
+        return cached
+    model = get_embedding_model(model_name)
+    with _registry_lock:
+        if model_name not in _cached_models:
+            _cached_models[model_name] = CachedEmbeddings(model, model_name=model_name)
+        return _cached_models[model_name]
+
+
+def _init_embedding_worker(model_name, threads_per_worker):
+    """Process pool initializer: limit torch threads and load this worker's model"""
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    get_embedding_model(model_name, warm_up=False)
+
+
+def _embed_batch_in_worker(model_name, texts):
+    return get_embedding_model(model_name, warm_up=False).embed_documents(texts)
+
+
+class ParallelEmbeddings(Embeddings):
+    """
+    Document embedding for index builds, fanned out over a process pool.
+
+    Texts are sorted by length before batching so each batch pads to a
+    similar length, batches are encoded by worker processes that each load
+    the model once, and results are returned in the original order.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, batch_size=EMBEDDING_BATCH_SIZE,
+                 workers=EMBEDDING_WORKERS):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self._pool = None
+        self.stats = {"chunks": 0, "seconds": 0.0}
+
+    def _get_pool(self):
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            # spawn: forking a process that already initialised torch can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_embedding_worker,
+                initargs=(self.model_name, threads),
+            )
+        return self._pool
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        start = time.perf_counter()
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [[texts[i] for i in order[j:j + self.batch_size]]
+                   for j in range(0, len(order), self.batch_size)]
+
+        if self.workers == 1:
+            model = get_embedding_model(self.model_name)
+            results = [model.embed_documents(batch) for batch in batches]
+        else:
+            pool = self._get_pool()
+            results = pool.map(_embed_batch_in_worker, [self.model_name] * len(batches), batches)
+
+        vectors = [None] * len(texts)
+        flat = (vector for batch in results for vector in batch)
+        for index, vector in zip(order, flat):
+            vectors[index] = vector
+
+        self.stats["chunks"] += len(texts)
+        self.stats["seconds"] += time.perf_counter() - start
+        return vectors
+
+    def embed_query(self, text):
+        return get_embedding_model(self.model_name).embed_query(text)
+
+    def chunks_per_second(self):
+        return self.stats["chunks"] / self.stats["seconds"] if self.stats["seconds"] else 0.0
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def get_ingestion_embeddings(model_name=EMBEDDING_MODEL_NAME):
+    """Embeddings for index builds: the parallel embedder behind the embedding cache"""
+    return CachedEmbeddings(ParallelEmbeddings(model_name), model_name=model_name)
@@ -0,0 +1,88 @@
+"""
+Local stand-ins for the embedding model, vector store and LLM.
+
+They need no API keys, network access or model downloads and are fully
+deterministic, so the query service, benchmarks and manual tests can run
+offline with the same code paths as production.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.llms import LLM
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import PINECONE_DIMENSIONS
+from src.local_store import LocalVectorStore
+
+SAMPLE_PASSAGES = [
+    ("Hypertension is a chronic elevation of arterial blood pressure above 130/80 mmHg.", 12),
+    ("Metformin is the first-line oral agent for type 2 diabetes mellitus.", 48),
+    ("Aspirin irreversibly inhibits cyclooxygenase and reduces platelet aggregation.", 77),
+    ("Asthma is characterised by reversible airway obstruction and bronchial hyperresponsiveness.", 103),
+    ("Iron deficiency anaemia presents with microcytic, hypochromic red cells.", 150),
+    ("Amoxicillin is a beta-lactam antibiotic used for otitis media and sinusitis.", 201),
+]
+
+
+class FakeLLM(LLM):
+    """Deterministic LLM that answers with the start of the retrieved context"""
+
+    answer_chars: int = 200
+
+    @property
+    def _llm_type(self):
+        return "fake-echo"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        context = prompt.split("Context:", 1)[-1].split("Question:", 1)[0].strip()
+        return f"Based on the context: {context[:self.answer_chars]}"
+
+
+class FakePineconeIndex:
+    """In-memory stand-in for a Pinecone index that can inject latency and transient failures"""
+
+    def __init__(self, failure_rate=0.0, latency_seconds=0.0, seed=0):
+        self.failure_rate = failure_rate
+        self.latency_seconds = latency_seconds
+        self.vectors = {}
+        self.upsert_calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace=None, **kwargs):
+        time.sleep(self.latency_seconds)
+        with self._lock:
+            self.upsert_calls += 1
+            if self._random.random() < self.failure_rate:
+                raise ConnectionError("Simulated transient upsert failure")
+            for vector_id, values, metadata in vectors:
+                self.vectors[(namespace, vector_id)] = (values, metadata)
+        return {"upserted_count": len(vectors)}
+
+    def describe_index_stats(self):
+        return {"total_vector_count": len(self.vectors)}
+
+
+def fake_embeddings(dimensions=PINECONE_DIMENSIONS):
+    """Hash-seeded random embeddings: identical texts get identical vectors"""
+    return DeterministicFakeEmbedding(size=dimensions)
+
+
+def build_fake_vector_store(embeddings=None, path=None, passages=SAMPLE_PASSAGES):
+    """LocalVectorStore in a temporary directory, seeded with sample passages"""
+    embeddings = embeddings or fake_embeddings()
+    path = path or tempfile.mkdtemp(prefix="fake_index_")
+    store = LocalVectorStore(path, embeddings, getattr(embeddings, "size", PINECONE_DIMENSIONS))
+    if len(store) == 0 and passages:
+        store.add_texts(
+            [text for text, _ in passages],
+            metadatas=[{"source": "sample_textbook.pdf", "page": page} for _, page in passages],
+        )
+    return store
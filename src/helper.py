@@ -1,24 +1,24 @@
 
-from langchain_community.document_loaders import PyPDFLoader,DirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceBgeEmbeddings
 import sys
 import os
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import EMBEDDING_MODEL_NAME, CHUNK_SIZE, CHUNK_OVERLAP, PDF_DATA_PATH
+from config import EMBEDDING_MODEL_NAME, CHUNK_SIZE, CHUNK_OVERLAP, PDF_DATA_PATH, CHUNKER, CHUNKER_WORKERS
 
 
 def load_pdf_file(data=PDF_DATA_PATH):
-    """Load PDF files from the specified directory"""
-    loader = DirectoryLoader(data, glob="*.pdf", loader_cls=PyPDFLoader)
-    documents = loader.load()
-    return documents
+    """Load PDF files from the specified directory (one Document per page, cached by file hash)"""
+    from src.pdf_extract import load_pdf_directory
+    return load_pdf_directory(data)
 
 
-def text_split(extracted_data):
-    """Split documents into chunks for processing"""
+def text_split(extracted_data, workers=CHUNKER_WORKERS):
+    """Split documents into chunks for processing (structure-aware and token-sized unless CHUNKER="recursive")"""
+    if CHUNKER == "structured":
+        from src.chunker import chunk_documents
+        return chunk_documents(extracted_data, workers=workers)
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE, 
         chunk_overlap=CHUNK_OVERLAP
@@ -28,6 +28,35 @@ def text_split(extracted_data):
 
 
 def download_hugging_face_model():
-    """Download and return the HuggingFace embedding model"""
-    embeddings = HuggingFaceBgeEmbeddings(model_name=EMBEDDING_MODEL_NAME)
-    return embeddings
\ No newline at end of file
+    """Return the shared HuggingFace embedding model (loaded once per process, memoized)"""
+    from src.embeddings import get_cached_embedding_model
+    return get_cached_embedding_model(EMBEDDING_MODEL_NAME)
+
+
+def format_response_with_sources(response):
+    """Format response to include page references"""
+    result = response.get('result', 'Sorry, I could not generate a response.')
+    
+    # Add source documents if available
+    if 'source_documents' in response and response['source_documents']:
+        sources = response['source_documents']
+        page_refs = []
+        
+        for doc in sources:
+            page = doc.metadata.get('page')
+            last_page = doc.metadata.get('last_page')  # Set on chunks merged across pages
+            source = doc.metadata.get('source', 'Unknown source')
+            
+            if page is not None and last_page is not None:
+                page_refs.append(f"{source} (pages {page}-{last_page})")
+            elif page is not None:
+                page_refs.append(f"{source} (page {page})")
+            else:
+                page_refs.append(source)
+        
+        if page_refs:
+            # Remove duplicates while preserving order
+            unique_refs = list(dict.fromkeys(page_refs))
+            result += f"\n\n**📚 Sources:**\n" + ", ".join(unique_refs)
+    
+    return result
@@ -0,0 +1,123 @@
+"""
+Shared index metadata: existence, vector count and dimension.
+
+Every check goes through one process-wide Pinecone client, so its
+connection pool is reused, or reads the local index's info file. Results
+are cached per index name. ``get_index_status()`` never blocks: it returns
+the cached status (possibly stale, or None before the first check) and
+starts a background refresh once the status is older than
+INDEX_STATUS_TTL_SECONDS. Scripts that need an answer before continuing use
+``current_index_status()``, which refreshes in the caller's thread.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    PINECONE_API_KEY, VECTOR_STORE_BACKEND, LOCAL_INDEX_PATH,
+    INDEX_STATUS_TTL_SECONDS, INDEX_STATUS_RETRY_SECONDS
+)
+
+_client = None
+_client_lock = threading.Lock()
+_statuses = {}
+_refreshing = set()
+_lock = threading.Lock()
+
+
+def get_pinecone_client():
+    """Create the Pinecone client on first use and share it (not needed for the local backend)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from pinecone import Pinecone
+            _client = Pinecone(api_key=PINECONE_API_KEY)
+        return _client
+
+
+def fetch_index_status(index_name):
+    """Ask the backend whether the index exists, how many vectors it holds and their dimension"""
+    if VECTOR_STORE_BACKEND == "local":
+        from src.local_store import INFO_FILE
+        info_path = os.path.join(LOCAL_INDEX_PATH, INFO_FILE)
+        if not os.path.exists(info_path):
+            return {"exists": False, "vector_count": 0, "dimension": None}
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        vector_count = info.get("live_count", 0)
+        # Same rule as local_index_exists(): an empty local index counts as missing
+        return {"exists": vector_count > 0, "vector_count": vector_count, "dimension": info.get("dimensions")}
+
+    client = get_pinecone_client()
+    if index_name not in client.list_indexes().names():
+        return {"exists": False, "vector_count": 0, "dimension": None}
+    stats = client.Index(index_name).describe_index_stats()
+    return {"exists": True, "vector_count": stats.get("total_vector_count", 0), "dimension": stats.get("dimension")}
+
+
+def refresh_index_status(index_name):
+    """Fetch the status now and cache it; on errors the last known values are kept"""
+    from src.tracing import trace
+
+    with _lock:
+        previous = _statuses.get(index_name)
+    try:
+        with trace("index_status.refresh"):
+            status = fetch_index_status(index_name)
+        status["error"] = None
+    except Exception as e:
+        print(f"Error checking index: {e}")
+        status = dict(previous) if previous else {"exists": False, "vector_count": None, "dimension": None}
+        status["error"] = str(e)
+    status["checked_at"] = time.time()
+    with _lock:
+        _statuses[index_name] = status
+    return status
+
+
+def _is_stale(status, max_age):
+    if status is None:
+        return True
+    if status["error"]:
+        max_age = min(max_age, INDEX_STATUS_RETRY_SECONDS)
+    return time.time() - status["checked_at"] > max_age
+
+
+def get_index_status(index_name, max_age=INDEX_STATUS_TTL_SECONDS):
+    """Cached status (or None before the first check); refreshes in the background when stale"""
+    with _lock:
+        status = _statuses.get(index_name)
+        if not _is_stale(status, max_age) or index_name in _refreshing:
+            return status
+        _refreshing.add(index_name)
+
+    def _target():
+        try:
+            refresh_index_status(index_name)
+        finally:
+            with _lock:
+                _refreshing.discard(index_name)
+
+    threading.Thread(target=_target, name="index-status", daemon=True).start()
+    return status
+
+
+def current_index_status(index_name, max_age=INDEX_STATUS_TTL_SECONDS):
+    """Cached status if still fresh, else refreshed in this thread"""
+    with _lock:
+        status = _statuses.get(index_name)
+    if _is_stale(status, max_age):
+        status = refresh_index_status(index_name)
+    return status
+
+
+def invalidate_index_status(index_name):
+    """Mark the cached status stale (e.g. after an ingestion) without dropping it"""
+    with _lock:
+        if index_name in _statuses:
+            _statuses[index_name] = dict(_statuses[index_name], checked_at=0.0)
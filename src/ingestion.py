@@ -0,0 +1,242 @@
+"""
+Incremental PDF ingestion.
+
+A manifest on disk records a content hash for every PDF and for every chunk
+that was uploaded from it. On each run only new or changed PDFs are parsed
+(in a process pool), only chunks whose content changed are embedded and
+upserted, and vectors belonging to removed PDFs are deleted. Files chunked
+with different chunker settings are re-parsed, so changing them re-chunks the
+index file by file.
+"""
+
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import PDF_DATA_PATH, INGESTION_MANIFEST_PATH, INGESTION_WORKERS
+from src.chunker import chunker_settings
+from src.tracing import record, trace
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_sha256(text):
+    """Return the SHA-256 hex digest of a chunk's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path=INGESTION_MANIFEST_PATH):
+    """Load the ingestion manifest, or an empty one if none exists"""
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def save_manifest(manifest, path=INGESTION_MANIFEST_PATH):
+    """Write the manifest atomically so a crash never leaves it half-written"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def forget_file_hashes(path=INGESTION_MANIFEST_PATH):
+    """
+    Make the next sync re-parse every file. The chunk ids stay, so only
+    changed chunks are re-embedded and chunks that disappeared are deleted.
+    """
+    manifest = load_manifest(path)
+    for entry in manifest["files"].values():
+        entry["sha256"] = None
+    save_manifest(manifest, path)
+
+
+def list_pdf_files(data=PDF_DATA_PATH):
+    """Return the PDFs in the data directory, using the same glob as load_pdf_file"""
+    return sorted(glob.glob(os.path.join(data, "*.pdf")))
+
+
+def assign_chunk_ids(source, chunks, seen=None):
+    """
+    Give every chunk a deterministic id derived from its source and content.
+
+    Identical chunks within one file get an ordinal suffix so ids stay
+    unique; unchanged chunks keep their id across runs and are not re-embedded.
+    Pass the same ``seen`` dict when a file is assigned page by page.
+    Returns a list of (chunk_id, chunk_hash, chunk) tuples.
+    """
+    seen = {} if seen is None else seen
+    source_key = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    assigned = []
+    for chunk in chunks:
+        content_hash = chunk_sha256(chunk.page_content)
+        ordinal = seen.get(content_hash, 0)
+        seen[content_hash] = ordinal + 1
+        chunk_id = f"{source_key}-{content_hash[:24]}-{ordinal}"
+        assigned.append((chunk_id, content_hash, chunk))
+    return assigned
+
+
+def upsert_embeddings(vector_store, ids, texts, embeddings, metadatas):
+    """Upsert pre-computed embeddings without embedding the texts again"""
+    if hasattr(vector_store, "add_embeddings"):
+        vector_store.add_embeddings(
+            text_embeddings=list(zip(texts, embeddings)), metadatas=metadatas, ids=ids
+        )
+        return
+
+    # PineconeVectorStore: write straight to the underlying index
+    text_key = getattr(vector_store, "_text_key", "text")
+    vectors = [
+        (chunk_id, list(embedding), {**metadata, text_key: text})
+        for chunk_id, text, embedding, metadata in zip(ids, texts, embeddings, metadatas)
+    ]
+    vector_store._index.upsert(vectors=vectors, namespace=getattr(vector_store, "_namespace", None))
+
+
+def parse_and_split_pdf(path, extract_workers=1):
+    """Parse one PDF and split it into chunks (runs inside a worker process unless extract_workers > 1)"""
+    from src.helper import text_split
+    from src.pdf_extract import load_pdf
+
+    documents = load_pdf(path, workers=extract_workers)
+    # One source, so chunking would not fan out anyway
+    return text_split(extracted_data=documents, workers=1)
+
+
+def plan_ingestion(manifest, data=PDF_DATA_PATH):
+    """
+    Compare the PDFs on disk with the manifest.
+
+    Returns (changed, removed, hashes): paths to (re)parse, manifest paths
+    whose files are gone, and the current hash of every PDF on disk.
+    """
+    hashes = {path: file_sha256(path) for path in list_pdf_files(data)}
+    known = manifest["files"]
+    settings = chunker_settings()
+    changed = [path for path, digest in hashes.items()
+               if known.get(path, {}).get("sha256") != digest
+               or known.get(path, {}).get("chunker") != settings]
+    removed = [path for path in known if path not in hashes]
+    return changed, removed, hashes
+
+
+def _parse_files(paths, workers):
+    """Yield (path, chunks) for each path, fanning out across a process pool"""
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            with trace("ingest.parse_file"):
+                # A single changed file fans its pages out instead
+                chunks = parse_and_split_pdf(path, extract_workers=workers)
+            yield path, chunks
+        return
+
+    # spawn: ingestion can run in a process that already initialised torch, where fork can deadlock
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = pool.map(parse_and_split_pdf, paths)
+        for path in paths:
+            # Time spent waiting on the pool, i.e. parsing not hidden behind embedding
+            start = time.perf_counter()
+            chunks = next(results)
+            record("ingest.parse_wait", time.perf_counter() - start)
+            yield path, chunks
+
+
+def sync_index(vector_store, data=PDF_DATA_PATH, manifest_path=INGESTION_MANIFEST_PATH,
+               workers=INGESTION_WORKERS, embeddings=None, upserter=None, sparse_index=None):
+    """
+    Bring the vector store in line with the PDFs in the data directory.
+
+    Chunks are embedded with ``embeddings`` when given (e.g. the parallel
+    ingestion embedder), otherwise with the vector store's own model, and
+    uploaded through ``upserter`` (a BulkUpserter) when given. Every chunk of
+    a parsed file is staged in ``sparse_index`` (a SparseIndex) when given,
+    and deleted chunks are removed from it.
+
+    The manifest is saved after every file, so an interrupted run resumes
+    from the first file that was not finished.
+    """
+    manifest = load_manifest(manifest_path)
+    changed, removed, hashes = plan_ingestion(manifest, data)
+    summary = {"parsed_files": 0, "removed_files": 0,
+               "upserted_chunks": 0, "deleted_chunks": 0, "unchanged_chunks": 0}
+
+    for path in removed:
+        stale_ids = list(manifest["files"][path].get("chunks", {}))
+        if stale_ids:
+            vector_store.delete(ids=stale_ids)
+            if sparse_index is not None:
+                sparse_index.delete(stale_ids)
+        del manifest["files"][path]
+        save_manifest(manifest, manifest_path)
+        summary["removed_files"] += 1
+        summary["deleted_chunks"] += len(stale_ids)
+        print(f"🗑️ Removed {len(stale_ids)} chunks for deleted file {path}")
+
+    for path, chunks in _parse_files(changed, workers):
+        old_chunks = manifest["files"].get(path, {}).get("chunks", {})
+        assigned = assign_chunk_ids(path, chunks)
+        new_chunks = {chunk_id: content_hash for chunk_id, content_hash, _ in assigned}
+
+        to_upsert = [(chunk_id, chunk) for chunk_id, _, chunk in assigned
+                     if chunk_id not in old_chunks]
+        stale_ids = [chunk_id for chunk_id in old_chunks if chunk_id not in new_chunks]
+
+        if to_upsert:
+            texts = [chunk.page_content for _, chunk in to_upsert]
+            metadatas = [chunk.metadata for _, chunk in to_upsert]
+            ids = [chunk_id for chunk_id, _ in to_upsert]
+            if embeddings is None:
+                with trace("ingest.embed_and_upsert"):
+                    vector_store.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+            else:
+                with trace("ingest.embed"):
+                    vectors = embeddings.embed_documents(texts)
+                with trace("ingest.upsert"):
+                    if upserter is not None:
+                        upserter.upsert(ids, texts, vectors, metadatas)
+                    else:
+                        upsert_embeddings(vector_store, ids, texts, vectors, metadatas)
+        if sparse_index is not None:
+            # Unchanged chunks too: a re-parse after forget_file_hashes() backfills the keyword index
+            sparse_index.add([chunk_id for chunk_id, _, _ in assigned],
+                             [chunk.page_content for _, _, chunk in assigned],
+                             [chunk.metadata for _, _, chunk in assigned])
+        if stale_ids:
+            vector_store.delete(ids=stale_ids)
+            if sparse_index is not None:
+                sparse_index.delete(stale_ids)
+
+        manifest["files"][path] = {"sha256": hashes[path], "chunker": chunker_settings(), "chunks": new_chunks}
+        save_manifest(manifest, manifest_path)
+
+        summary["parsed_files"] += 1
+        summary["upserted_chunks"] += len(to_upsert)
+        summary["deleted_chunks"] += len(stale_ids)
+        summary["unchanged_chunks"] += len(assigned) - len(to_upsert)
+        print(f"📄 {path}: {len(to_upsert)} upserted, {len(stale_ids)} deleted, "
+              f"{len(assigned) - len(to_upsert)} unchanged")
+
+    if not changed and not removed:
+        print("✅ Index is up to date, nothing to ingest.")
+    return summary
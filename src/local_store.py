@@ -0,0 +1,346 @@
+"""
+Local on-disk vector store.
+
+Normalized float32 embeddings live in a memory-mapped matrix
+(``vectors.f32``) and chunk text/metadata in a SQLite sidecar
+(``metadata.sqlite``). Search is an exact, vectorized cosine top-k scan over
+the matrix, so no network round trip is needed at query time. With
+``index_type="ivf"`` an approximate IVF index (src/ann_index.py) is used instead;
+with ``quantization="int8"`` or ``"binary"`` the scan runs over compact codes
+(src/quantization.py) and the best candidates are optionally rescored.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+VECTORS_FILE = "vectors.f32"
+METADATA_FILE = "metadata.sqlite"
+INFO_FILE = "index.json"
+SCAN_BLOCK_ROWS = 65536  # Rows scored per block, bounds temporary memory
+QUANTIZED_SCAN_BLOCK_ROWS = 8192  # Codes are widened to float32 per block, so use smaller blocks
+_GROW_ROWS = 4096
+
+
+def local_index_exists(path):
+    """Check whether a local index with at least one vector exists at path"""
+    info_path = os.path.join(path, INFO_FILE)
+    if not os.path.exists(info_path):
+        return False
+    with open(info_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("live_count", 0) > 0
+
+
+def open_growable_memmap(file_path, dtype, width, min_rows):
+    """Memory-map a row-major matrix file, growing it to hold at least min_rows rows"""
+    row_bytes = width * np.dtype(dtype).itemsize
+    current_rows = os.path.getsize(file_path) // row_bytes if os.path.exists(file_path) else 0
+    if current_rows < min_rows:
+        new_rows = max(min_rows, current_rows * 2, _GROW_ROWS)
+        with open(file_path, "ab") as f:
+            f.truncate(new_rows * row_bytes)
+        current_rows = new_rows
+    return np.memmap(file_path, dtype=dtype, mode="r+", shape=(current_rows, width))
+
+
+def save_array(file_path, array):
+    """
+    np.save through a temp file and os.replace: readers that memory-mapped
+    the old file keep their (intact) copy instead of seeing it rewritten.
+    """
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, file_path)
+
+
+def save_json(file_path, data):
+    """Write JSON through a temp file and os.replace, so readers never see a partial file"""
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, file_path)
+
+
+def normalize_rows(matrix):
+    """L2-normalize each row so a dot product equals cosine similarity"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, k):
+    """Return the indices of the k highest scores, best first"""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain vector store backed by a memory-mapped NumPy matrix"""
+
+    def __init__(self, path, embedding, dimensions, index_type="exact",
+                 quantization=None, rescore=True, rescore_factor=4):
+        self.path = path
+        self._embedding = embedding
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self._db = sqlite3.connect(os.path.join(path, METADATA_FILE), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL,"
+            " text TEXT NOT NULL, metadata TEXT NOT NULL, deleted INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.commit()
+
+        self._count = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+        self._live = np.zeros(self._count, dtype=bool)
+        live_rows = [row for (row,) in self._db.execute("SELECT row FROM chunks WHERE deleted = 0")]
+        self._live[live_rows] = True
+        self._vectors = None
+        self._open_vectors(max(self._count, 1))
+
+        self.ann_index = None
+        if index_type == "ivf":
+            from src.ann_index import IVFIndex
+            self.ann_index = IVFIndex.load(path)
+            if self.ann_index is None:
+                print("⚠️ No IVF index found, falling back to exact search (run: python -m src.ann_index)")
+
+        # Fitted codes are kept in sync by every write, whichever search mode is in use
+        from src.quantization import Quantizer
+        self.quantizer = Quantizer.load(path, dimensions)
+        self._codes = None
+        if self.quantizer is not None:
+            self._open_codes(max(self._count, 1))
+        self.quantization = quantization if quantization not in (None, "none") else None
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        if self.quantization and (self.quantizer is None or self.quantizer.mode != self.quantization):
+            print(f"⚠️ No {self.quantization} codes found, falling back to float search "
+                  f"(run: python -m src.quantization --mode {self.quantization})")
+            self.quantization = None
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    # Storage ---------------------------------------------------------------
+
+    def _open_vectors(self, min_rows):
+        """(Re)map the vector file, growing it to hold at least min_rows rows"""
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = open_growable_memmap(os.path.join(self.path, VECTORS_FILE), np.float32,
+                                             self.dimensions, min_rows)
+
+    def _open_codes(self, min_rows):
+        """(Re)map the quantized code file, growing it to hold at least min_rows rows"""
+        from src.quantization import CODES_FILE
+        if self._codes is not None:
+            self._codes.flush()
+        self._codes = open_growable_memmap(os.path.join(self.path, CODES_FILE), np.uint8,
+                                           self.quantizer.code_width, min_rows)
+
+    def set_quantizer(self, quantizer):
+        """Encode every row with a newly fitted quantizer and keep the codes in sync from now on"""
+        with self._lock:
+            from src.quantization import CODES_FILE
+            codes_path = os.path.join(self.path, CODES_FILE)
+            # Encode into a new file; stores that mapped the old codes keep reading them intact
+            tmp_path = f"{codes_path}.tmp"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            codes = open_growable_memmap(tmp_path, np.uint8, quantizer.code_width, max(self._count, 1))
+            for start in range(0, self._count, SCAN_BLOCK_ROWS):
+                stop = min(start + SCAN_BLOCK_ROWS, self._count)
+                codes[start:stop] = quantizer.encode(self._vectors[start:stop])
+            codes.flush()
+            os.replace(tmp_path, codes_path)
+            # Codes, params, then the info file last: load() only sees a complete quantizer
+            quantizer.save(self.path)
+            self.quantizer = quantizer
+            self._codes = None
+            self._open_codes(max(self._count, 1))
+
+    def _write_info(self):
+        info = {"dimensions": self.dimensions, "count": self._count,
+                "live_count": int(self._live.sum())}
+        # Read concurrently by index_status and the resource cache
+        save_json(os.path.join(self.path, INFO_FILE), info)
+
+    def __len__(self):
+        return int(self._live.sum())
+
+    # Writes ----------------------------------------------------------------
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        """Add (text, embedding) pairs; existing ids are overwritten in place"""
+        text_embeddings = list(text_embeddings)
+        if not text_embeddings:
+            return []
+        texts = [text for text, _ in text_embeddings]
+        vectors = normalize_rows([vector for _, vector in text_embeddings])
+        if vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions}-dim embeddings, got {vectors.shape[1]}")
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+
+        with self._lock:
+            existing = dict(self._db.execute(
+                f"SELECT id, row FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall())
+            rows = []
+            for chunk_id in ids:
+                if chunk_id not in existing:
+                    existing[chunk_id] = self._count
+                    self._count += 1
+                rows.append(existing[chunk_id])
+
+            if self._count > self._vectors.shape[0]:
+                self._open_vectors(self._count)
+            if self._codes is not None and self._count > self._codes.shape[0]:
+                self._open_codes(self._count)
+            if self._count > self._live.shape[0]:
+                self._live = np.concatenate([self._live, np.zeros(self._count - self._live.shape[0], dtype=bool)])
+
+            self._vectors[rows] = vectors
+            self._vectors.flush()
+            if self._codes is not None:
+                self._codes[rows] = self.quantizer.encode(vectors)
+                self._codes.flush()
+            self._live[rows] = True
+            self._db.executemany(
+                "INSERT INTO chunks (row, id, text, metadata, deleted) VALUES (?, ?, ?, ?, 0) "
+                "ON CONFLICT(id) DO UPDATE SET text = excluded.text, metadata = excluded.metadata, deleted = 0",
+                [(row, chunk_id, text, json.dumps(metadata))
+                 for row, chunk_id, text, metadata in zip(rows, ids, texts, metadatas)],
+            )
+            self._db.commit()
+            self._write_info()
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        """Embed texts and add them to the index"""
+        texts = list(texts)
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+
+    def delete(self, ids=None, **kwargs):
+        """Mark chunks as deleted; their rows are skipped by search"""
+        if not ids:
+            return False
+        with self._lock:
+            rows = [row for (row,) in self._db.execute(
+                f"SELECT row FROM chunks WHERE id IN ({','.join('?' * len(ids))})", list(ids)
+            )]
+            self._db.executemany("UPDATE chunks SET deleted = 1 WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+            self._live[rows] = False
+            self._write_info()
+        return True
+
+    # Search ----------------------------------------------------------------
+
+    def search_vectors(self, query_vector, k):
+        """Cosine top-k over live rows (approximate if an ANN index or quantized codes are used)"""
+        if self.ann_index is not None:
+            return self.ann_index.search(self, query_vector, k)
+        if self.quantization:
+            return self.quantized_search_vectors(query_vector, k)
+        return self.exact_search_vectors(query_vector, k)
+
+    def exact_search_vectors(self, query_vector, k):
+        """Exact cosine top-k over live rows; returns (rows, scores), best first"""
+        query = normalize_rows(query_vector)
+        return self._scan(lambda start, stop: self._vectors[start:stop] @ query, k)
+
+    def quantized_search_vectors(self, query_vector, k, rescore=None):
+        """
+        Top-k by approximate scores over the quantized codes.
+
+        With rescoring, the best ``k * rescore_factor`` candidates are re-ranked
+        with their float vectors, which recovers most of the recall lost to
+        quantization while reading only those rows of the float matrix.
+        """
+        rescore = self.rescore if rescore is None else rescore
+        query = normalize_rows(query_vector)
+        prepared = self.quantizer.prepare(query)
+        n_candidates = k * self.rescore_factor if rescore else k
+        rows, scores = self._scan(lambda start, stop: self.quantizer.scores(self._codes[start:stop], prepared),
+                                  n_candidates, block_rows=QUANTIZED_SCAN_BLOCK_ROWS)
+        if not rescore or len(rows) == 0:
+            return rows, scores
+        rows = np.sort(rows)  # Sequential access pattern on the memory map
+        scores = self._vectors[rows] @ query
+        best = top_k_indices(scores, k)
+        return rows[best], scores[best]
+
+    def _scan(self, score_block, k, block_rows=SCAN_BLOCK_ROWS):
+        """Block-wise top-k of score_block(start, stop) over live rows; returns (rows, scores)"""
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        count = self._count
+        for start in range(0, count, block_rows):
+            stop = min(start + block_rows, count)
+            scores = score_block(start, stop)
+            scores[~self._live[start:stop]] = -np.inf
+            local = top_k_indices(scores, k)
+            best_rows = np.concatenate([best_rows, local + start])
+            best_scores = np.concatenate([best_scores, scores[local]])
+            keep = top_k_indices(best_scores, k)
+            best_rows, best_scores = best_rows[keep], best_scores[keep]
+        finite = np.isfinite(best_scores)
+        return best_rows[finite], best_scores[finite]
+
+    def documents_for_rows(self, rows):
+        """Fetch Documents for matrix rows, preserving the given order"""
+        rows = [int(row) for row in rows]
+        if not rows:
+            return []
+        with self._lock:
+            found = {
+                row: Document(page_content=text, metadata=json.loads(metadata), id=chunk_id)
+                for row, chunk_id, text, metadata in self._db.execute(
+                    f"SELECT row, id, text, metadata FROM chunks WHERE row IN ({','.join('?' * len(rows))})",
+                    rows,
+                )
+            }
+        return [found[row] for row in rows if row in found]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        rows, scores = self.search_vectors(embedding, k)
+        documents = self.documents_for_rows(rows)
+        return list(zip(documents, [float(score) for score in scores]))
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] mapped to [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, path=None, dimensions=None, **kwargs):
+        texts = list(texts)
+        vectors = embedding.embed_documents(texts)
+        store = cls(path, embedding, dimensions or len(vectors[0]))
+        store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,72 @@
+"""
+Micro-batching of concurrent query embeddings.
+
+Requests arriving within a short window are collected by a background
+thread and encoded with a single encoder call, which is much cheaper per
+query than encoding each one separately.
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import EMBED_BATCH_MAX_SIZE, EMBED_BATCH_MAX_WAIT_MS
+from src.embeddings import embed_queries
+
+
+class QueryEmbeddingBatcher(Embeddings):
+    """Embeddings wrapper that coalesces concurrent ``embed_query`` calls"""
+
+    def __init__(self, model, max_batch_size=EMBED_BATCH_MAX_SIZE, max_wait_ms=EMBED_BATCH_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self.stats = {"batches": 0, "queries": 0, "max_batch": 0}
+        threading.Thread(target=self._worker, name="query-embed-batcher", daemon=True).start()
+
+    def submit_query(self, text):
+        """Queue a query for the next batch; returns a concurrent Future"""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = embed_queries(self.model, texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+            self.stats["batches"] += 1
+            self.stats["queries"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+    def embed_query(self, text):
+        return self.submit_query(text).result()
+
+    def embed_documents(self, texts):
+        return self.model.embed_documents(texts)
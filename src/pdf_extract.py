@@ -0,0 +1,163 @@
+"""
+Pluggable PDF text extraction with an on-disk cache of extracted pages.
+
+Backends are small functions that return (text, page label) pairs for a
+range of pages. ``"pymupdf"`` (much faster, used when PyMuPDF is installed)
+and ``"pypdf"`` (what PyPDFLoader uses, same text) are built in, more can be
+added with ``register_extractor()``, and PDF_EXTRACTOR="auto" picks the
+first one that can be imported. Backends differ in page text, so the
+resolved backend is part of chunker_settings() and switching it re-chunks
+every file on the next sync. Large files are fanned out across a process
+pool in ranges of PDF_PAGES_PER_TASK pages.
+
+Pages carry source, total_pages, page and page_label metadata; the
+document-info fields PyPDFLoader adds (producer, creator, dates) are not
+carried.
+
+Extracted pages are cached as gzip-compressed JSON under
+PDF_TEXT_CACHE_PATH, keyed by the file's SHA-256 and the backend, so index
+rebuilds and re-chunking experiments skip parsing entirely until a PDF
+changes.
+"""
+
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    PDF_DATA_PATH, PDF_EXTRACTOR, PDF_EXTRACT_WORKERS, PDF_PAGES_PER_TASK, PDF_TEXT_CACHE_PATH
+)
+from src.ingestion import file_sha256, list_pdf_files
+from src.tracing import increment, trace
+
+TEXT_CACHE_VERSION = 1
+
+
+def _pypdf_page_count(path):
+    import pypdf
+    return len(pypdf.PdfReader(path).pages)
+
+
+def _pypdf_pages(path, start, stop):
+    import pypdf
+    reader = pypdf.PdfReader(path)
+    labels = reader.page_labels
+    # Same call and stripping as PyPDFLoader: page text, and so chunk ids, match its output
+    return [(reader.pages[i].extract_text(extraction_mode="plain").strip(), labels[i]) for i in range(start, stop)]
+
+
+def _pymupdf_page_count(path):
+    import pymupdf
+    with pymupdf.open(path) as document:
+        return document.page_count
+
+
+def _pymupdf_pages(path, start, stop):
+    import pymupdf
+    with pymupdf.open(path) as document:
+        return [(document[i].get_text("text").strip(), document[i].get_label() or str(i + 1))
+                for i in range(start, stop)]
+
+
+# name -> (module to import, page_count(path), pages(path, start, stop)); fastest first
+EXTRACTORS = {
+    "pymupdf": ("pymupdf", _pymupdf_page_count, _pymupdf_pages),
+    "pypdf": ("pypdf", _pypdf_page_count, _pypdf_pages),
+}
+
+
+def register_extractor(name, module, page_count, pages):
+    """Add an extraction backend (tried last by "auto"; select it with PDF_EXTRACTOR=name)"""
+    EXTRACTORS[name] = (module, page_count, pages)
+
+
+def resolve_extractor(name=PDF_EXTRACTOR):
+    """The backend name to use: ``name`` itself, or the first importable backend for "auto\""""
+    if name != "auto":
+        if name not in EXTRACTORS:
+            raise ValueError(f"Unknown PDF extractor: {name}")
+        return name
+    for candidate, (module, _, _) in EXTRACTORS.items():
+        try:
+            __import__(module)
+            return candidate
+        except ImportError:
+            continue
+    raise ImportError("No PDF extraction backend available (install pymupdf or pypdf)")
+
+
+def _extract_range(extractor, path, start, stop):
+    """Extract one range of pages (runs inside a worker process)"""
+    return EXTRACTORS[extractor][2](path, start, stop)
+
+
+def extract_pages(path, extractor, workers=PDF_EXTRACT_WORKERS, pages_per_task=PDF_PAGES_PER_TASK):
+    """(text, page label) for every page, fanning page ranges out across a process pool"""
+    _, page_count, pages = EXTRACTORS[extractor]
+    total = page_count(path)
+    ranges = [(start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task)]
+    if workers <= 1 or len(ranges) <= 1:
+        return pages(path, 0, total)
+    # spawn: ingestion can run in a process that already initialised torch, where fork can deadlock
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = pool.map(_extract_range, *zip(*[(extractor, path, start, stop) for start, stop in ranges]))
+        return [page for chunk in results for page in chunk]
+
+
+def _cache_path(cache_dir, digest, extractor):
+    return os.path.join(cache_dir, f"{digest}.{extractor}.json.gz")
+
+
+def load_pdf(path, workers=PDF_EXTRACT_WORKERS, extractor=PDF_EXTRACTOR, cache_dir=PDF_TEXT_CACHE_PATH,
+             digest=None):
+    """
+    One Document per page of a PDF, from the text cache when the file is
+    unchanged. ``digest`` is the file's SHA-256 when the caller already has it.
+    """
+    extractor = resolve_extractor(extractor)
+    cached = None
+    if cache_dir:
+        cached = _cache_path(cache_dir, digest or file_sha256(path), extractor)
+        if os.path.exists(cached):
+            increment("pdf_text_cache.hits")
+            with gzip.open(cached, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            return _page_documents(path, entry["pages"], entry["labels"])
+        increment("pdf_text_cache.misses")
+
+    with trace("ingest.extract"):
+        pages = extract_pages(path, extractor, workers)
+    texts = [text for text, _ in pages]
+    labels = [label for _, label in pages]
+
+    if cached:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cached}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump({"version": TEXT_CACHE_VERSION, "extractor": extractor,
+                       "pages": texts, "labels": labels}, f, separators=(",", ":"))
+        os.replace(tmp_path, cached)
+    return _page_documents(path, texts, labels)
+
+
+def _page_documents(path, texts, labels):
+    return [
+        Document(page_content=text,
+                 metadata={"source": path, "total_pages": len(texts), "page": page, "page_label": label})
+        for page, (text, label) in enumerate(zip(texts, labels))
+    ]
+
+
+def load_pdf_directory(data=PDF_DATA_PATH, workers=PDF_EXTRACT_WORKERS, extractor=PDF_EXTRACTOR,
+                       cache_dir=PDF_TEXT_CACHE_PATH):
+    """Page Documents for every PDF in the data directory"""
+    return [page for path in list_pdf_files(data)
+            for page in load_pdf(path, workers=workers, extractor=extractor, cache_dir=cache_dir)]
@@ -11,4 +11,29 @@ system_prompt = PromptTemplate(
         "Question: {question}\n\n"
         "Answer:"
     )
+)
+
+# Rewrites a follow-up into a question that retrieval can use on its own
+condense_prompt = PromptTemplate(
+    input_variables=["history", "question"],
+    template=(
+        "Given the conversation below and a follow-up question, rewrite the follow-up "
+        "as a standalone question that can be understood without the conversation. "
+        "Keep medical terms exactly as written. Return only the question.\n\n"
+        "Conversation:\n{history}\n\n"
+        "Follow-up question: {question}\n\n"
+        "Standalone question:"
+    )
+)
+
+# Folds older turns into the running summary of a conversation
+summary_prompt = PromptTemplate(
+    input_variables=["summary", "turns"],
+    template=(
+        "Progressively summarize the conversation, adding the new lines to the current summary. "
+        "Keep the conditions, drugs and findings discussed. Use three sentences maximum.\n\n"
+        "Current summary: {summary}\n\n"
+        "New lines of conversation:\n{turns}\n\n"
+        "New summary:"
+    )
 )
\ No newline at end of file
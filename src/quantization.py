@@ -0,0 +1,145 @@
+"""
+Scalar (int8) and binary quantization for the local vector store.
+
+``int8`` keeps one byte per dimension, mapped linearly onto per-dimension
+ranges fitted on the stored vectors (4x smaller than float32). ``binary``
+keeps one bit per dimension, set when the value is above the dimension's
+mean (32x smaller); a row is read back as mean +/- the dimension's mean
+absolute deviation, and the float query is scored against that through
+per-byte lookup tables rather than by Hamming distance. The codes live in a
+memory-mapped file next to ``vectors.f32`` and, once fitted, are updated by
+every write to the store, so a quantized scan only touches the codes. The
+float matrix stays on disk as the source of truth and, with rescoring on, is
+read only for the top candidates.
+
+The fitted parameters record EMBEDDING_MODEL_NAME; codes fitted for another
+model are ignored. Fit and encode an existing index with:
+    python -m src.quantization --mode int8
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import EMBEDDING_MODEL_NAME, QUANTIZATION_CALIBRATION_SAMPLE
+from src.local_store import save_array, save_json
+
+QUANTIZATION_MODES = ("int8", "binary")
+QUANT_INFO_FILE = "quantization.json"
+QUANT_PARAMS_FILE = "quantization_params.npy"
+CODES_FILE = "codes.u8"
+
+# +1/-1 for each of the 8 bits of every byte value, most significant bit first (np.packbits order)
+_BYTE_SIGNS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).astype(np.float32) * 2 - 1
+
+
+class Quantizer:
+    """Encodes normalized float32 vectors as uint8 codes and scores queries against them"""
+
+    def __init__(self, mode, params, dimensions, model=EMBEDDING_MODEL_NAME):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.mode = mode
+        self.params = np.asarray(params, dtype=np.float32)
+        self.dimensions = dimensions
+        self.model = model
+
+    @property
+    def code_width(self):
+        """Bytes per vector"""
+        return self.dimensions if self.mode == "int8" else (self.dimensions + 7) // 8
+
+    @classmethod
+    def fit(cls, mode, vectors, model=EMBEDDING_MODEL_NAME):
+        """Fit int8 ranges (clipped at the 0.1/99.9th percentiles) or binary means and deviations"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if mode == "int8":
+            low, high = np.percentile(vectors, [0.1, 99.9], axis=0)
+            params = np.stack([low, np.maximum(high, low + 1e-6)])
+        else:
+            mean = vectors.mean(axis=0)
+            params = np.stack([mean, np.abs(vectors - mean).mean(axis=0)])
+        return cls(mode, params, vectors.shape[1], model)
+
+    def encode(self, vectors):
+        """Codes for normalized vectors, shape (n, code_width), dtype uint8"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.mode == "int8":
+            low, high = self.params
+            scaled = (vectors - low) * (255.0 / (high - low))
+            return np.clip(np.rint(scaled), 0, 255).astype(np.uint8)
+        return np.packbits(vectors > self.params[0], axis=1)
+
+    def prepare(self, query):
+        """Per-query state for scores(); query must be normalized"""
+        if self.mode == "int8":
+            low, high = self.params
+            # q . v ~= q . low + sum(q * step * code): one float matmul over the codes
+            weights = query * ((high - low) / 255.0)
+            return weights.astype(np.float32), float(query @ low)
+        mean, deviation = self.params
+        # q . v ~= q . mean + sum(q * deviation * sign): per byte of code, a 256-entry table of partial sums
+        weights = np.zeros(self.code_width * 8, dtype=np.float32)
+        weights[:self.dimensions] = query * deviation
+        tables = weights.reshape(self.code_width, 8) @ _BYTE_SIGNS.T
+        return tables, float(query @ mean)
+
+    def scores(self, codes, prepared):
+        """Approximate cosine similarity of the query to each row of codes"""
+        if self.mode == "int8":
+            weights, offset = prepared
+            return codes.astype(np.float32) @ weights + offset
+        tables, offset = prepared
+        return tables[np.arange(self.code_width), codes].sum(axis=1) + offset
+
+    def save(self, path):
+        """Replace params, then the info file that load() starts from"""
+        save_array(os.path.join(path, QUANT_PARAMS_FILE), self.params)
+        save_json(os.path.join(path, QUANT_INFO_FILE),
+                  {"mode": self.mode, "dimensions": self.dimensions, "model": self.model})
+
+    @classmethod
+    def load(cls, path, dimensions, model=EMBEDDING_MODEL_NAME):
+        """The fitted quantizer at path, or None if missing or fitted for another model"""
+        info_path = os.path.join(path, QUANT_INFO_FILE)
+        if not os.path.exists(info_path):
+            return None
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if info["model"] != model or info["dimensions"] != dimensions:
+            print(f"⚠️ Quantization codes were fitted for {info['model']} ({info['dimensions']} dims), ignoring them")
+            return None
+        return cls(info["mode"], np.load(os.path.join(path, QUANT_PARAMS_FILE)), dimensions, info["model"])
+
+
+def quantize_store(store, mode, sample_size=QUANTIZATION_CALIBRATION_SAMPLE, seed=0):
+    """Fit a quantizer on a sample of the store's live vectors and encode every row"""
+    live_rows = np.flatnonzero(store._live)
+    if len(live_rows) == 0:
+        raise ValueError("Cannot fit quantization on an empty index")
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(live_rows, min(sample_size, len(live_rows)), replace=False))
+    quantizer = Quantizer.fit(mode, store._vectors[sample])
+    store.set_quantizer(quantizer)
+    return quantizer
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from config import LOCAL_INDEX_PATH, PINECONE_DIMENSIONS
+    from src.local_store import LocalVectorStore
+
+    parser = argparse.ArgumentParser(description="Fit and encode quantized codes for the local index")
+    parser.add_argument("--mode", choices=QUANTIZATION_MODES, default="int8")
+    args = parser.parse_args()
+
+    store = LocalVectorStore(LOCAL_INDEX_PATH, embedding=None, dimensions=PINECONE_DIMENSIONS)
+    print(f"Encoding {len(store)} vectors as {args.mode} codes...")
+    quantizer = quantize_store(store, args.mode)
+    print(f"✅ {args.mode} codes ({quantizer.code_width} bytes/vector vs {PINECONE_DIMENSIONS * 4}) "
+          f"written to {LOCAL_INDEX_PATH}")
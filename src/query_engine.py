@@ -0,0 +1,206 @@
+"""
+Asyncio query engine.
+
+Runs the retrieve -> stuff -> LLM path of the QA chain with non-blocking
+I/O: query embedding in a thread pool, vector search through the vector
+store's async API and the LLM through ``ainvoke``. A process-wide semaphore
+caps concurrent requests and every request has a timeout.
+
+Synchronous front ends (Streamlit, Flask, CLIs) call ``run()``, which
+submits the request to one shared event loop running in a background thread,
+so blocking calls from many sessions overlap instead of queueing up.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.retrievers import ContextualCompressionRetriever
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    RETRIEVER_K, QUERY_MAX_CONCURRENCY, QUERY_TIMEOUT_SECONDS, QUERY_EMBED_THREADS
+)
+from src.answer_cache import CachedQAChain
+from src.local_store import normalize_rows
+from src.sparse_index import HybridRetriever
+from src.prompt import system_prompt
+from src.context_budget import count_tokens
+from src.tracing import record, increment, trace
+
+_loop = None
+_loop_lock = threading.Lock()
+_semaphores = weakref.WeakKeyDictionary()
+_embed_executor = None
+
+
+def get_event_loop():
+    """Return the shared event loop, starting its thread on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="query-engine-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def _get_semaphore():
+    # One per event loop: asyncio primitives cannot be shared across loops
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(QUERY_MAX_CONCURRENCY)
+    return _semaphores[loop]
+
+
+def _get_embed_executor():
+    global _embed_executor
+    with _loop_lock:
+        if _embed_executor is None:
+            _embed_executor = ThreadPoolExecutor(max_workers=QUERY_EMBED_THREADS,
+                                                 thread_name_prefix="query-embed")
+        return _embed_executor
+
+
+class AsyncQueryEngine:
+    """Retrieval + generation with async I/O, bounded concurrency and timeouts"""
+
+    def __init__(self, embeddings, vector_store, llm, prompt=system_prompt, k=RETRIEVER_K,
+                 timeout_seconds=QUERY_TIMEOUT_SECONDS, cache=None, hybrid=None, compressor=None):
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.llm = llm
+        self.prompt = prompt
+        self.k = k
+        self.timeout_seconds = timeout_seconds
+        self.cache = cache
+        # Optional HybridRetriever fusing BM25 hits into the dense candidates
+        self.hybrid = hybrid
+        # Optional document compressor (e.g. ContextBudgetCompressor) applied after search
+        self.compressor = compressor
+
+    @classmethod
+    def from_retriever(cls, retriever, llm, embeddings=None, **kwargs):
+        """Build an engine that searches the way ``retriever`` does (hybrid, rerank, budget)"""
+        compressor = None
+        if isinstance(retriever, ContextualCompressionRetriever):
+            compressor, retriever = retriever.base_compressor, retriever.base_retriever
+        vector_store = retriever.vectorstore
+        if isinstance(retriever, HybridRetriever):
+            k, hybrid = retriever.k, retriever
+        else:
+            k, hybrid = retriever.search_kwargs.get("k", RETRIEVER_K), None
+        return cls(
+            embeddings=embeddings or vector_store.embeddings,
+            vector_store=vector_store,
+            llm=llm,
+            k=k,
+            hybrid=hybrid,
+            compressor=compressor,
+            **kwargs,
+        )
+
+    @classmethod
+    def from_chain(cls, qa_chain, **kwargs):
+        """Build an engine from the components of an initialized QA chain"""
+        if isinstance(qa_chain, CachedQAChain):
+            kwargs.setdefault("cache", qa_chain.cache)
+            qa_chain = qa_chain.qa_chain
+        return cls.from_retriever(qa_chain.retriever, qa_chain.combine_documents_chain.llm_chain.llm, **kwargs)
+
+    async def embed_query(self, query):
+        submit_query = getattr(self.embeddings, "submit_query", None)
+        if submit_query is not None:
+            # Micro-batching embeddings: await the batch without holding a thread
+            return await asyncio.wrap_future(submit_query(query))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_embed_executor(), self.embeddings.embed_query, query)
+
+    async def search(self, query, vector):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        if self.hybrid is None:
+            documents = await self.vector_store.asimilarity_search_by_vector(vector, k=self.k)
+            record("query.vector_search", time.perf_counter() - start)
+        else:
+            dense = await self.vector_store.asimilarity_search_by_vector(vector, k=self.hybrid.candidate_k)
+            record("query.vector_search", time.perf_counter() - start)
+            documents = await loop.run_in_executor(None, self.hybrid.fuse, query, dense)
+        if self.compressor is not None:
+            documents = await loop.run_in_executor(None, self.compressor.compress_documents, documents, query)
+        return documents
+
+    async def generate(self, query, documents):
+        with trace("query.prompt"):
+            context = "\n\n".join(doc.page_content for doc in documents)
+            prompt_text = self.prompt.format(context=context, question=query)
+        start = time.perf_counter()
+        message = await self.llm.ainvoke(prompt_text)
+        record("query.llm", time.perf_counter() - start)
+        result = message.content if hasattr(message, "content") else str(message)
+        increment("tokens.prompt", count_tokens(prompt_text))
+        increment("tokens.completion", count_tokens(result))
+        return result
+
+    async def _answer(self, query, documents=None, vector=None):
+        timings = {}
+        start = time.perf_counter()
+        if vector is None:
+            vector = await self.embed_query(query)
+            timings["embed_seconds"] = time.perf_counter() - start
+            record("query.embed", timings["embed_seconds"])
+
+        cache_vector = normalize_rows(vector) if self.cache is not None else None
+        if self.cache is not None:
+            cached = self.cache.lookup(query, vector=cache_vector)
+            if cached is not None:
+                record("query.total", time.perf_counter() - start)
+                return {**cached, "query": query, "cached": True, "timings": timings}
+
+        if documents is None:
+            stage = time.perf_counter()
+            documents = await self.search(query, vector)
+            timings["search_seconds"] = time.perf_counter() - stage
+            record("query.retrieve", timings["search_seconds"])
+
+        stage = time.perf_counter()
+        result = await self.generate(query, documents)
+        timings["llm_seconds"] = time.perf_counter() - stage
+        timings["total_seconds"] = time.perf_counter() - start
+        record("query.total", timings["total_seconds"])
+
+        response = {"query": query, "result": result, "source_documents": documents}
+        if self.cache is not None:
+            self.cache.store(query, response, vector=cache_vector)
+        return {**response, "timings": timings}
+
+    async def answer(self, query, documents=None, vector=None):
+        """
+        Answer one question, waiting for a concurrency slot first. ``documents``
+        skips the search and ``vector`` (the query embedding) the embedding.
+        """
+        async with _get_semaphore():
+            return await asyncio.wait_for(self._answer(query, documents, vector), timeout=self.timeout_seconds)
+
+    async def answer_many(self, queries):
+        """Answer several questions concurrently; failures are returned as exceptions"""
+        return await asyncio.gather(*(self.answer(q) for q in queries), return_exceptions=True)
+
+    def run(self, query, documents=None):
+        """Blocking helper for synchronous callers; returns a RetrievalQA-style dict"""
+        future = asyncio.run_coroutine_threadsafe(self.answer(query, documents), get_event_loop())
+        return future.result()
+
+    def run_many(self, queries):
+        """Blocking helper that answers several questions concurrently"""
+        future = asyncio.run_coroutine_threadsafe(self.answer_many(queries), get_event_loop())
+        return future.result()
+
+    def invoke(self, inputs, **kwargs):
+        """Drop-in for ``qa_chain.invoke({"query": ...})``"""
+        return self.run(inputs["query"])
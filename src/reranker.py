@@ -0,0 +1,132 @@
+"""
+Optional cross-encoder reranking with a latency deadline.
+
+The first-stage retriever returns a wide candidate set (RERANK_CANDIDATE_K);
+a small local cross-encoder scores every (question, chunk) pair in one
+batched CPU call and only the best RETRIEVER_K chunks reach the prompt. If
+scoring misses the deadline, or the scoring thread is still busy with an
+earlier query, the first-stage order is kept, so a slow rerank never stalls
+an answer and late scoring calls never pile up behind each other.
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Optional, Sequence
+
+import numpy as np
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from pydantic import Field, PrivateAttr
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import RETRIEVER_K, RERANKER_MODEL_NAME, RERANKER_MAX_LENGTH, RERANK_DEADLINE_MS
+from src.tracing import record, increment
+
+_models = {}
+_models_lock = threading.Lock()
+_reranker = None
+
+
+def get_cross_encoder(model_name=RERANKER_MODEL_NAME):
+    """Load a cross-encoder once per process (CPU)"""
+    with _models_lock:
+        if model_name not in _models:
+            from sentence_transformers import CrossEncoder
+            start = time.perf_counter()
+            _models[model_name] = CrossEncoder(model_name, max_length=RERANKER_MAX_LENGTH, device="cpu")
+            print(f"✅ Loaded reranker {model_name} in {time.perf_counter() - start:.2f}s")
+        return _models[model_name]
+
+
+class CrossEncoderReranker(BaseDocumentCompressor):
+    """Keeps the ``top_n`` candidates a cross-encoder scores highest, within a deadline"""
+
+    model_name: str = RERANKER_MODEL_NAME
+    top_n: int = RETRIEVER_K
+    deadline_ms: Optional[float] = RERANK_DEADLINE_MS  # None waits for scoring to finish
+    stats: dict = Field(default_factory=lambda: {"reranked": 0, "deadline_misses": 0, "skipped_busy": 0,
+                                                 "seconds": 0.0})
+    # One scoring thread: the model already uses every core for a batch
+    _executor: ThreadPoolExecutor = PrivateAttr(
+        default_factory=lambda: ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+    )
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _in_flight: int = PrivateAttr(default=0)  # Calls submitted to the scoring thread and not finished
+
+    def _submit(self, fn, *args):
+        """Run fn on the scoring thread, or return None if it is still busy"""
+        with self._lock:
+            if self._in_flight:
+                return None
+            self._in_flight += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def warm_up(self):
+        """Start loading the model on the scoring thread so the first query does not pay for it"""
+        return self._submit(get_cross_encoder, self.model_name)
+
+    def score(self, query, documents):
+        """Cross-encoder relevance scores for every document, in one batched call"""
+        pairs = [(query, doc.page_content) for doc in documents]
+        model = get_cross_encoder(self.model_name)
+        return np.asarray(model.predict(pairs, batch_size=len(pairs), show_progress_bar=False))
+
+    def compress_documents(self, documents: Sequence[Document], query: str,
+                           callbacks: Optional[Callbacks] = None) -> Sequence[Document]:
+        documents = list(documents)
+        if len(documents) <= 1:
+            return documents
+
+        start = time.perf_counter()
+        future = self._submit(self.score, query, documents)
+        if future is None:
+            # Queueing behind a late call would only miss this deadline too
+            with self._lock:
+                self.stats["skipped_busy"] += 1
+            increment("rerank.skipped_busy")
+            print("⏱️ Reranker busy with an earlier query, keeping first-stage order")
+            return documents[:self.top_n]
+        try:
+            scores = future.result(timeout=None if self.deadline_ms is None else self.deadline_ms / 1000)
+        except TimeoutError:
+            # Only stops calls that have not started; a running one finishes in the background
+            future.cancel()
+            with self._lock:
+                self.stats["deadline_misses"] += 1
+            increment("rerank.deadline_misses")
+            print(f"⏱️ Rerank missed its {self.deadline_ms:.0f} ms deadline, keeping first-stage order")
+            return documents[:self.top_n]
+
+        elapsed = time.perf_counter() - start
+        record("query.rerank", elapsed)
+        with self._lock:
+            self.stats["reranked"] += 1
+            self.stats["seconds"] += elapsed
+        best = np.argsort(-scores, kind="stable")[:self.top_n]
+        print(f"🔀 Reranked {len(documents)} candidates in {elapsed * 1000:.0f} ms")
+        return [
+            Document(page_content=documents[i].page_content,
+                     metadata={**documents[i].metadata, "rerank_score": float(scores[i])},
+                     id=documents[i].id)
+            for i in best
+        ]
+
+
+def get_reranker():
+    """Process-wide reranker; its model starts loading in the background on first call"""
+    global _reranker
+    with _models_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker()
+            _reranker.warm_up()
+        return _reranker
@@ -0,0 +1,193 @@
+"""
+Process-wide cache of the heavy, stateless pieces of the QA pipeline.
+
+The embedding model, the vector store (with its Pinecone client, or the
+memory-mapped local index), the ChatOpenAI client and the QA chain built
+from them are created once per process and shared by every Streamlit
+session, so a session only keeps its chat history.
+
+A resource is health-checked when it is handed out, at most every
+RESOURCE_HEALTH_CHECK_SECONDS, and right away after a request reported a
+failure. Resources that fail their check are rebuilt (reconnected). The
+vector store pings its index. The chain is rebuilt when it no longer wraps
+the current vector store and LLM, or when ingestion changed the index (and
+keyword index) since the chain was built. The LLM client has no cheap check
+and is only rebuilt after a reported failure.
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    OPENAI_API_KEY, LLM_MODEL, LLM_TEMPERATURE, ANSWER_CACHE_ENABLED, RESOURCE_HEALTH_CHECK_SECONDS
+)
+from src.answer_cache import manifest_index_version
+from src.tracing import increment, record
+
+
+class SharedResource:
+    """One lazily built, process-wide object, rebuilt when its health check fails"""
+
+    def __init__(self, name, build, check=None, check_interval=RESOURCE_HEALTH_CHECK_SECONDS):
+        self.name = name
+        self.build = build
+        # check(value) -> bool; without one, the value is only rebuilt after report_failure()
+        self.check = check
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._checked_at = 0.0
+        self._suspect = False
+        self.stats = {"builds": 0, "checks": 0, "reconnects": 0}
+
+    def get(self):
+        """The shared value, built on first use and rebuilt if unhealthy"""
+        with self._lock:
+            due = time.monotonic() - self._checked_at >= self.check_interval
+            if self._value is not None and (self._suspect or due) and not self._healthy():
+                self._value = None
+                self.stats["reconnects"] += 1
+                increment(f"resources.{self.name}.reconnects")
+                print(f"🔄 Reconnecting shared {self.name}")
+            if self._value is None:
+                start = time.perf_counter()
+                self._value = self.build()
+                record(f"resources.build_{self.name}", time.perf_counter() - start)
+                self.stats["builds"] += 1
+                self._checked_at = time.monotonic()
+                self._suspect = False
+            return self._value
+
+    def _healthy(self):
+        suspect, self._suspect = self._suspect, False
+        self._checked_at = time.monotonic()
+        if self.check is None:
+            return not suspect
+        self.stats["checks"] += 1
+        try:
+            return bool(self.check(self._value))
+        except Exception as e:
+            print(f"⚠️ Shared {self.name} failed its health check: {e}")
+            return False
+
+    def peek(self):
+        """The current value without building or checking it (None if not built)"""
+        return self._value
+
+    def report_failure(self):
+        """Check (or rebuild) the value the next time it is handed out"""
+        self._suspect = True
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+
+def build_llm():
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=LLM_MODEL, openai_api_key=OPENAI_API_KEY, temperature=LLM_TEMPERATURE)
+
+
+def build_embeddings():
+    from src.helper import download_hugging_face_model
+    return download_hugging_face_model()
+
+
+def build_vector_store(embeddings):
+    from src.vector_store import open_vector_store
+    return open_vector_store(embeddings)
+
+
+def vector_store_healthy(vector_store):
+    """Ping the index: the local index files must still exist, Pinecone must answer a stats call"""
+    from src.local_store import LocalVectorStore, local_index_exists
+    if isinstance(vector_store, LocalVectorStore):
+        return local_index_exists(vector_store.path)
+    vector_store.index.describe_index_stats()
+    return True
+
+
+class ResourceCache:
+    """Embeddings, vector store, LLM and QA chain shared by every session of this process"""
+
+    def __init__(self, build_embeddings=build_embeddings, build_vector_store=build_vector_store,
+                 build_llm=build_llm, check_interval=RESOURCE_HEALTH_CHECK_SECONDS):
+        # The embedding model runs in-process: there is no connection to check
+        self.embeddings = SharedResource("embeddings", build_embeddings, check=lambda _: True,
+                                         check_interval=check_interval)
+        self._open_vector_store = build_vector_store
+        self.vector_store = SharedResource("vector_store", self._build_vector_store,
+                                           check=self._vector_store_current, check_interval=check_interval)
+        self.llm = SharedResource("llm", build_llm, check_interval=check_interval)
+        self.qa_chain = SharedResource("qa_chain", self._build_qa_chain, check=self._qa_chain_current,
+                                       check_interval=check_interval)
+        self._built_from = {}  # resource name -> what it was built from, for the checks
+
+    def _build_vector_store(self):
+        self._built_from["vector_store"] = manifest_index_version()
+        return self._open_vector_store(self.embeddings.get())
+
+    def _vector_store_current(self, vector_store):
+        # A local store only sees rows written by another process after reopening
+        local_changed = (hasattr(vector_store, "path")
+                         and self._built_from.get("vector_store") != manifest_index_version())
+        return not local_changed and vector_store_healthy(vector_store)
+
+    def _build_qa_chain(self):
+        from langchain.chains import RetrievalQA
+        from src.answer_cache import CachedQAChain, get_answer_cache
+        from src.prompt import system_prompt
+        from src.vector_store import build_qa_retriever
+
+        embeddings, vector_store, llm = self.embeddings.get(), self.vector_store.get(), self.llm.get()
+        qa_chain = RetrievalQA.from_chain_type(
+            llm=llm,
+            chain_type="stuff",
+            retriever=build_qa_retriever(vector_store),
+            # "prompt", as in app.py: the "prompt_template" key streamlit_app.py used to pass is
+            # rejected by the stuff chain, so the Streamlit chain could not be built at all
+            chain_type_kwargs={"prompt": system_prompt},
+            return_source_documents=True
+        )
+        if ANSWER_CACHE_ENABLED:
+            # Similar questions from any session skip retrieval and the LLM
+            qa_chain = CachedQAChain(qa_chain, get_answer_cache(embeddings))
+        self._built_from["qa_chain"] = (vector_store, llm, manifest_index_version())
+        return qa_chain
+
+    def _qa_chain_current(self, qa_chain):
+        vector_store, llm, version = self._built_from["qa_chain"]
+        # Checks (and reconnects) the components first; a new one means a new chain
+        return (self.vector_store.get() is vector_store and self.llm.get() is llm
+                and manifest_index_version() == version)
+
+    def report_failure(self):
+        """A request failed: check the connections before the next one"""
+        for resource in (self.vector_store, self.llm, self.qa_chain):
+            resource.report_failure()
+
+    def invalidate_index(self):
+        """The index was rebuilt in this process: reopen the vector store and rebuild the chain"""
+        self.vector_store.invalidate()
+        self.qa_chain.invalidate()
+
+    def status(self):
+        return {resource.name: {"built": resource.peek() is not None, **resource.stats}
+                for resource in (self.embeddings, self.vector_store, self.llm, self.qa_chain)}
+
+
+_shared_resources = None
+_shared_resources_lock = threading.Lock()
+
+
+def get_resource_cache():
+    """The process-wide resource cache"""
+    global _shared_resources
+    with _shared_resources_lock:
+        if _shared_resources is None:
+            _shared_resources = ResourceCache()
+        return _shared_resources
@@ -0,0 +1,261 @@
+"""
+BM25 keyword index and hybrid (BM25 + dense) retrieval.
+
+Chunks are staged in SQLite while ingestion adds or deletes them, then
+compiled into a compact inverted index: one vocabulary, and postings
+(document rows and term frequencies) concatenated into flat NumPy arrays
+with per-term offsets. The arrays are saved as .npy files and memory-mapped
+on load. A build replaces the files atomically, vocabulary last; open
+indexes keep searching their mapped copy and reload once the vocabulary
+file changes. At query time BM25 results are fused with the dense results by
+reciprocal rank fusion, so exact drug names, ICD codes and abbreviations
+rank well even when the embedding model matches them poorly.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import Counter
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    BM25_K1, BM25_B, HYBRID_RETRIEVAL_ENABLED, HYBRID_CANDIDATE_K, RRF_K, RETRIEVER_K,
+    SPARSE_INDEX_PATH
+)
+from src.local_store import save_array, top_k_indices
+from src.tracing import trace
+
+STAGING_FILE = "chunks.sqlite"
+VOCABULARY_FILE = "vocabulary.json"
+OFFSETS_FILE = "postings_offsets.npy"
+POSTING_ROWS_FILE = "postings_rows.npy"
+POSTING_TFS_FILE = "postings_tfs.npy"
+DOC_LENGTHS_FILE = "doc_lengths.npy"
+ROW_IDS_FILE = "row_ids.npy"
+
+# Words, numbers, and dotted/hyphenated codes such as "e11.9" or "covid-19"
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+
+def tokenize(text):
+    """Lowercase keyword tokens, keeping codes like ICD-10 'E11.9' intact"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def sparse_index_exists(path=SPARSE_INDEX_PATH):
+    """True once a keyword index has been compiled at ``path``"""
+    return os.path.exists(os.path.join(path, VOCABULARY_FILE))
+
+
+class SparseIndex:
+    """BM25 inverted index with SQLite staging and memory-mapped postings"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(path, STAGING_FILE), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._db.commit()
+        self._load()
+
+    # Staging ---------------------------------------------------------------
+
+    def add(self, ids, texts, metadatas):
+        """Stage chunks; they become searchable after the next build()"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (id, text, metadata) VALUES (?, ?, ?)",
+                [(chunk_id, text, json.dumps(metadata))
+                 for chunk_id, text, metadata in zip(ids, texts, metadatas)],
+            )
+            self._db.commit()
+
+    def delete(self, ids):
+        with self._lock:
+            self._db.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id in ids])
+            self._db.commit()
+
+    def staged_count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    # Compile ---------------------------------------------------------------
+
+    def build(self):
+        """Compile the staged chunks into the on-disk inverted index"""
+        with self._lock:
+            vocabulary = {}
+            term_rows, term_tfs = [], []
+            doc_lengths, row_ids = [], []
+            for row, (chunk_id, text) in enumerate(self._db.execute("SELECT id, text FROM chunks ORDER BY id")):
+                counts = Counter(tokenize(text))
+                doc_lengths.append(sum(counts.values()))
+                row_ids.append(chunk_id)
+                for term, tf in counts.items():
+                    term_id = vocabulary.setdefault(term, len(vocabulary))
+                    if term_id == len(term_rows):
+                        term_rows.append([])
+                        term_tfs.append([])
+                    term_rows[term_id].append(row)
+                    term_tfs[term_id].append(min(tf, np.iinfo(np.uint16).max))
+
+            offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+            np.cumsum([len(rows) for rows in term_rows], out=offsets[1:])
+            rows = np.fromiter((r for rows in term_rows for r in rows), dtype=np.int32, count=int(offsets[-1]))
+            tfs = np.fromiter((t for tfs in term_tfs for t in tfs), dtype=np.uint16, count=int(offsets[-1]))
+
+            # Row -> chunk id lives with the arrays, so an open index never mixes two builds
+            save_array(os.path.join(self.path, OFFSETS_FILE), offsets)
+            save_array(os.path.join(self.path, POSTING_ROWS_FILE), rows)
+            save_array(os.path.join(self.path, POSTING_TFS_FILE), tfs)
+            save_array(os.path.join(self.path, DOC_LENGTHS_FILE), np.asarray(doc_lengths, dtype=np.int32))
+            save_array(os.path.join(self.path, ROW_IDS_FILE), np.asarray(row_ids, dtype=str))
+            # The vocabulary goes last: replacing it is what open indexes reload on
+            vocabulary_path = os.path.join(self.path, VOCABULARY_FILE)
+            with open(f"{vocabulary_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(vocabulary, f)
+            os.replace(f"{vocabulary_path}.tmp", vocabulary_path)
+            # Row mapping of the previous format
+            self._db.execute("DROP TABLE IF EXISTS compiled_rows")
+            self._db.commit()
+        self._load()
+        print(f"🔎 Keyword index built: {len(doc_lengths)} chunks, {len(vocabulary)} terms")
+
+    def _version(self):
+        """Stamp of the last build: os.replace gives the vocabulary file a new inode"""
+        try:
+            stat = os.stat(os.path.join(self.path, VOCABULARY_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load(self):
+        with self._lock:
+            self.version = self._version()
+            self.vocabulary = None
+            if self.version is None:
+                return
+            if not os.path.exists(os.path.join(self.path, ROW_IDS_FILE)):
+                print("⚠️ Keyword index was built by an older version, falling back to dense retrieval "
+                      "until the next ingestion rebuilds it")
+                return
+            with open(os.path.join(self.path, VOCABULARY_FILE), "r", encoding="utf-8") as f:
+                vocabulary = json.load(f)
+            self.offsets = np.load(os.path.join(self.path, OFFSETS_FILE), mmap_mode="r")
+            self.rows = np.load(os.path.join(self.path, POSTING_ROWS_FILE), mmap_mode="r")
+            self.tfs = np.load(os.path.join(self.path, POSTING_TFS_FILE), mmap_mode="r")
+            self.doc_lengths = np.load(os.path.join(self.path, DOC_LENGTHS_FILE), mmap_mode="r")
+            self.row_ids = np.load(os.path.join(self.path, ROW_IDS_FILE), mmap_mode="r")
+            self.average_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+            self.vocabulary = vocabulary
+
+    def reload_if_rebuilt(self):
+        """Pick up a build made by another process (or another instance)"""
+        if self._version() != self.version:
+            self._load()
+
+    @property
+    def is_built(self):
+        return self.vocabulary is not None and len(self.doc_lengths) > 0
+
+    # Search ----------------------------------------------------------------
+
+    def search(self, query, k, k1=BM25_K1, b=BM25_B):
+        """BM25 top-k; returns a list of (Document, score), best first"""
+        self.reload_if_rebuilt()
+        with self._lock:
+            if not self.is_built:
+                return []
+            # One build's arrays for the whole query, even if a reload swaps them meanwhile
+            vocabulary, offsets, postings, posting_tfs = self.vocabulary, self.offsets, self.rows, self.tfs
+            doc_lengths, row_ids, average_length = self.doc_lengths, self.row_ids, self.average_length
+        n_docs = len(doc_lengths)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        length_norm = k1 * (1 - b + b * np.asarray(doc_lengths, dtype=np.float32) / average_length)
+
+        for term in set(tokenize(query)):
+            term_id = vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, stop = offsets[term_id], offsets[term_id + 1]
+            rows = np.asarray(postings[start:stop])
+            tfs = np.asarray(posting_tfs[start:stop], dtype=np.float32)
+            idf = np.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tfs * (k1 + 1) / (tfs + length_norm[rows])
+
+        best = [int(row) for row in top_k_indices(scores, k) if scores[row] > 0]
+        ids = [str(row_ids[row]) for row in best]
+        documents = self._documents_for_ids(ids)
+        # Chunks deleted since the build are skipped
+        return [(documents[chunk_id], float(scores[row])) for row, chunk_id in zip(best, ids) if chunk_id in documents]
+
+    def _documents_for_ids(self, ids):
+        if not ids:
+            return {}
+        with self._lock:
+            return {
+                chunk_id: Document(page_content=text, metadata=json.loads(metadata), id=chunk_id)
+                for chunk_id, text, metadata in self._db.execute(
+                    f"SELECT id, text, metadata FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids
+                )
+            }
+
+
+def document_key(doc):
+    """Identity used to merge the same chunk coming from different retrievers"""
+    return doc.id or doc.page_content
+
+
+def reciprocal_rank_fusion(ranked_lists, k, rrf_k=RRF_K):
+    """Fuse several ranked Document lists; a document scores sum(1 / (rrf_k + rank))"""
+    scores, documents = {}, {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked):
+            key = document_key(doc)
+            documents.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in best]
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense + BM25 retrieval fused with reciprocal rank fusion"""
+
+    vectorstore: VectorStore
+    sparse_index: SparseIndex
+    k: int = RETRIEVER_K
+    candidate_k: int = HYBRID_CANDIDATE_K
+    rrf_k: int = RRF_K
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def fuse(self, query, dense):
+        """Fuse already-retrieved dense candidates with BM25 hits for ``query``"""
+        with trace("query.keyword_search"):
+            sparse = [doc for doc, _ in self.sparse_index.search(query, self.candidate_k)]
+        return reciprocal_rank_fusion([dense, sparse], self.k, self.rrf_k)
+
+    def _get_relevant_documents(self, query, *, run_manager: CallbackManagerForRetrieverRun):
+        return self.fuse(query, self.vectorstore.similarity_search(query, k=self.candidate_k))
+
+
+def build_retriever(vector_store, k=RETRIEVER_K):
+    """Hybrid retriever when enabled and the keyword index exists, else plain dense retrieval"""
+    if HYBRID_RETRIEVAL_ENABLED and sparse_index_exists(SPARSE_INDEX_PATH):
+        return HybridRetriever(vectorstore=vector_store, sparse_index=SparseIndex(SPARSE_INDEX_PATH),
+                               k=k, candidate_k=max(HYBRID_CANDIDATE_K, k))
+    return vector_store.as_retriever(search_kwargs={"k": k})
@@ -0,0 +1,95 @@
+"""
+Deferred loading of the heavy modules behind the Streamlit app.
+
+The app script imports only Streamlit and config at the top, so the first
+render does not wait for LangChain, Pinecone, OpenAI or the embedding
+model. ``preload_in_background()`` imports those modules in a daemon thread
+right after the page starts rendering and then warms up the embedding
+model; code that needs a module imports it lazily inside the function,
+which is instant once the preload has finished (Python's import lock makes
+an early caller wait for the in-flight import rather than importing twice).
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# In the order they are first needed by the UI
+PRELOAD_MODULES = [
+    "src.tracing",
+    "src.local_store",
+    "src.embeddings",
+    "src.vector_store",
+    "src.helper",
+    "src.answer_cache",
+    "src.streaming_qa",
+    "src.query_engine",
+    "langchain.chains",
+    "langchain_openai",
+]
+
+_preload_thread = None
+_preload_done = threading.Event()
+_preload_lock = threading.Lock()
+_preload_seconds = None
+_preload_error = None
+
+
+def loaded_module(name):
+    """The module if it has finished importing, else None (never triggers an import)"""
+    module = sys.modules.get(name)
+    # Modules appear in sys.modules before their body has run; importlib flags them meanwhile
+    if module is None or getattr(getattr(module, "__spec__", None), "_initializing", False):
+        return None
+    return module
+
+
+def preload_in_background(modules=PRELOAD_MODULES):
+    """Import heavy modules, then warm up the embedding model, in a daemon thread (once per process)"""
+    global _preload_thread
+    with _preload_lock:
+        if _preload_thread is not None:
+            return _preload_thread
+
+        def _target():
+            global _preload_seconds, _preload_error
+            start = time.perf_counter()
+            try:
+                for name in modules:
+                    importlib.import_module(name)
+                _preload_seconds = time.perf_counter() - start
+                print(f"✅ Modules preloaded in {_preload_seconds:.2f}s")
+
+                from src.tracing import record, start_metrics_exporter
+                from src.embeddings import warm_up_in_background
+                record("startup.preload", _preload_seconds)
+                start_metrics_exporter()
+                warm_up_in_background()
+            except Exception as e:
+                print(f"❌ Error preloading modules: {e}")
+                _preload_error = f"{type(e).__name__}: {e}"
+            finally:
+                _preload_done.set()
+
+        _preload_thread = threading.Thread(target=_target, name="module-preload", daemon=True)
+        _preload_thread.start()
+        return _preload_thread
+
+
+def is_preloaded():
+    return _preload_done.is_set()
+
+
+def preload_error():
+    """Why the background preload failed (the embedding model is then never warmed up), or None"""
+    return _preload_error
+
+
+def preload_seconds():
+    """How long the background imports took, or None while still running"""
+    return _preload_seconds
@@ -0,0 +1,226 @@
+"""
+Streaming ingestion: PDF pages -> chunks -> embedding batches -> upserts.
+
+Stages run in their own threads and are connected by bounded queues, so a
+slow stage blocks the ones before it instead of letting work pile up in
+memory. The page reader additionally pauses while the process is above a
+configurable RSS ceiling. Peak memory depends on the queue and batch sizes,
+not on the size of the corpus (only chunk ids are kept for the manifest).
+"""
+
+import gc
+import os
+import queue
+import sys
+import threading
+import time
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    PDF_DATA_PATH, INGESTION_MANIFEST_PATH,
+    STREAMING_BATCH_SIZE, STREAMING_QUEUE_SIZE, STREAMING_MEMORY_CEILING_MB
+)
+from src.embeddings import current_rss_bytes
+from src.chunker import chunker_settings
+from src.helper import text_split
+from src.ingestion import (
+    MANIFEST_VERSION, assign_chunk_ids, file_sha256, list_pdf_files,
+    save_manifest, upsert_embeddings
+)
+from src.tracing import trace
+
+_DONE = object()
+
+
+def iter_pdf_pages(data=PDF_DATA_PATH, hashes=None):
+    """
+    Yield (path, page) one page at a time (only one file's page text is held
+    at once). ``hashes``, when given, receives each file's SHA-256, taken as
+    the file is opened for extraction.
+    """
+    from src.pdf_extract import load_pdf
+
+    for path in list_pdf_files(data):
+        digest = file_sha256(path)
+        if hashes is not None:
+            hashes[path] = digest
+        for page in load_pdf(path, digest=digest):
+            yield path, page
+
+
+def _group_by_file(pages):
+    """Yield (path, pages) for each file of a (path, page) stream"""
+    current_path, file_pages = None, []
+    for path, page in pages:
+        if path != current_path and file_pages:
+            yield current_path, file_pages
+            file_pages = []
+        current_path = path
+        file_pages.append(page)
+    if file_pages:
+        yield current_path, file_pages
+
+
+def iter_chunk_batches(pages, batch_size=STREAMING_BATCH_SIZE):
+    """Split pages with text_split and group the chunks into fixed-size batches"""
+    batch = []
+    for path, file_pages in _group_by_file(pages):
+        # Whole files, like sync_index: sections spanning pages stay intact and chunk ids match
+        chunks = text_split(extracted_data=file_pages, workers=1)
+        for chunk_id, content_hash, chunk in assign_chunk_ids(path, chunks):
+            batch.append((path, chunk_id, content_hash, chunk))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _wait_for_memory(ceiling_bytes, pending, poll_seconds=0.2):
+    """
+    Block while the process is above the memory ceiling.
+
+    Waiting only helps while downstream stages still hold batches they can
+    release, so the wait ends once ``pending()`` reports nothing in flight.
+    """
+    rss = current_rss_bytes()
+    if rss is None or rss <= ceiling_bytes:
+        return
+    gc.collect()
+    while pending() > 0:
+        rss = current_rss_bytes()
+        if rss is None or rss <= ceiling_bytes:
+            return
+        time.sleep(poll_seconds)
+
+
+def stream_index(vector_store, embeddings, data=PDF_DATA_PATH,
+                 manifest_path=INGESTION_MANIFEST_PATH,
+                 batch_size=STREAMING_BATCH_SIZE, queue_size=STREAMING_QUEUE_SIZE,
+                 memory_ceiling_mb=STREAMING_MEMORY_CEILING_MB, upserter=None,
+                 sparse_index=None):
+    """
+    Ingest every PDF in the data directory with bounded memory.
+
+    Batches go through ``upserter`` (a BulkUpserter) when given, so uploads
+    overlap with embedding, and are staged in ``sparse_index`` when given.
+    Writes an ingestion manifest at the end so later runs can use the
+    incremental sync_index() path. Returns a summary dict.
+    """
+    chunk_queue = queue.Queue(maxsize=queue_size)
+    vector_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    ceiling_bytes = memory_ceiling_mb * 1024 * 1024
+    manifest_files = {}
+    # Hashes of the versions that were streamed: a PDF edited mid-run is re-parsed by the next sync
+    file_hashes = {}
+    summary = {"pages": 0, "chunks": 0, "batches": 0, "peak_rss_bytes": 0}
+
+    def _put(q, item):
+        # Blocking put that gives up once another stage has failed
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(q):
+        # Blocking get that returns _DONE once another stage has failed
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _counted_pages():
+        for path, page in iter_pdf_pages(data, file_hashes):
+            summary["pages"] += 1
+            yield path, page
+
+    def read_and_split():
+        try:
+            for batch in iter_chunk_batches(_counted_pages(), batch_size):
+                _wait_for_memory(ceiling_bytes, lambda: chunk_queue.qsize() + vector_queue.qsize())
+                if not _put(chunk_queue, batch):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(chunk_queue, _DONE)
+
+    def embed():
+        try:
+            while True:
+                batch = _get(chunk_queue)
+                if batch is _DONE:
+                    break
+                texts = [chunk.page_content for _, _, _, chunk in batch]
+                with trace("ingest.embed"):
+                    vectors = embeddings.embed_documents(texts)
+                if not _put(vector_queue, (batch, vectors)):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(vector_queue, _DONE)
+
+    def upsert():
+        try:
+            while True:
+                item = _get(vector_queue)
+                if item is _DONE:
+                    break
+                batch, vectors = item
+                ids = [chunk_id for _, chunk_id, _, _ in batch]
+                texts = [chunk.page_content for _, _, _, chunk in batch]
+                metadatas = [chunk.metadata for _, _, _, chunk in batch]
+                with trace("ingest.upsert"):
+                    if upserter is not None:
+                        upserter.submit(ids, texts, vectors, metadatas)
+                    else:
+                        upsert_embeddings(vector_store, ids, texts, vectors, metadatas)
+                if sparse_index is not None:
+                    sparse_index.add(ids, texts, metadatas)
+                for path, chunk_id, content_hash, _ in batch:
+                    manifest_files.setdefault(path, {})[chunk_id] = content_hash
+                summary["chunks"] += len(batch)
+                summary["batches"] += 1
+                rss = current_rss_bytes() or 0
+                summary["peak_rss_bytes"] = max(summary["peak_rss_bytes"], rss)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [
+        threading.Thread(target=read_and_split, name="ingest-read", daemon=True),
+        threading.Thread(target=embed, name="ingest-embed", daemon=True),
+        threading.Thread(target=upsert, name="ingest-upsert", daemon=True),
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    if upserter is not None:
+        upserter.flush()
+
+    manifest = {"version": MANIFEST_VERSION, "files": {
+        path: {"sha256": file_hashes[path], "chunker": chunker_settings(), "chunks": chunks}
+        for path, chunks in manifest_files.items()
+    }}
+    save_manifest(manifest, manifest_path)
+
+    summary["seconds"] = time.perf_counter() - start
+    print(f"✅ Streamed {summary['pages']} pages into {summary['chunks']} chunks "
+          f"in {summary['seconds']:.1f}s (peak RSS {summary['peak_rss_bytes'] / 1e6:.0f} MB)")
+    return summary
@@ -0,0 +1,85 @@
+"""
+Streaming question answering.
+
+Runs the same retrieve -> stuff -> LLM steps as the RetrievalQA chain, but
+split so the caller can show the sources as soon as retrieval finishes and
+render LLM tokens as they arrive. Time-to-first-token is measured per answer.
+"""
+
+import os
+import sys
+import time
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.answer_cache import CachedQAChain
+from src.prompt import system_prompt
+from src.context_budget import count_tokens
+from src.tracing import record, increment, trace
+
+
+class StreamingQA:
+    """Retriever + LLM pair that yields answer tokens instead of a full response"""
+
+    def __init__(self, retriever, llm, prompt=system_prompt, cache=None):
+        self.retriever = retriever
+        self.llm = llm
+        self.prompt = prompt
+        self.cache = cache
+        self.last_timings = {}
+
+    @classmethod
+    def from_chain(cls, qa_chain):
+        """Reuse the retriever, LLM and answer cache of an initialized QA chain"""
+        cache = None
+        if isinstance(qa_chain, CachedQAChain):
+            cache = qa_chain.cache
+            qa_chain = qa_chain.qa_chain
+        llm = qa_chain.combine_documents_chain.llm_chain.llm
+        return cls(qa_chain.retriever, llm, cache=cache)
+
+    def lookup_cached(self, query):
+        """Return a cached response for a similar question, if any"""
+        if self.cache is None:
+            return None
+        return self.cache.lookup(query)
+
+    def retrieve(self, query):
+        """Fetch the context documents for a question"""
+        start = time.perf_counter()
+        documents = self.retriever.invoke(query)
+        self.last_timings = {"retrieval_seconds": time.perf_counter() - start}
+        record("query.retrieve", self.last_timings["retrieval_seconds"])
+        return documents
+
+    def stream(self, query, documents):
+        """Yield answer tokens; caches the full response once the stream ends"""
+        with trace("query.prompt"):
+            context = "\n\n".join(doc.page_content for doc in documents)
+            prompt_text = self.prompt.format(context=context, question=query)
+
+        start = time.perf_counter()
+        first_token_at = None
+        tokens = []
+        for chunk in self.llm.stream(prompt_text):
+            token = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if not token:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                ttft = first_token_at - start
+                self.last_timings["ttft_seconds"] = ttft
+                record("query.ttft", ttft)
+                print(f"⏱️ Time to first token: {ttft * 1000:.0f} ms "
+                      f"(retrieval {self.last_timings.get('retrieval_seconds', 0) * 1000:.0f} ms)")
+            tokens.append(token)
+            yield token
+
+        self.last_timings["generation_seconds"] = time.perf_counter() - start
+        record("query.llm", self.last_timings["generation_seconds"])
+        answer = "".join(tokens)
+        increment("tokens.prompt", count_tokens(prompt_text))
+        increment("tokens.completion", count_tokens(answer))
+        if self.cache is not None:
+            response = {"query": query, "result": answer, "source_documents": documents}
+            self.cache.store(query, response)
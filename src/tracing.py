@@ -0,0 +1,139 @@
+"""
+Per-stage latency tracing for the query and ingestion paths.
+
+Stages are timed with ``with trace("query.search"):`` (or ``record()`` for
+durations measured elsewhere); the latest TRACE_MAX_SAMPLES durations of
+each stage are kept for p50/p95/p99. Counters track token counts and cache
+hits. ``metrics_snapshot()`` is shown in the Streamlit debug panel, served
+by the query service's /metrics endpoint and, with
+``start_metrics_exporter()``, written to TRACE_EXPORT_PATH periodically.
+
+``profile_request()`` runs a sample of requests under cProfile and keeps the
+profile of any that exceed TRACE_SLOW_REQUEST_SECONDS, for
+``python -m pstats`` or snakeviz. It profiles the calling thread only.
+"""
+
+import cProfile
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    TRACING_ENABLED, TRACE_MAX_SAMPLES, TRACE_EXPORT_PATH, TRACE_EXPORT_INTERVAL_SECONDS,
+    TRACE_PROFILE_ENABLED, TRACE_PROFILE_SAMPLE_RATE, TRACE_SLOW_REQUEST_SECONDS, TRACE_PROFILE_DIR
+)
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=TRACE_MAX_SAMPLES))
+_counters = defaultdict(int)
+_exporter = None
+
+
+def record(stage, seconds):
+    """Add one duration sample for a stage"""
+    if not TRACING_ENABLED:
+        return
+    with _lock:
+        _samples[stage].append(seconds)
+
+
+@contextmanager
+def trace(stage):
+    """Time the enclosed block as one sample of ``stage`` (recorded even if it raises)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def increment(counter, amount=1):
+    """Add to a counter such as 'tokens.prompt' or 'answer_cache.hits'"""
+    if not TRACING_ENABLED or not amount:
+        return
+    with _lock:
+        _counters[counter] += amount
+
+
+def metrics_snapshot():
+    """Per-stage count/mean/p50/p95/p99 (milliseconds) and all counters"""
+    with _lock:
+        samples = {stage: np.array(values) for stage, values in _samples.items() if values}
+        counters = dict(_counters)
+    stages = {}
+    for stage, values in sorted(samples.items()):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+        stages[stage] = {
+            "count": len(values),
+            "mean_ms": float(values.mean() * 1000),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+        }
+    return {"timestamp": time.time(), "stages": stages, "counters": counters}
+
+
+def reset_metrics():
+    with _lock:
+        _samples.clear()
+        _counters.clear()
+
+
+def export_metrics(path=TRACE_EXPORT_PATH):
+    """Write the current snapshot to ``path`` atomically"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metrics_snapshot(), f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def start_metrics_exporter(path=TRACE_EXPORT_PATH, interval_seconds=TRACE_EXPORT_INTERVAL_SECONDS):
+    """Export the snapshot every ``interval_seconds`` from a daemon thread (once per process)"""
+    global _exporter
+    if not TRACING_ENABLED or not path:
+        return
+    with _lock:
+        if _exporter is not None:
+            return
+
+        def _run():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    export_metrics(path)
+                except OSError as e:
+                    print(f"⚠️ Could not export metrics to {path}: {e}")
+
+        _exporter = threading.Thread(target=_run, name="metrics-exporter", daemon=True)
+        _exporter.start()
+
+
+@contextmanager
+def profile_request(name):
+    """cProfile a sampled request; keep the profile only if it was slow"""
+    if not TRACE_PROFILE_ENABLED or random.random() >= TRACE_PROFILE_SAMPLE_RATE:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        if elapsed >= TRACE_SLOW_REQUEST_SECONDS:
+            os.makedirs(TRACE_PROFILE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{elapsed * 1000:.0f}ms.prof")
+            profiler.dump_stats(path)
+            print(f"🐢 Slow {name} ({elapsed:.2f}s), profile saved to {path}")
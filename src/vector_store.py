@@ -1,67 +1,145 @@
-from pinecone import Pinecone, ServerlessSpec
 import sys
 import os
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import PINECONE_API_KEY, PINECONE_INDEX_NAME, PDF_DATA_PATH
-from src.helper import load_pdf_file, text_split, download_hugging_face_model
+from config import (
+    PINECONE_API_KEY, PINECONE_INDEX_NAME, PINECONE_DIMENSIONS, PDF_DATA_PATH,
+    INGESTION_MANIFEST_PATH, INGESTION_MODE, VECTOR_STORE_BACKEND, LOCAL_INDEX_PATH, LOCAL_INDEX_TYPE,
+    LOCAL_INDEX_QUANTIZATION, QUANTIZATION_RESCORE, QUANTIZATION_RESCORE_FACTOR,
+    BULK_UPSERT_TRANSPORT, HYBRID_RETRIEVAL_ENABLED, SPARSE_INDEX_PATH, RETRIEVER_K,
+    RERANKER_ENABLED, RERANK_CANDIDATE_K, CONTEXT_BUDGET_ENABLED
+)
+from src.helper import download_hugging_face_model
+from src.embeddings import get_ingestion_embeddings
+from src.bulk_upsert import BulkUpserter
+from src.ingestion import sync_index, forget_file_hashes
+from src.streaming_ingest import stream_index
+from src.local_store import LocalVectorStore
+from src.sparse_index import SparseIndex, build_retriever
+from src.context_budget import ContextBudgetCompressor
+from src.index_status import get_pinecone_client, current_index_status, invalidate_index_status
 from langchain_pinecone import PineconeVectorStore
+from langchain.retrievers import ContextualCompressionRetriever
+from langchain.retrievers.document_compressors import DocumentCompressorPipeline
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
+def get_pinecone_index(index_name, pool_threads=1):
+    """Index handle for bulk writes, over gRPC or a pooled HTTP connection"""
+    if BULK_UPSERT_TRANSPORT == "grpc":
+        from pinecone.grpc import PineconeGRPC
+        return PineconeGRPC(api_key=PINECONE_API_KEY).Index(index_name)
+    return get_pinecone_client().Index(index_name, pool_threads=pool_threads)
+
+def open_vector_store(embeddings):
+    """Open the vector store selected by VECTOR_STORE_BACKEND"""
+    if VECTOR_STORE_BACKEND == "local":
+        return LocalVectorStore(LOCAL_INDEX_PATH, embeddings, PINECONE_DIMENSIONS, index_type=LOCAL_INDEX_TYPE,
+                                quantization=LOCAL_INDEX_QUANTIZATION, rescore=QUANTIZATION_RESCORE,
+                                rescore_factor=QUANTIZATION_RESCORE_FACTOR)
+    return PineconeVectorStore.from_existing_index(
+        index_name=PINECONE_INDEX_NAME,
+        embedding=embeddings
+    )
+
+def build_qa_retriever(docsearch):
+    """Retriever for the QA chain: first-stage search, optional rerank, then the context budget"""
+    candidate_k = RERANK_CANDIDATE_K if RERANKER_ENABLED else RETRIEVER_K
+    # BM25 + dense hybrid when the keyword index exists, else dense only
+    retriever = build_retriever(docsearch, k=candidate_k)
+
+    compressors = []
+    if RERANKER_ENABLED:
+        from src.reranker import get_reranker
+        compressors.append(get_reranker())
+    if CONTEXT_BUDGET_ENABLED:
+        compressors.append(ContextBudgetCompressor())
+    if not compressors:
+        return retriever
+    compressor = compressors[0] if len(compressors) == 1 else DocumentCompressorPipeline(transformers=compressors)
+    return ContextualCompressionRetriever(base_compressor=compressor, base_retriever=retriever)
 
 def check_index_exists(index_name):
-    """Check if Pinecone index exists"""
-    try:
-        indexes = pc.list_indexes()
-        return index_name in [index.name for index in indexes.indexes]
-    except Exception as e:
-        print(f"Error checking index: {e}")
-        return False
+    """Check if the index exists (one cached status lookup shared with check_index_has_vectors)"""
+    return current_index_status(index_name)["exists"]
 
 def check_index_has_vectors(index_name):
     """Check if the index has any vectors"""
+    return (current_index_status(index_name)["vector_count"] or 0) > 0
+
+def index_is_empty(docsearch):
+    """True when the index holds no vectors, e.g. because it was just created or recreated"""
+    if isinstance(docsearch, LocalVectorStore):
+        return len(docsearch) == 0
+    return (docsearch.index.describe_index_stats().get("total_vector_count") or 0) == 0
+
+def ingest_documents(docsearch, data=PDF_DATA_PATH):
+    """Upload the PDFs in the data directory using the configured ingestion mode"""
+    # Length-sorted, batched, multi-process encoding behind the embedding cache
+    ingestion_embeddings = get_ingestion_embeddings()
+    # Concurrent, retrying, checkpointed uploads
+    upserter = BulkUpserter.for_vector_store(docsearch)
+    if index_is_empty(docsearch):
+        # A new or recreated index holds none of the vectors an earlier build checkpointed
+        upserter.clear_checkpoint()
+    # BM25 keyword index kept alongside the vectors for hybrid retrieval
+    sparse_index = SparseIndex(SPARSE_INDEX_PATH) if HYBRID_RETRIEVAL_ENABLED else None
+    if sparse_index is not None and sparse_index.staged_count() == 0 and os.path.exists(INGESTION_MANIFEST_PATH):
+        # Chunks synced before the keyword index existed are unknown to it; re-parse every file.
+        # The manifest keeps its chunk ids, so removed PDFs and vanished chunks are still deleted
+        print("🔎 Keyword index is empty, re-parsing all PDFs to backfill it...")
+        forget_file_hashes(INGESTION_MANIFEST_PATH)
     try:
-        index = pc.Index(index_name)
-        stats = index.describe_index_stats()
-        total_vectors = stats.get("total_vector_count", 0)
-        return total_vectors > 0
-    except Exception as e:
-        print(f"Error checking vector presence: {e}")
-        return False
+        if INGESTION_MODE == "streaming" and not os.path.exists(INGESTION_MANIFEST_PATH):
+            # Full build with bounded memory; later runs sync incrementally
+            summary = stream_index(docsearch, ingestion_embeddings, data=data, upserter=upserter,
+                                   sparse_index=sparse_index)
+            summary.update(upserted_chunks=summary["chunks"], deleted_chunks=0)
+        else:
+            # Parse only new or changed PDFs and upsert only changed chunks
+            summary = sync_index(docsearch, data=data, embeddings=ingestion_embeddings, upserter=upserter,
+                                 sparse_index=sparse_index)
+        upserter.clear_checkpoint()
+        invalidate_index_status(PINECONE_INDEX_NAME)
+        if sparse_index is not None and (summary["upserted_chunks"] or summary["deleted_chunks"]
+                                         or not sparse_index.is_built):
+            sparse_index.build()
+    finally:
+        ingestion_embeddings.model.close()
+        upserter.close()
+
+    encoder = ingestion_embeddings.model
+    summary["embedded_chunks"] = encoder.stats["chunks"]
+    summary["embedding_chunks_per_second"] = encoder.chunks_per_second()
+    summary["upsert_vectors_per_second"] = upserter.vectors_per_second()
+    if encoder.stats["chunks"]:
+        print(f"⚡ Embedded {encoder.stats['chunks']} chunks at {encoder.chunks_per_second():.1f} chunks/sec")
+    if upserter.stats["vectors"]:
+        print(f"⬆️ Upserted {upserter.stats['vectors']} vectors at {upserter.vectors_per_second():.1f} vectors/sec "
+              f"({upserter.stats['retries']} retries)")
+    return summary
 
 def create_index_if_not_exists():
-    """Only create index and upload if not already present or empty"""
+    """Create the index if needed and sync it with the PDFs on disk"""
     if check_index_exists(PINECONE_INDEX_NAME):
         print(f"✅ Index '{PINECONE_INDEX_NAME}' already exists!")
-        if check_index_has_vectors(PINECONE_INDEX_NAME):
-            print(f"✅ Index '{PINECONE_INDEX_NAME}' already has vector data.")
+        if check_index_has_vectors(PINECONE_INDEX_NAME) and not os.path.exists(INGESTION_MANIFEST_PATH):
+            # Vectors uploaded before the manifest existed have random ids; syncing would duplicate them
+            print(f"✅ Index '{PINECONE_INDEX_NAME}' already has vector data (no ingestion manifest, skipping sync).")
             return True
-        else:
-            print(f"⚠️ Index exists but has no vectors. Proceeding to add data...")
     else:
         print("📚 Creating new index...")
 
     try:
-        # Load and process documents
-        print("Loading PDF documents...")
-        extracted_data = load_pdf_file(data=PDF_DATA_PATH)
-
-        print("Splitting text into chunks...")
-        text_chunks = text_split(extracted_data=extracted_data)
-
         print("Downloading embedding model...")
         embeddings = download_hugging_face_model()
 
-        print("Uploading documents to Pinecone index...")
-        PineconeVectorStore.from_documents(
-            index_name=PINECONE_INDEX_NAME,
-            documents=text_chunks,
-            embedding=embeddings
-        )
+        docsearch = open_vector_store(embeddings)
+
+        print("Syncing PDF documents with the index...")
+        summary = ingest_documents(docsearch)
 
-        print(f"✅ Index '{PINECONE_INDEX_NAME}' is now populated!")
+        print(f"✅ Index '{PINECONE_INDEX_NAME}' is up to date! "
+              f"({summary['upserted_chunks']} upserted, {summary['deleted_chunks']} deleted)")
         return True
 
     except Exception as e:
@@ -73,10 +151,7 @@ def get_vector_store():
     try:
         embeddings = download_hugging_face_model()
 
-        docsearch = PineconeVectorStore.from_existing_index(
-            index_name=PINECONE_INDEX_NAME,
-            embedding=embeddings
-        )
+        docsearch = open_vector_store(embeddings)
         return docsearch
     except Exception as e:
         print(f"❌ Error getting vector store: {e}")
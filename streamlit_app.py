@@ -1,15 +1,12 @@
 import streamlit as st
-import os
-from pinecone import Pinecone
-from langchain_pinecone import PineconeVectorStore
-from langchain.chains import RetrievalQA
-from langchain_openai import ChatOpenAI
-from src.helper import load_pdf_file, text_split, download_hugging_face_model
-from src.prompt import system_prompt
+# Heavy modules (LangChain, Pinecone, OpenAI, the embedding model) are imported
+# inside the functions that use them and preloaded in the background
+from src.startup import preload_in_background, loaded_module, preload_error
+from src.index_status import get_index_status, refresh_index_status
 from config import (
-    PINECONE_API_KEY, OPENAI_API_KEY, PINECONE_INDEX_NAME,
-    LLM_MODEL, LLM_TEMPERATURE, RETRIEVER_K, PDF_DATA_PATH,
-    PAGE_TITLE, PAGE_ICON, LAYOUT
+    PINECONE_API_KEY, OPENAI_API_KEY, PINECONE_INDEX_NAME, PDF_DATA_PATH,
+    PAGE_TITLE, PAGE_ICON, LAYOUT, VECTOR_STORE_BACKEND,
+    STREAMING_RESPONSES, INDEX_STATUS_POLL_SECONDS, CONVERSATION_ENABLED
 )
 import time
 
@@ -76,100 +73,175 @@ if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'index_created' not in st.session_state:
     st.session_state.index_created = False
-if 'qa_chain' not in st.session_state:
-    st.session_state.qa_chain = None
+if 'index_exists' not in st.session_state:
+    # Index status the setup buttons were last rendered for (None while checking)
+    st.session_state.index_exists = None
+if 'conversation' not in st.session_state:
+    # Bounded, summarized history used to rewrite follow-ups (created on the first question)
+    st.session_state.conversation = None
 
-def check_index_exists(index_name):
-    """Check if Pinecone index exists"""
-    try:
-        pc = Pinecone(api_key=PINECONE_API_KEY)
-        indexes = pc.list_indexes()
-        return index_name in [index.name for index in indexes.indexes]
-    except Exception as e:
-        st.error(f"Error checking index: {e}")
-        return False
+# Import heavy modules, then load the shared embedding model, once per process
+# and off the render path; also starts the metrics exporter
+preload_in_background()
 
 def create_index():
     """Create the Pinecone index with documents"""
     try:
+        from src.helper import download_hugging_face_model
+        from src.vector_store import ingest_documents, open_vector_store
         with st.spinner("Creating index... This may take a few minutes."):
-            # Load and process documents
-            st.info("Loading PDF documents...")
-            extracted_data = load_pdf_file(data=PDF_DATA_PATH)
-            
-            st.info("Splitting text into chunks...")
-            text_chunks = text_split(extracted_data=extracted_data)
-            
             st.info("Downloading embedding model...")
             embeddings = download_hugging_face_model()
-            
-            st.info("Creating Pinecone index...")
-            
-            PineconeVectorStore.from_documents(
-                index_name=PINECONE_INDEX_NAME,
-                documents=text_chunks,
-                embedding=embeddings
+
+            docsearch = open_vector_store(embeddings)
+
+            # Incremental sync, or a bounded-memory streaming build (INGESTION_MODE)
+            st.info("Syncing PDF documents with the index...")
+            summary = ingest_documents(docsearch, data=PDF_DATA_PATH)
+            refresh_index_status(PINECONE_INDEX_NAME)
+            resources = loaded_module("src.resources")
+            if resources is not None:
+                # Sessions pick up the new index on their next question
+                resources.get_resource_cache().invalidate_index()
+
+            st.success(
+                f"Index created successfully! ({summary['upserted_chunks']} chunks upserted, "
+                f"{summary['deleted_chunks']} deleted)"
             )
-            
-            st.success("Index created successfully!")
             return True
     except Exception as e:
         st.error(f"Error creating index: {e}")
         return False
 
-def initialize_qa_chain():
-    """Initialize the QA chain"""
+def get_qa_chain():
+    """The QA chain shared by every session of this process (built on first use, health-checked)"""
     try:
-        embeddings = download_hugging_face_model()
-        
-        docsearch = PineconeVectorStore.from_existing_index(
-            index_name=PINECONE_INDEX_NAME,
-            embedding=embeddings
-        )
-        
-        llm = ChatOpenAI(
-            model=LLM_MODEL,
-            openai_api_key=OPENAI_API_KEY,
-            temperature=LLM_TEMPERATURE
-        )
-        
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=docsearch.as_retriever(search_kwargs={'k': RETRIEVER_K}),
-            chain_type_kwargs={"prompt_template": system_prompt},
-            return_source_documents=True
-        )
-        
-        return qa_chain
+        from src.resources import get_resource_cache
+        return get_resource_cache().qa_chain.get()
     except Exception as e:
         st.error(f"Error initializing QA chain: {e}")
         return None
 
-def format_response_with_sources(response):
-    """Format response to include page references"""
-    result = response.get('result', 'Sorry, I could not generate a response.')
-    
-    # Add source documents if available
-    if 'source_documents' in response and response['source_documents']:
-        sources = response['source_documents']
-        page_refs = []
-        
-        for doc in sources:
-            page = doc.metadata.get('page')
-            source = doc.metadata.get('source', 'Unknown source')
-            
-            if page is not None:
-                page_refs.append(f"{source} (page {page})")
-            else:
-                page_refs.append(source)
-        
-        if page_refs:
-            # Remove duplicates while preserving order
-            unique_refs = list(dict.fromkeys(page_refs))
-            result += f"\n\n**📚 Sources:**\n" + ", ".join(unique_refs)
-    
-    return result
+def stream_response(qa_chain, prompt, documents=None):
+    """Show sources as soon as retrieval finishes, then stream the answer tokens"""
+    from src.helper import format_response_with_sources
+    from src.streaming_qa import StreamingQA
+    streaming_qa = StreamingQA.from_chain(qa_chain)
+
+    cached = streaming_qa.lookup_cached(prompt)
+    if cached is not None:
+        bot_response = format_response_with_sources(cached)
+        st.markdown(bot_response)
+        return bot_response, cached
+
+    if documents is None:
+        with st.spinner("Searching..."):
+            documents = streaming_qa.retrieve(prompt)
+
+    placeholder = st.empty()
+    with placeholder.container():
+        sources = format_response_with_sources({"result": "", "source_documents": documents}).strip()
+        if sources:
+            st.markdown(sources)
+        answer = st.write_stream(streaming_qa.stream(prompt, documents))
+
+    # Re-render in the same layout as non-streamed answers, citations last
+    response = {"result": answer, "source_documents": documents}
+    bot_response = format_response_with_sources(response)
+    placeholder.markdown(bot_response)
+    return bot_response, response
+
+def answer_question(qa_chain, prompt):
+    """Answer a chat question, rewritten against this session's history; returns the rendered answer"""
+    from src.helper import format_response_with_sources
+    from src.query_engine import AsyncQueryEngine
+
+    query, documents, conversational_qa = prompt, None, None
+    if CONVERSATION_ENABLED:
+        from src.conversation import ConversationalQA, ConversationMemory
+        if st.session_state.conversation is None:
+            st.session_state.conversation = ConversationMemory()
+        conversational_qa = ConversationalQA.from_chain(qa_chain)
+        query, documents = conversational_qa.prepare(st.session_state.conversation, prompt)
+        if query != prompt:
+            st.caption(f"🔎 Searching for: {query}")
+
+    if STREAMING_RESPONSES:
+        bot_response, response = stream_response(qa_chain, query, documents)
+    else:
+        with st.spinner("Thinking..."):
+            # Shared async engine: I/O from concurrent sessions overlaps
+            engine = AsyncQueryEngine.from_chain(qa_chain)
+            response = engine.run(query, documents)
+        bot_response = format_response_with_sources(response)
+        st.markdown(bot_response)
+
+    if conversational_qa is not None:
+        conversational_qa.remember(st.session_state.conversation, prompt, response["result"],
+                                   response["source_documents"])
+    return bot_response
+
+def show_debug_panel():
+    """Per-stage latency percentiles and counters for this server process"""
+    with st.expander("🐞 Debug: query timings"):
+        tracing = loaded_module("src.tracing")
+        if tracing is None:
+            st.caption("Loading...")
+            return
+        snapshot = tracing.metrics_snapshot()
+        if not snapshot["stages"]:
+            st.caption("No requests traced yet.")
+            return
+        st.table([
+            {"stage": stage, "n": row["count"], "p50 ms": f"{row['p50_ms']:.0f}",
+             "p95 ms": f"{row['p95_ms']:.0f}", "p99 ms": f"{row['p99_ms']:.0f}"}
+            for stage, row in snapshot["stages"].items()
+        ])
+        for counter, value in sorted(snapshot["counters"].items()):
+            st.caption(f"{counter}: {value}")
+
+def index_exists(status):
+    """True/False from a cached index status, None while it is still being checked"""
+    return None if status is None else status["exists"]
+
+@st.fragment(run_every=INDEX_STATUS_POLL_SECONDS)
+def show_index_status():
+    """Index status from the cached status only; re-run on a timer to pick up refreshes"""
+    status = get_index_status(PINECONE_INDEX_NAME)
+    if index_exists(status) != st.session_state.index_exists:
+        # The setup buttons depend on it and live outside this fragment: re-run the whole page once
+        st.rerun()
+    if status is None:
+        st.markdown('<div class="status-box warning-box">⏳ Checking index...</div>', unsafe_allow_html=True)
+        return
+    if status["error"]:
+        st.error(f"Error checking index: {status['error']}")
+
+    if status["exists"]:
+        st.markdown('<div class="status-box success-box">✅ Index already exists</div>', unsafe_allow_html=True)
+    else:
+        st.markdown('<div class="status-box warning-box">⚠️ Index not found</div>', unsafe_allow_html=True)
+
+    if status["vector_count"] is not None:
+        dimension = f", {status['dimension']} dims" if status["dimension"] else ""
+        age = time.time() - status["checked_at"]
+        st.caption(f"📊 {status['vector_count']:,} vectors{dimension} (checked {age:.0f}s ago)")
+
+def show_index_actions():
+    """Initialize/Create buttons; outside the timed fragment, so a timer tick never re-runs their actions"""
+    if st.session_state.index_exists:
+        if not st.session_state.index_created:
+            if st.button("🔄 Initialize Chatbot"):
+                with st.spinner("Initializing chatbot..."):
+                    if get_qa_chain():
+                        st.session_state.index_created = True
+                        st.success("Chatbot initialized successfully!")
+                        st.rerun()
+    elif st.session_state.index_exists is False:
+        if st.button("📚 Create Index"):
+            if create_index():
+                st.session_state.index_created = True
+                st.rerun()
 
 # Main application
 def main():
@@ -180,7 +252,7 @@ def main():
         st.header("🔧 Index Management")
         
         # Check API keys first
-        if not PINECONE_API_KEY:
+        if VECTOR_STORE_BACKEND == "pinecone" and not PINECONE_API_KEY:
             st.markdown('<div class="status-box error-box">❌ Pinecone API Key: Missing</div>', unsafe_allow_html=True)
             st.info("Add your Pinecone API key to Streamlit secrets or .env file")
             return
@@ -190,31 +262,36 @@ def main():
             st.info("Add your OpenAI API key to Streamlit secrets or .env file")
             return
         
-        # Check if index exists
-        index_exists = check_index_exists(PINECONE_INDEX_NAME)
-        
-        if index_exists:
-            st.markdown('<div class="status-box success-box">✅ Index already exists</div>', unsafe_allow_html=True)
-            
-            if not st.session_state.index_created:
-                if st.button("🔄 Initialize Chatbot"):
-                    with st.spinner("Initializing chatbot..."):
-                        qa_chain = initialize_qa_chain()
-                        if qa_chain:
-                            st.session_state.qa_chain = qa_chain
-                            st.session_state.index_created = True
-                            st.success("Chatbot initialized successfully!")
-                            st.rerun()
+        # Cached index status, refreshed in the background; the buttons follow the status of this run
+        st.session_state.index_exists = index_exists(get_index_status(PINECONE_INDEX_NAME))
+        show_index_status()
+        show_index_actions()
+
+        # Shared embedding model status (without importing anything on the render path)
+        embeddings_module = loaded_module("src.embeddings")
+        model_metrics = embeddings_module.get_embedding_metrics() if embeddings_module else None
+        if model_metrics and model_metrics.get("error"):
+            st.error(f"🧠 Embedding model failed to load: {model_metrics['error']}")
+        elif model_metrics:
+            rss_delta = model_metrics["rss_delta_bytes"]
+            memory_note = f", +{rss_delta / 1e6:.0f} MB" if rss_delta else ""
+            st.caption(f"🧠 Embedding model loaded in {model_metrics['load_seconds']:.1f}s{memory_note}")
+        elif preload_error():
+            st.error(f"🧠 Embedding model not loaded, startup failed: {preload_error()}")
         else:
-            st.markdown('<div class="status-box warning-box">⚠️ Index not found</div>', unsafe_allow_html=True)
-            
-            if st.button("📚 Create Index"):
-                if create_index():
-                    st.session_state.index_created = True
-                    st.rerun()
-    
-    # Main chat interface
-    if st.session_state.index_created and st.session_state.qa_chain:
+            st.caption("🧠 Embedding model loading...")
+
+        resources = loaded_module("src.resources")
+        shared_chain = resources.get_resource_cache().qa_chain.peek() if resources else None
+        cache = getattr(shared_chain, "cache", None)
+        if cache is not None:
+            st.caption(f"♻️ Answer cache: {len(cache)} entries, {cache.hit_rate():.0%} hit rate")
+
+        show_debug_panel()
+
+    # Main chat interface: this session only holds its chat history, the chain is shared
+    qa_chain = get_qa_chain() if st.session_state.index_created else None
+    if qa_chain:
         st.markdown("### 💬 Chat with Medical Knowledge Base")
         
         # Display chat messages
@@ -233,23 +310,25 @@ def main():
             
             # Get bot response
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    try:
-                        response = st.session_state.qa_chain.invoke({"query": prompt})
-                        bot_response = format_response_with_sources(response)
-                        
-                        st.markdown(bot_response)
-                        
-                        # Add assistant response to chat history
-                        st.session_state.messages.append({"role": "assistant", "content": bot_response})
-                    except Exception as e:
-                        error_msg = f"Error generating response: {e}"
-                        st.error(error_msg)
-                        st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                from src.tracing import profile_request
+                try:
+                    with profile_request("chat"):
+                        bot_response = answer_question(qa_chain, prompt)
+                    
+                    # Add assistant response to chat history
+                    st.session_state.messages.append({"role": "assistant", "content": bot_response})
+                except Exception as e:
+                    from src.resources import get_resource_cache
+                    # Check the shared connections before the next question
+                    get_resource_cache().report_failure()
+                    error_msg = f"Error generating response: {e}"
+                    st.error(error_msg)
+                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
         
         # Clear chat button
         if st.button("🗑️ Clear Chat"):
             st.session_state.messages = []
+            st.session_state.conversation = None
             st.rerun()
     
     else: